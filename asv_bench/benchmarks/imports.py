@@ -0,0 +1,16 @@
+class Import:
+    """Benchmark importing xarray-simlab (each import runs in a new Python
+    process).
+
+    """
+
+    def timeraw_import_xsimlab(self):
+        return "import xsimlab"
+
+    def timeraw_import_xsimlab_and_run_deps(self):
+        # dask, distributed and zarr are loaded only when needed
+        return """
+        import xsimlab
+        import zarr
+        import dask.distributed
+        """
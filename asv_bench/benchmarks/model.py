@@ -0,0 +1,83 @@
+import numpy as np
+
+import xsimlab as xs
+
+
+def _make_processes(n_processes, n_vars=5):
+    """Return a chain of process classes where each process reads
+    the output variables of the previous process.
+
+    """
+    processes = {}
+    prev_cls = None
+
+    for i in range(n_processes):
+        attrs = {f"out{j}": xs.variable(intent="out") for j in range(n_vars)}
+        attrs["param"] = xs.variable()
+
+        if prev_cls is not None:
+            for j in range(n_vars):
+                attrs[f"in{j}"] = xs.foreign(prev_cls, f"out{j}")
+
+        attrs["group_var"] = xs.variable(intent="out", groups="g")
+
+        prev_cls = xs.process(type(f"P{i}", (), attrs))
+        processes[f"p{i}"] = prev_cls
+
+    processes["gather"] = xs.process(type("Gather", (), {"g": xs.group("g")}))
+
+    return processes
+
+
+class ModelCreation:
+    params = [10, 100, 1000]
+    param_names = ["n_processes"]
+
+    def setup(self, n_processes):
+        self.processes = _make_processes(n_processes)
+
+    def time_create_model(self, n_processes):
+        xs.Model(self.processes)
+
+
+@xs.process
+class AccessProcess:
+    var_in = xs.variable()
+    var_out = xs.variable(intent="out")
+
+    def run_step(self):
+        for _ in range(1000):
+            self.var_out = self.var_in
+
+
+class VariableAccess:
+    params = [False, True]
+    param_names = ["direct_access"]
+
+    def setup(self, direct_access):
+        self.model = xs.Model({"p": AccessProcess}, direct_access=direct_access)
+        self.model.state[("p", "var_in")] = 1.0
+
+    def time_get_set_variable(self, direct_access):
+        self.model.p.run_step()
+
+
+class StateCopy:
+    params = [False, True]
+    param_names = ["packed_state"]
+
+    def setup(self, packed_state):
+        processes = _make_processes(100)
+        self.model = xs.Model(processes, packed_state=packed_state)
+
+        for key in self.model.all_vars:
+            self.model.state[key] = np.ones(1000)
+
+        if packed_state:
+            self.model.state.pack()
+
+    def time_copy_state(self, packed_state):
+        if packed_state:
+            self.model.state.copy()
+        else:
+            {k: v.copy() for k, v in self.model.state.items()}
@@ -11,8 +11,11 @@ from .process import (
     process,
     process_info,
     runtime,
+    RuntimeSignal,
     variable_info,
 )
+from .stores import rechunk_store
+from .cache import ResultCache
 from .variable import any_object, variable, index, on_demand, foreign, group
 from .xr_accessor import SimlabAccessor, create_setup
 from . import monitoring
@@ -0,0 +1,348 @@
+import inspect
+import os
+import shutil
+import uuid
+import warnings
+from typing import Any, Callable, Dict, List, Mapping, Optional
+
+import xarray as xr
+
+from .drivers import _reset_multi_indexes
+from .process import get_process_cls
+
+
+__all__ = ("ResultCache",)
+
+
+_TMP_PREFIX = "tmp-"
+
+
+def _get_source(cls):
+    # source code of a process class and its (non-builtin) base classes
+    sources = []
+
+    for c in cls.__mro__[:-1]:
+        try:
+            sources.append(inspect.getsource(c))
+        except (OSError, TypeError):
+            # e.g., class defined interactively
+            import cloudpickle
+
+            sources.append(cloudpickle.dumps(c))
+
+    return sources
+
+
+def _tokenize_model(model):
+    """Returns a token (hash) of the structure of a model, i.e., the
+    name, the class and the source code of each of its processes.
+
+    """
+    from dask.base import tokenize
+
+    from xsimlab import __version__
+
+    items = []
+
+    for p_name, p_obj in model.items():
+        cls = get_process_cls(p_obj)
+        items.append((p_name, cls.__module__, cls.__qualname__, _get_source(cls)))
+
+    return tokenize(__version__, items)
+
+
+def _uses_batch_args(model):
+    """Returns True if the runtime methods of any process in the model use
+    the 'batch' or 'batch_size' runtime arguments.
+
+    """
+    for p_obj in model.values():
+        executors = p_obj.__xsimlab_executor__.runtime_executors.values()
+
+        for executor in executors:
+            if {"batch", "batch_size"} & set(executor.args):
+                return True
+
+    return False
+
+
+def _get_dir_size(path):
+    size = 0
+
+    for root, _, files in os.walk(path):
+        for f in files:
+            size += os.path.getsize(os.path.join(root, f))
+
+    return size
+
+
+class ResultCache:
+    """On-disk cache of simulation results, addressed by content.
+
+    Each entry is a zarr store (directory) that contains the output dataset
+    of one simulation (or one simulation in a batch). Its key is a hash of
+    the model structure (the name, the class and the source code of each
+    process), of the input data and of the run options that may affect the
+    results.
+
+    The least recently used entries are evicted once the total size of the
+    cache exceeds ``max_size``.
+
+    Parameters
+    ----------
+    path : str
+        Path to the directory of the cache (created if it doesn't exist).
+    max_size : int, optional
+        Maximum size of the cache, in bytes (default: no limit).
+
+    See Also
+    --------
+    :meth:`xarray.Dataset.xsimlab.run`
+
+    """
+
+    def __init__(self, path: str, max_size: Optional[int] = None):
+        self.path = os.fspath(path)
+        self.max_size = max_size
+
+        os.makedirs(self.path, exist_ok=True)
+
+        # sizes of the entries (computed once)
+        self._sizes = {}
+
+        self._evict()
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.path, key)
+
+    def keys(self) -> List[str]:
+        """Returns the keys of all entries in the cache."""
+        return [
+            entry.name
+            for entry in os.scandir(self.path)
+            if entry.is_dir() and not entry.name.startswith(_TMP_PREFIX)
+        ]
+
+    def __contains__(self, key: str) -> bool:
+        return os.path.isdir(self._entry_path(key))
+
+    def __len__(self) -> int:
+        return len(self.keys())
+
+    def _get_size(self, key):
+        if key not in self._sizes:
+            self._sizes[key] = _get_dir_size(self._entry_path(key))
+        return self._sizes[key]
+
+    @property
+    def size(self) -> int:
+        """Total size of the cache entries, in bytes."""
+        return sum(self._get_size(k) for k in self.keys())
+
+    def get(self, key: str) -> Optional[xr.Dataset]:
+        """Returns the dataset of a cache entry (loaded in memory) or None
+        if there's no such entry.
+
+        """
+        path = self._entry_path(key)
+
+        if not os.path.isdir(path):
+            return None
+
+        try:
+            ds = xr.open_zarr(path, consolidated=True, mask_and_scale=False)
+            ds.load()
+        except (OSError, KeyError, ValueError):
+            # missing (or evicted) entry
+            return None
+
+        # mark as recently used
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+        return ds
+
+    def put(self, key: str, dataset: xr.Dataset):
+        """Add a dataset to the cache (no-op if the entry already exists) and
+        maybe evict the least recently used entries.
+
+        """
+        if key in self:
+            return
+
+        # don't reuse encoding (e.g., chunks) from the source store
+        dataset = dataset.copy()
+        for xr_var in dataset.variables.values():
+            xr_var.encoding = {}
+
+        tmp_path = self._entry_path(_TMP_PREFIX + uuid.uuid4().hex)
+
+        try:
+            dataset.to_zarr(tmp_path, consolidated=True)
+            os.replace(tmp_path, self._entry_path(key))
+        except (OSError, TypeError, ValueError) as e:
+            # e.g., values that can't be serialized or concurrent write
+            # of the same entry
+            shutil.rmtree(tmp_path, ignore_errors=True)
+
+            if key not in self:
+                warnings.warn(f"Could not cache simulation results: {e}")
+            return
+
+        self._evict()
+
+    def _evict(self):
+        if self.max_size is None:
+            return
+
+        keys = self.keys()
+        total = sum(self._get_size(k) for k in keys)
+
+        # least recently used entries first
+        keys.sort(key=lambda k: os.path.getmtime(self._entry_path(k)))
+
+        for key in keys:
+            if total <= self.max_size:
+                break
+
+            total -= self._get_size(key)
+            shutil.rmtree(self._entry_path(key), ignore_errors=True)
+            self._sizes.pop(key, None)
+
+    def clear(self):
+        """Remove all entries from the cache."""
+        for key in self.keys():
+            shutil.rmtree(self._entry_path(key), ignore_errors=True)
+
+        self._sizes.clear()
+
+    def __repr__(self):
+        return f"<ResultCache {self.path!r} ({len(self)} entries)>"
+
+
+def _as_result_cache(obj):
+    if isinstance(obj, ResultCache):
+        return obj
+    else:
+        return ResultCache(obj)
+
+
+def _fill_member_coords(members, batch_dim, mclock_dim):
+    # the status (and end) of each simulation are set only when
+    # at least one simulation of a batch has stopped early
+    defaults = {
+        "simulation_status": lambda ds: "completed",
+        f"{mclock_dim}_end": lambda ds: ds[mclock_dim].values[-1],
+    }
+
+    for name, get_default in defaults.items():
+        if not any(name in ds.coords for ds in members):
+            continue
+
+        for i, ds in enumerate(members):
+            if name not in ds.coords:
+                members[i] = ds.assign_coords({name: (batch_dim, [get_default(ds)])})
+
+    return members
+
+
+def run_cached(
+    dataset: xr.Dataset,
+    model,
+    cache: Any,
+    run: Callable[[xr.Dataset], xr.Dataset],
+    batch_dim: Optional[str] = None,
+    options: Optional[Mapping[str, Any]] = None,
+) -> xr.Dataset:
+    """Run simulation(s) using a result cache.
+
+    ``run`` is called with the (subset of the) input dataset for which there
+    is no cache entry. In a batch of simulations, each simulation has its own
+    cache entry. If only a subset of the batch is run, ``run`` is also given
+    a ``batch_subset`` tuple with the batch indices of the simulations and
+    the size of the batch. The key of each simulation also includes its
+    batch index if a process uses the 'batch' or 'batch_size' runtime
+    arguments.
+
+    """
+    from dask.base import tokenize
+
+    cache = _as_result_cache(cache)
+    dataset, multi_indexes = _reset_multi_indexes(dataset)
+
+    base_token = tokenize(_tokenize_model(model), options)
+
+    if batch_dim is None:
+        key = tokenize(base_token, dataset)
+        ds_out = cache.get(key)
+
+        if ds_out is None:
+            ds_out = run(dataset)
+            cache.put(key, ds_out)
+
+        return ds_out.set_index(multi_indexes)
+
+    # batch-invariant input data is hashed only once
+    batch_vars = [k for k, v in dataset.variables.items() if batch_dim in v.dims]
+    ds_batch = dataset[batch_vars].drop_vars(batch_dim, errors="ignore")
+    shared_token = tokenize(base_token, dataset.drop_vars(batch_vars), batch_vars)
+
+    batch_size = dataset.dims[batch_dim]
+
+    if _uses_batch_args(model):
+        shared_token = tokenize(shared_token, batch_size)
+        batch_tokens = range(batch_size)
+    else:
+        batch_tokens = [None] * batch_size
+
+    keys = [
+        tokenize(shared_token, ds_batch.isel({batch_dim: b}), batch_tokens[b])
+        for b in range(batch_size)
+    ]
+
+    members: Dict[int, xr.Dataset] = {}
+    for b, key in enumerate(keys):
+        ds_member = cache.get(key)
+        if ds_member is not None:
+            members[b] = ds_member
+
+    missing = [b for b in range(len(keys)) if b not in members]
+
+    if len(missing) == len(keys):
+        ds_missing = run(dataset)
+    elif missing:
+        # keep the batch indices of the simulations (runtime arguments)
+        ds_missing = run(
+            dataset.isel({batch_dim: missing}), batch_subset=(missing, len(keys))
+        )
+
+    if missing:
+        for i, b in enumerate(missing):
+            ds_member = ds_missing.isel({batch_dim: [i]}).drop_vars(
+                batch_dim, errors="ignore"
+            )
+            cache.put(keys[b], ds_member)
+            members[b] = ds_member
+
+        if len(missing) == len(keys):
+            return ds_missing.set_index(multi_indexes)
+
+    members = [members[b] for b in range(len(keys))]
+    mclock_dim = dataset.xsimlab.master_clock_dim
+    members = _fill_member_coords(members, batch_dim, mclock_dim)
+
+    ds_out = xr.concat(
+        members,
+        dim=batch_dim,
+        data_vars="minimal",
+        coords="minimal",
+        compat="override",
+        join="outer",
+    )
+
+    if batch_dim in dataset.coords:
+        ds_out = ds_out.assign_coords({batch_dim: dataset[batch_dim]})
+
+    return ds_out.set_index(multi_indexes)
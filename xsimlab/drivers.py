@@ -1,11 +1,28 @@
+import collections
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+import copy
 from enum import Enum
+import itertools
+import multiprocessing
+import os
+import pickle
+import sys
+import threading
+import warnings
 from typing import Any, Iterator, Mapping
 
-import dask
+import numpy as np
 import pandas as pd
 
-from .hook import flatten_hooks, group_hooks, RuntimeHook
-from .stores import ZarrSimulationStore
+from .hook import flatten_hooks, group_hooks, HookTable, RuntimeHook
+from .model import _is_distributed_client
+from .process import filter_variables, merge_signals, RuntimeSignal, SimulationStage
+from .stores import ZarrSimulationStore, rechunk_store
 from .utils import get_batch_size
 
 
@@ -130,6 +147,43 @@ def _check_missing_inputs(dataset, model):
         raise KeyError(f"Missing variables {missing_xr_vars} in Dataset")
 
 
+def _check_process_clocks(dataset, model):
+    """Check if all processes executed on their own clock exist in the model
+    and if their clock coordinate is in the input Dataset.
+    """
+    for p_name, clock in dataset.xsimlab.process_clocks.items():
+        if p_name not in model:
+            raise KeyError(
+                f"Process {p_name!r} set with clock {clock!r} not found in model"
+            )
+        if clock not in dataset.xsimlab.clock_coords:
+            raise KeyError(
+                f"Clock coordinate {clock!r} of process {p_name!r} "
+                "not found in Dataset"
+            )
+
+
+def _check_max_step_vars(dataset, model, max_step_vars):
+    """Check if the variables used for adaptive time stepping exist in the
+    model and if the master clock is numeric.
+    """
+    invalid_vars = set(max_step_vars) - set(model.all_vars)
+
+    if invalid_vars:
+        raise KeyError(
+            ", ".join([f"{pn}__{vn}" for pn, vn in invalid_vars])
+            + f" is/are not valid key(s) for variables in model {model}"
+        )
+
+    mclock_dtype = dataset.xsimlab.master_clock_coord.dtype
+
+    if mclock_dtype.kind not in "iuf":
+        raise ValueError(
+            "Adaptive time stepping requires a numeric master clock coordinate, "
+            f"found dtype {mclock_dtype}"
+        )
+
+
 def _get_all_active_hooks(hooks):
     """Get all active runtime hooks (i.e, provided as argument, activated from
     context manager or glabally registered) and return them grouped by runtime
@@ -167,7 +221,7 @@ def _generate_runtime_datasets(dataset):
 
     step_data_vars = {
         "_clock_start": mclock_coord,
-        "_clock_end": mclock_coord.shift({mclock_dim: 1}),
+        "_clock_end": mclock_coord.shift({mclock_dim: -1}),
         "_clock_diff": mclock_coord.diff(mclock_dim, label="lower"),
     }
 
@@ -288,6 +342,149 @@ def _get_input_vars(dataset, model):
     return input_vars
 
 
+def _get_shared_input_keys(dataset, model, batch_dim=None):
+    """Return the keys of the static input variables which values may be set
+    by reference in the model state (read-only) and shared between all the
+    simulations of a batch.
+
+    Those variables have intent 'in' in all processes (and no converter),
+    and their values don't vary along ``batch_dim``. Return an empty list
+    if ``batch_dim`` is None (single simulation).
+
+    """
+    if batch_dim is None:
+        return []
+
+    inout_keys = set()
+
+    for p_obj in model.values():
+        state_keys = p_obj.__xsimlab_state_keys__
+        inout_keys.update(
+            state_keys.get(k) for k in filter_variables(p_obj, intent="inout")
+        )
+
+    shared_keys = []
+
+    for key in model.input_vars:
+        var = model.cache[key]["attrib"]
+        xr_var = dataset.get(model.cache[key]["name"])
+
+        if (
+            xr_var is None
+            or not var.metadata.get("static", False)
+            or var.converter is not None
+            or key in inout_keys
+            or batch_dim in xr_var.dims
+        ):
+            continue
+
+        shared_keys.append(key)
+
+    return shared_keys
+
+
+def _get_process_clock_steps(dataset):
+    """Return, for each process executed on its own clock, a dictionary
+    with the (master clock) steps at which the process is executed as keys
+    and the start and end of the process clock step as values.
+
+    """
+    process_clocks = dataset.xsimlab.process_clocks
+
+    if not process_clocks:
+        return {}
+
+    mclock = dataset.xsimlab.master_clock_coord.values
+    nsteps = mclock.size - 1
+
+    clock_steps = {}
+
+    for p_name, clock in process_clocks.items():
+        coord = dataset[clock].values
+        steps = np.searchsorted(mclock, coord)
+        ends = np.append(coord[1:], mclock[-1])
+
+        clock_steps[p_name] = {
+            int(step): (start, end)
+            for step, start, end in zip(steps, coord, ends)
+            if step < nsteps
+        }
+
+    return clock_steps
+
+
+def _get_process_contexts(clock_steps, rt_context, step):
+    """Return the runtime contexts of the processes executed on their own
+    clock at a given step (None for processes that must be skipped).
+
+    """
+    p_contexts = {}
+
+    for p_name, steps in clock_steps.items():
+        if step in steps:
+            start, end = steps[step]
+            p_contexts[p_name] = dict(
+                rt_context, step_start=start, step_end=end, step_delta=end - start
+            )
+        else:
+            p_contexts[p_name] = None
+
+    return p_contexts
+
+
+def _get_max_step_delta(model, max_step_vars):
+    """Return the minimum of the maximum step durations proposed by the model
+    (or None if no value is proposed).
+
+    """
+    values = []
+
+    for p_name, var_name in max_step_vars:
+        value = getattr(model[p_name], var_name)
+
+        if value is not None:
+            values.append(np.min(value))
+
+    if not values:
+        return None
+
+    max_delta = min(values)
+
+    if not max_delta > 0:
+        raise ValueError(
+            f"Invalid maximum step duration {max_delta!r} proposed by the model, "
+            "it must be strictly positive"
+        )
+
+    return max_delta
+
+
+def _iter_substeps(model, max_step_vars, start, end, rtol=1e-9):
+    """Split one step of the master clock into sub-steps.
+
+    The duration of each sub-step is given by the maximum step durations
+    proposed by the model at the beginning of the sub-step. The last sub-step
+    ends exactly at ``end`` (it is merged with the previous sub-step if it is
+    shorter than ``rtol`` times the maximum step duration, e.g., due to
+    floating-point round-off errors).
+
+    Yield ``(start, end)`` tuples.
+
+    """
+    substep_start = start
+
+    while True:
+        max_delta = _get_max_step_delta(model, max_step_vars)
+
+        if max_delta is None or end - (substep_start + max_delta) <= rtol * max_delta:
+            yield substep_start, end
+            return
+
+        substep_end = substep_start + max_delta
+        yield substep_start, substep_end
+        substep_start = substep_end
+
+
 def _run(
     dataset,
     model,
@@ -298,14 +495,32 @@ def _run(
     batch_size=-1,
     parallel=False,
     scheduler=None,
+    max_step_vars=None,
+    abort_if=None,
+    init_models=None,
+    shared_keys=None,
+    batch_id=None,
 ):
     """Run one simulation.
 
     - initialize and update runtime context
     - Set model inputs from the input Dataset (update
       time-dependent model inputs -- if any -- before each time step).
+      The values of ``shared_keys`` are set as read-only views (no copy).
+    - Maybe run the simulation from a fork of a model already initialized
+      with the same inputs (``init_models``), in which case only the
+      model-level runtime hooks are called at the initialize stage.
+    - Maybe split each time step into sub-steps, which duration is
+      proposed by the model (adaptive time stepping).
     - Save outputs (snapshots) between the 'run_step' and the
       'finalize_step' stages or at the end of the simulation.
+    - Stop the simulation early if a process or a runtime hook returns
+      ``RuntimeSignal.BREAK`` or ``RuntimeSignal.ABORT`` (the unused clock
+      indexes are marked in the store). Abort the simulation if any of the
+      ``abort_if`` conditions is met for the outputs saved at a step.
+
+    ``batch_id`` may be given to set the 'batch' runtime argument to another
+    value than the index of the simulation in the store.
 
     """
     ds_init, ds_gby_steps = _generate_runtime_datasets(dataset)
@@ -313,49 +528,561 @@ def _run(
     validate_all = validate is ValidateOption.ALL
     validate_inputs = validate_all or validate is ValidateOption.INPUTS
 
-    execute_kwargs = {
-        "hooks": hooks,
-        "validate": validate_all,
-        "parallel": parallel,
-        "scheduler": scheduler,
-    }
-
     rt_context = RuntimeContext(
         batch_size=batch_size,
-        batch=batch,
+        batch=batch if batch_id is None else batch_id,
         sim_start=ds_init["_sim_start"].values,
         nsteps=ds_init["_nsteps"].values,
         sim_end=ds_init["_sim_end"].values,
     )
 
-    in_vars = _get_input_vars(ds_init, model)
-    model.update_state(in_vars, validate=validate_inputs, ignore_static=True)
-    model.execute("initialize", rt_context, **execute_kwargs)
+    if init_models is not None:
+
+        def initialize(init_model):
+            in_vars = _get_input_vars(ds_init, init_model)
+            init_model.update_state(
+                in_vars, validate=validate_inputs, ignore_static=True
+            )
+            return init_model.execute("initialize", rt_context, validate=validate_all)
+
+        model, init_signal = init_models.fork(batch, model, initialize)
+        init_contexts = dict.fromkeys(model)
+    else:
+        init_signal = RuntimeSignal.NONE
+        init_contexts = None
+
+    # resolved once for the whole simulation
+    hook_table = HookTable(hooks, model, rt_context)
+
+    # processes executed on their own clock (sub-cycling)
+    clock_steps = _get_process_clock_steps(dataset)
+    p_contexts = None
+
+    execute_kwargs = {
+        "hooks": hook_table,
+        "validate": validate_all,
+        "parallel": parallel,
+        "scheduler": scheduler,
+    }
 
-    for step, (_, ds_step) in enumerate(ds_gby_steps):
+    try:
+        if init_models is None:
+            in_vars = _get_input_vars(ds_init, model)
+            model.update_state(
+                in_vars,
+                validate=validate_inputs,
+                ignore_static=True,
+                shared_keys=shared_keys,
+            )
 
-        rt_context.update(
-            step=step,
-            step_start=ds_step["_clock_start"].values,
-            step_end=ds_step["_clock_end"].values,
-            step_delta=ds_step["_clock_diff"].values,
+        signal = model.execute(
+            "initialize", rt_context, process_contexts=init_contexts, **execute_kwargs
         )
+        signal = merge_signals([init_signal, signal])
+        end_step = 0
+
+        for step, (_, ds_step) in enumerate(ds_gby_steps):
+            if signal is not RuntimeSignal.NONE:
+                break
+
+            rt_context.update(
+                step=step,
+                step_start=ds_step["_clock_start"].values,
+                step_end=ds_step["_clock_end"].values,
+                step_delta=ds_step["_clock_diff"].values,
+            )
+
+            if clock_steps:
+                p_contexts = _get_process_contexts(clock_steps, rt_context, step)
+
+            in_vars = _get_input_vars(ds_step, model)
+            model.update_state(in_vars, validate=validate_inputs, ignore_static=False)
+
+            if max_step_vars:
+                substeps = _iter_substeps(
+                    model,
+                    max_step_vars,
+                    rt_context["step_start"],
+                    rt_context["step_end"],
+                )
+            else:
+                substeps = [None]
+
+            for i, substep in enumerate(substeps):
+                if substep is not None:
+                    start, end = substep
+                    rt_context.update(
+                        step_start=start, step_end=end, step_delta=end - start
+                    )
+
+                signals = [
+                    model.execute(
+                        "run_step",
+                        rt_context,
+                        process_contexts=p_contexts,
+                        **execute_kwargs,
+                    )
+                ]
+
+                if i == 0:
+                    saved = store.write_output_vars(batch, step, model=model)
+
+                    if abort_if and saved and any(f(saved) for f in abort_if):
+                        signals.append(RuntimeSignal.ABORT)
+
+                signals.append(
+                    model.execute(
+                        "finalize_step",
+                        rt_context,
+                        process_contexts=p_contexts,
+                        **execute_kwargs,
+                    )
+                )
+
+                # processes executed on their own clock are executed only
+                # at the first sub-step
+                if p_contexts:
+                    p_contexts = dict.fromkeys(p_contexts)
 
-        in_vars = _get_input_vars(ds_step, model)
-        model.update_state(in_vars, validate=validate_inputs, ignore_static=False)
-        model.execute("run_step", rt_context, **execute_kwargs)
+                signal = merge_signals(signals)
 
-        store.write_output_vars(batch, step, model=model)
+                if signal is not RuntimeSignal.NONE:
+                    break
 
-        model.execute("finalize_step", rt_context, **execute_kwargs)
+            end_step = step + 1
 
-    store.write_output_vars(batch, -1, model=model)
+        if signal is RuntimeSignal.ABORT:
+            store.write_end_step(batch, end_step, status="aborted")
+        else:
+            if signal is RuntimeSignal.BREAK:
+                store.write_end_step(batch, end_step)
+            store.write_output_vars(batch, -1, model=model)
+
+        model.execute("finalize", rt_context, **execute_kwargs)
 
-    model.execute("finalize", rt_context, **execute_kwargs)
+    except BaseException:
+        # the simulation error is reported rather than an error that
+        # may be raised by an asynchronous hook
+        try:
+            hook_table.close()
+        except Exception as e:
+            warnings.warn(f"Error in asynchronous runtime hook: {e!r}")
+        raise
+
+    else:
+        # wait for asynchronous hooks
+        hook_table.close()
 
     store.write_index_vars(model=model)
 
 
+def _iter_batch_groups(dataset, store, batch_dim):
+    """Lazily iterate over the groups of simulations in a batch.
+
+    Yield lists of ``(batch, dataset)`` tuples where each dataset is a
+    (lazy) selection of the input dataset for one simulation.
+
+    """
+    for batches in store.get_batch_groups():
+        yield [(b, dataset.isel({batch_dim: b})) for b in batches]
+
+
+def _get_dask_scheduler(scheduler=None):
+    """Return the dask scheduler (get function), or None for the default
+    scheduler of dask delayed objects.
+
+    """
+    import dask
+    import dask.base
+
+    # avoid importing dask.distributed if not already loaded (dask does it
+    # when resolving a scheduler name or the default scheduler)
+    if "distributed" not in sys.modules:
+        if scheduler is None:
+            scheduler = dask.config.get("scheduler", None)
+        if scheduler is None:
+            return None
+        if isinstance(scheduler, str):
+            get = dask.base.named_schedulers.get(scheduler.lower())
+            if get is not None:
+                return get
+
+    return dask.base.get_scheduler(scheduler=scheduler)
+
+
+def _get_dask_client(scheduler=None):
+    """Return the dask distributed client used as scheduler, if any."""
+    get = _get_dask_scheduler(scheduler)
+    client = getattr(get, "__self__", None)
+
+    return client if _is_distributed_client(client) else None
+
+
+def _is_local_threaded_scheduler(scheduler=None):
+    """Return True if the dask scheduler runs tasks in threads of the
+    current process (i.e., without copying the task objects).
+
+    """
+    import dask.base
+    import dask.local
+    import dask.threaded
+
+    if isinstance(scheduler, ThreadPoolExecutor):
+        return True
+    if _get_dask_client(scheduler) is not None:
+        return False
+
+    get = _get_dask_scheduler(scheduler)
+
+    return get is None or get in (dask.threaded.get, dask.local.get_sync)
+
+
+def _compute_streaming(tasks, window, scheduler=None):
+    """Compute dask delayed objects with at most ``window`` of them in flight.
+
+    A new task is submitted as soon as one has finished (i.e., there is no
+    barrier between windows of tasks).
+
+    """
+    import dask
+    import dask.base
+    import dask.local
+    import dask.multiprocessing
+    import dask.threaded
+
+    tasks = iter(tasks)
+    client = _get_dask_client(scheduler)
+
+    if client is not None:
+        from distributed import as_completed
+
+        futures = as_completed(client.compute(list(itertools.islice(tasks, window))))
+
+        for future in futures:
+            future.result()
+
+            for task in itertools.islice(tasks, 1):
+                futures.add(client.compute(task))
+
+        return
+
+    get = _get_dask_scheduler(scheduler)
+    compute_kwargs = {}
+    own_pool = None
+
+    if get is None or get is dask.threaded.get:
+        # tasks run in our own thread pool (same number of workers)
+        num_workers = dask.config.get("num_workers", None) or os.cpu_count() or 1
+        get = dask.local.get_sync
+    elif get is dask.local.get_sync:
+        num_workers = 1
+    elif get is dask.multiprocessing.get:
+        # a single process pool for all tasks (dask would create one pool
+        # per call of dask.compute otherwise)
+        num_workers = dask.config.get("num_workers", None) or os.cpu_count() or 1
+        pool = dask.config.get("pool", None)
+        if pool is None:
+            pool = own_pool = _create_dask_process_pool(num_workers)
+        compute_kwargs["pool"] = pool
+    else:
+        num_workers = window
+
+    try:
+        with ThreadPoolExecutor(max_workers=min(num_workers, window)) as executor:
+            pending = set()
+
+            for task in tasks:
+                if len(pending) >= window:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for f in done:
+                        f.result()
+
+                pending.add(
+                    executor.submit(dask.compute, task, scheduler=get, **compute_kwargs)
+                )
+
+            for f in pending:
+                f.result()
+
+    finally:
+        if own_pool is not None:
+            own_pool.shutdown()
+
+
+def _create_dask_process_pool(num_workers):
+    """Create a process pool like the one created by the dask multi-process
+    scheduler at each call.
+
+    """
+    from functools import partial
+
+    import dask.multiprocessing
+
+    if os.environ.get("PYTHONHASHSEED") in (None, "0"):
+        # consistent hashing in subprocesses (same seed than dask)
+        os.environ["PYTHONHASHSEED"] = "6640"
+
+    initializer = partial(
+        dask.multiprocessing.initialize_worker_process,
+        user_initializer=dask.config.get("multiprocessing.initializer", None),
+    )
+
+    return ProcessPoolExecutor(
+        num_workers,
+        mp_context=dask.multiprocessing.get_context(),
+        initializer=initializer,
+    )
+
+
+def _run_batch_group(
+    members,
+    model,
+    store,
+    hooks,
+    validate,
+    batch_size=-1,
+    max_step_vars=None,
+    abort_if=None,
+    init_models=None,
+    shared_keys=None,
+    batch_ids=None,
+):
+    """Run a group of simulations in a batch, one after each other.
+
+    ``members`` is a list of ``(batch, dataset)`` tuples. A clone of ``model``
+    (or a fork of an initialized clone, see :class:`_InitializedModels`) is
+    used for each simulation. Lazy input data (e.g., dask arrays) is loaded
+    only when the simulation starts. Values of ``shared_keys`` are shared
+    between the clones (read-only). ``batch_ids`` may be given to set the
+    'batch' runtime argument of each simulation.
+
+    If the group spans more than one batch member, output values are
+    accumulated in memory and written as whole chunks in the store at the end
+    of the group.
+
+    """
+    batches = [batch for batch, _ in members]
+
+    def run_members():
+        for batch, ds_batch in members:
+            _run(
+                ds_batch.load(scheduler="synchronous"),
+                model if init_models is not None else model.clone(),
+                store,
+                hooks,
+                validate,
+                batch=batch,
+                batch_size=batch_size,
+                max_step_vars=max_step_vars,
+                abort_if=abort_if,
+                init_models=init_models,
+                shared_keys=shared_keys,
+                batch_id=None if batch_ids is None else batch_ids[batch],
+            )
+
+    if len(batches) > 1:
+        with store.buffer_batch_group(batches):
+            run_members()
+    else:
+        run_members()
+
+
+def _get_init_keys(dataset, model, batch_dim):
+    """Return a key for each simulation in a batch, so that simulations
+    with the same inputs at the initialize stage (i.e., all inputs that are
+    not time-varying) have the same key.
+
+    """
+    from dask.base import tokenize
+
+    batch_size = dataset.dims[batch_dim]
+    mclock_dim = dataset.xsimlab.master_clock_dim
+
+    for p_obj in model.values():
+        executor = p_obj.__xsimlab_executor__.runtime_executors.get(
+            SimulationStage.INITIALIZE
+        )
+
+        if executor is not None and "batch" in executor.args:
+            # initialization depends on the simulation number
+            return list(range(batch_size))
+
+    values = []
+
+    for p_name, var_name in model.input_vars:
+        xr_var = dataset.get(p_name + "__" + var_name)
+
+        if xr_var is None or batch_dim not in xr_var.dims or mclock_dim in xr_var.dims:
+            continue
+
+        values.append(xr_var.transpose(batch_dim, ...).values)
+
+    return [tokenize([v[b] for v in values]) for b in range(batch_size)]
+
+
+class _InitializedModels:
+    """Models initialized once and forked for all the simulations in a
+    batch that share the same inputs at the initialize stage.
+
+    An initialized model is kept until it has been forked for each of its
+    simulations. This is thread-safe. When pickled (e.g., sent to a worker
+    process), no initialized model is included. A worker process runs only
+    some of the simulations, so that its initialized models are not counted
+    but are kept in a small cache (the ``max_models`` most recently used).
+
+    """
+
+    def __init__(self, keys, max_models=None):
+        self.keys = list(keys)
+        self.max_models = max_models
+        self._counts = collections.Counter(self.keys if max_models is None else [])
+        self._models = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._key_locks = {}
+
+    def __getstate__(self):
+        return self.keys
+
+    def __setstate__(self, keys):
+        self.__init__(keys, max_models=_WORKER_MAX_INIT_MODELS)
+
+    def fork(self, batch, model, initialize):
+        """Return a fork of a clone of ``model`` that has been initialized
+        (once) for the simulation ``batch`` using the ``initialize`` function,
+        as well as the signal returned by that function.
+
+        """
+        key = self.keys[batch]
+
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            if key not in self._models:
+                init_model = model.clone()
+                self._models[key] = (init_model, initialize(init_model))
+
+            init_model, signal = self._models[key]
+            forked = init_model.fork()
+
+            with self._lock:
+                if self.max_models is None:
+                    self._counts[key] -= 1
+                    if self._counts[key] <= 0:
+                        del self._models[key]
+                else:
+                    self._models.move_to_end(key)
+                    while len(self._models) > self.max_models:
+                        self._models.popitem(last=False)
+
+        return forked, signal
+
+
+# minimum size of (batch-invariant) input arrays shared between worker processes
+_SHARED_MEMORY_MIN_NBYTES = 2 ** 20
+
+# objects set once in each worker process of the process pool batch executor
+_worker_context = {}
+
+# max. number of initialized models kept in each worker process
+# of the process pool batch executor (fork_init=True)
+_WORKER_MAX_INIT_MODELS = 4
+
+# default max. number of groups of simulations that are submitted at once
+# when running large batches of simulations in parallel
+_BATCH_WINDOW_SIZE = 4 * (os.cpu_count() or 1)
+
+
+def _dumps(obj):
+    # cloudpickle (dask dependency) supports process classes defined
+    # interactively or in local scopes
+    try:
+        import cloudpickle
+
+        return cloudpickle.dumps(obj)
+    except ImportError:  # pragma: no cover
+        return pickle.dumps(obj)
+
+
+def _create_shared_inputs(dataset, batch_dim):
+    """Copy the large, batch-invariant input arrays of ``dataset`` into shared
+    memory blocks.
+
+    Return the names of the shared variables, the shared memory blocks and the
+    specs needed to re-create the variables in the worker processes.
+
+    """
+    from multiprocessing.shared_memory import SharedMemory
+
+    shm_blocks = []
+    shm_specs = {}
+
+    for name, xr_var in dataset.data_vars.items():
+        data = xr_var.variable._data
+
+        if (
+            batch_dim in xr_var.dims
+            or not isinstance(data, np.ndarray)
+            or data.dtype.hasobject
+            or data.nbytes < _SHARED_MEMORY_MIN_NBYTES
+        ):
+            continue
+
+        shm = SharedMemory(create=True, size=data.nbytes)
+        shared_arr = np.ndarray(data.shape, dtype=data.dtype, buffer=shm.buf)
+        shared_arr[...] = data
+
+        shm_blocks.append(shm)
+        shm_specs[name] = (shm.name, xr_var.dims, data.shape, data.dtype, xr_var.attrs)
+
+    return list(shm_specs), shm_blocks, shm_specs
+
+
+def _init_batch_worker(payload):
+    """Initialize a worker process of the process pool batch executor."""
+    from multiprocessing.shared_memory import SharedMemory
+
+    store, model, hooks, validate, run_kwargs, shm_specs = pickle.loads(payload)
+
+    shm_blocks = []
+    shared_vars = {}
+
+    for name, (shm_name, dims, shape, dtype, attrs) in shm_specs.items():
+        shm = SharedMemory(name=shm_name)
+        arr = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+        arr.flags.writeable = False
+
+        shm_blocks.append(shm)
+        shared_vars[name] = (dims, arr, attrs)
+
+    _worker_context.update(
+        store=store,
+        model=model,
+        args=(hooks, validate),
+        run_kwargs=run_kwargs,
+        shared_vars=shared_vars,
+        shm_blocks=shm_blocks,
+    )
+
+
+def _run_batch_group_in_worker(payload):
+    """Run a group of simulations in a worker process of the process pool
+    batch executor, with per-member input data completed by shared input data.
+
+    """
+    ctx = _worker_context
+    shared_vars = ctx["shared_vars"]
+
+    members = [
+        (batch, ds_batch.assign(shared_vars))
+        for batch, ds_batch in pickle.loads(payload)
+    ]
+
+    _run_batch_group(
+        members, ctx["model"], ctx["store"], *ctx["args"], **ctx["run_kwargs"]
+    )
+
+
 class XarraySimulationDriver(BaseSimulationDriver):
     """Simulation driver using xarray.Dataset objects as I/O.
 
@@ -367,6 +1094,11 @@ class XarraySimulationDriver(BaseSimulationDriver):
       defined as coordinates in the input Dataset.
     - Get simulation results as a new xarray.Dataset object.
 
+    If ``batch_subset`` is given, i.e., a tuple of batch indices and the size
+    of a batch, the simulations in ``dataset`` are only a subset of that
+    batch. Indices and size are used as values of the 'batch' and
+    'batch_size' runtime arguments.
+
     """
 
     def __init__(
@@ -381,6 +1113,16 @@ class XarraySimulationDriver(BaseSimulationDriver):
         hooks=None,
         parallel=False,
         scheduler=None,
+        store_inputs="copy",
+        batch_window=None,
+        check_index_vars=False,
+        chunk_policy=None,
+        rechunk=None,
+        max_step_vars=None,
+        abort_if=None,
+        fork_init=False,
+        pack_scalars=False,
+        batch_subset=None,
     ):
         self.model = model
 
@@ -390,6 +1132,7 @@ class XarraySimulationDriver(BaseSimulationDriver):
 
         _check_missing_master_clock(self.dataset)
         _check_missing_inputs(self.dataset, model)
+        _check_process_clocks(self.dataset, model)
 
         self.batch_dim = batch_dim
         self.batch_size = get_batch_size(dataset, batch_dim)
@@ -406,11 +1149,68 @@ class XarraySimulationDriver(BaseSimulationDriver):
             hooks = []
         self.hooks = _get_all_active_hooks(hooks)
 
+        if parallel == "processes" and batch_dim is None:
+            raise ValueError(
+                "parallel='processes' is only supported for running batches "
+                "of simulations (batch_dim must be set)"
+            )
+
+        if fork_init and batch_dim is None:
+            raise ValueError(
+                "fork_init=True is only supported for running batches "
+                "of simulations (batch_dim must be set)"
+            )
+        if (
+            fork_init
+            and parallel
+            and parallel != "processes"
+            and not _is_local_threaded_scheduler(scheduler)
+        ):
+            raise ValueError(
+                "fork_init=True is not supported with a multi-process or "
+                "distributed dask scheduler, use parallel='processes' instead"
+            )
+        self.fork_init = fork_init
+
         self.parallel = parallel
         self.scheduler = scheduler
 
-        if parallel:
-            lock = dask.utils.get_scheduler_lock(scheduler=scheduler)
+        if batch_window is None:
+            batch_window = _BATCH_WINDOW_SIZE
+        self.batch_window = batch_window
+
+        if max_step_vars:
+            _check_max_step_vars(self.dataset, model, max_step_vars)
+        self.max_step_vars = max_step_vars
+
+        if callable(abort_if):
+            abort_if = [abort_if]
+        self.abort_if = abort_if
+
+        # extra arguments for running each simulation in a batch
+        self._run_kwargs = {
+            "batch_size": self.batch_size,
+            "max_step_vars": max_step_vars,
+            "abort_if": abort_if,
+        }
+
+        if batch_subset is not None:
+            batch_ids, batch_size = batch_subset
+            self._run_kwargs["batch_ids"] = list(batch_ids)
+            self._run_kwargs["batch_size"] = batch_size
+
+        if rechunk is True:
+            rechunk = "time_series"
+        elif rechunk is False:
+            rechunk = None
+        self.rechunk = rechunk
+
+        if parallel and parallel != "processes":
+            import dask.threaded
+            import dask.utils
+
+            get = _get_dask_scheduler(scheduler) or dask.threaded.get
+            lock = dask.utils.get_scheduler_lock(scheduler=get)
         else:
             lock = None
 
@@ -421,12 +1221,25 @@ class XarraySimulationDriver(BaseSimulationDriver):
             encoding=encoding,
             batch_dim=batch_dim,
             lock=lock,
+            store_inputs=store_inputs,
+            check_index_vars=check_index_vars,
+            chunk_policy=chunk_policy,
+            pack_scalars=pack_scalars,
         )
 
     def get_results(self):
         """Get simulation results as a xarray.Dataset loaded from
         the zarr store.
+
+        If ``rechunk`` has been set, the store is first rewritten in place with
+        a read-optimized chunk layout.
+
         """
+        if self.rechunk is not None:
+            rechunk_store(
+                self.store.zgroup, chunk_policy=self.rechunk, batch_dim=self.batch_dim
+            )
+
         self.store.consolidate()
 
         # TODO: replace index variables data with simulation data
@@ -451,6 +1264,18 @@ class XarraySimulationDriver(BaseSimulationDriver):
         )
         args = (self.store, self.hooks, self._validate_option)
 
+        shared_keys = _get_shared_input_keys(ds_in, self.model, self.batch_dim)
+        self._run_kwargs["shared_keys"] = shared_keys
+
+        if self.batch_dim is not None:
+            # (lazy) shared input values are loaded only once
+            shared_names = [self.model.cache[k]["name"] for k in shared_keys]
+            ds_in = ds_in.assign({name: ds_in[name].compute() for name in shared_names})
+
+        if self.fork_init:
+            init_keys = _get_init_keys(ds_in, self.model, self.batch_dim)
+            self._run_kwargs["init_models"] = _InitializedModels(init_keys)
+
         if self.batch_dim is None:
             _run(
                 ds_in,
@@ -458,27 +1283,96 @@ class XarraySimulationDriver(BaseSimulationDriver):
                 *args,
                 parallel=self.parallel,
                 scheduler=self.scheduler,
+                max_step_vars=self.max_step_vars,
+                abort_if=self.abort_if,
+                shared_keys=shared_keys,
             )
 
+        elif self.parallel == "processes":
+            self._run_batch_processes(ds_in)
+
         else:
-            ds_gby_batch = ds_in.groupby(self.batch_dim)
-            futures = []
-
-            for batch, (_, ds_batch) in enumerate(ds_gby_batch):
-                model = self.model.clone()
-
-                if self.parallel:
-                    futures.append(
-                        dask.delayed(_run)(
-                            ds_batch,
-                            model,
-                            *args,
-                            batch=batch,
-                            batch_size=self.batch_size,
-                        )
-                    )
-                else:
-                    _run(ds_batch, model, *args, batch=batch)
+            groups = _iter_batch_groups(ds_in, self.store, self.batch_dim)
+            args = (self.model,) + args
 
             if self.parallel:
-                dask.compute(futures, scheduler=self.scheduler)
+                import dask
+
+                tasks = (
+                    dask.delayed(_run_batch_group)(members, *args, **self._run_kwargs)
+                    for members in groups
+                )
+                _compute_streaming(tasks, self.batch_window, self.scheduler)
+
+            else:
+                for members in groups:
+                    _run_batch_group(members, *args, **self._run_kwargs)
+
+    def _run_batch_processes(self, ds_in):
+        """Run a batch of simulations using a pool of worker processes.
+
+        Large input arrays that don't vary along the batch dimension are
+        put in shared memory. Only the per-member input data is sent to the
+        workers, which directly write outputs in the (on disk) store.
+
+        """
+        if self.store.in_memory:
+            raise ValueError(
+                "parallel='processes' doesn't support the default in-memory "
+                "store, please provide another zarr store or a path"
+            )
+
+        shared_names, shm_blocks, shm_specs = _create_shared_inputs(
+            ds_in, self.batch_dim
+        )
+
+        # do not send the whole input dataset to the workers
+        worker_store = copy.copy(self.store)
+        worker_store.dataset = None
+        worker_store.input_refs = None
+
+        groups = _iter_batch_groups(
+            ds_in.drop(shared_names), self.store, self.batch_dim
+        )
+
+        try:
+            with multiprocessing.Manager() as manager:
+                # protects zarr metadata updates (array creation / resizing)
+                worker_store.lock = manager.Lock()
+
+                init_payload = _dumps(
+                    (
+                        worker_store,
+                        self.model,
+                        self.hooks,
+                        self._validate_option,
+                        self._run_kwargs,
+                        shm_specs,
+                    )
+                )
+
+                with ProcessPoolExecutor(
+                    initializer=_init_batch_worker, initargs=(init_payload,)
+                ) as executor:
+                    pending = set()
+
+                    for members in groups:
+                        # bounded number of submitted tasks
+                        if len(pending) >= self.batch_window:
+                            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                            for f in done:
+                                f.result()
+
+                        # only send loaded, per-member input data
+                        members = [(b, ds.load()) for b, ds in members]
+                        pending.add(
+                            executor.submit(_run_batch_group_in_worker, _dumps(members))
+                        )
+
+                    for f in pending:
+                        f.result()
+
+        finally:
+            for shm in shm_blocks:
+                shm.close()
+                shm.unlink()
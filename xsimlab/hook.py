@@ -1,18 +1,37 @@
 import inspect
-from typing import Callable, Dict, Iterable, List, Union
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Union
+
+import numpy as np
 
 from .process import SimulationStage
+from .utils import Frozen
 
 
 __all__ = ("runtime_hook", "RuntimeHook")
 
 
-def runtime_hook(stage, level="model", trigger="post"):
+def runtime_hook(
+    stage,
+    level="model",
+    trigger="post",
+    every=None,
+    interval=None,
+    at=None,
+    async_=False,
+    keys=None,
+    queue_size=16,
+    on_full="block",
+):
     """Decorator that allows to call a function or a method
     at one or more specific times during a simulation.
 
     The decorated function / method must have the following signature:
     ``func(model, context, state)`` or ``meth(self, model, context, state)``.
+    It may return a :class:`~xsimlab.RuntimeSignal`, e.g., to stop the
+    simulation early.
 
     Parameters
     ----------
@@ -29,6 +48,40 @@ def runtime_hook(stage, level="model", trigger="post"):
         Sets when exactly to trigger the function call, i.e., just before
         ('pre') or just after ('post') the execution of the model's or
         process' simulation stage (default: after).
+    every : int, optional
+        If given, call the function only every ``every`` time steps
+        (i.e., when ``context['step']`` is a multiple of ``every``).
+    interval : float, optional
+        If given, call the function at most once every ``interval`` seconds.
+    at : array-like, optional
+        If given, call the function only at the time steps starting at one
+        of these (master) clock coordinate values.
+    async_ : bool, optional
+        If True, call the function asynchronously in a background thread, so
+        that the simulation doesn't wait for it (default: False). The function
+        then receives a copy of the runtime context and a snapshot of the
+        model state (see :meth:`xsimlab.Model.snapshot`).
+    keys : list, optional
+        Model state keys, i.e., ``('process_name', 'var_name')`` tuples, to
+        include in the snapshot given to an asynchronous hook function
+        (default: all keys).
+    queue_size : int, optional
+        Maximum number of pending calls of an asynchronous hook function
+        (default: 16).
+    on_full : {'block', 'drop'}, optional
+        What to do when the queue of pending calls is full: either wait
+        until a call is done ('block', default) or skip the call ('drop').
+
+    Notes
+    -----
+    The options ``every``, ``interval`` and ``at`` may be combined and are
+    only supported for the 'run_step' and 'finalize_step' stages. They are
+    evaluated before calling the function, which is skipped if any of the
+    conditions is not met.
+
+    Errors raised in asynchronous hook functions are re-raised at the end of
+    the simulation.
+    Values returned by asynchronous hook functions are ignored.
 
     """
     stage = SimulationStage(stage)
@@ -39,8 +92,31 @@ def runtime_hook(stage, level="model", trigger="post"):
     if trigger not in ("pre", "post"):
         raise ValueError("trigger argument must be either 'pre' or 'post'")
 
+    throttle = {"every": every, "interval": interval, "at": at}
+    throttle = {k: v for k, v in throttle.items() if v is not None}
+
+    if throttle and stage not in (
+        SimulationStage.RUN_STEP,
+        SimulationStage.FINALIZE_STEP,
+    ):
+        raise ValueError(
+            "every, interval and at arguments are only supported for the "
+            "'run_step' and 'finalize_step' stages"
+        )
+
+    if on_full not in ("block", "drop"):
+        raise ValueError("on_full argument must be either 'block' or 'drop'")
+
     def wrap(func):
         func.__xsimlab_hook__ = (stage, level, trigger)
+        if throttle:
+            func.__xsimlab_hook_throttle__ = throttle
+        if async_:
+            func.__xsimlab_hook_async__ = {
+                "keys": keys,
+                "queue_size": queue_size,
+                "on_full": on_full,
+            }
         return func
 
     return wrap
@@ -50,6 +126,117 @@ def _get_hook_info(func):
     return getattr(func, "__xsimlab_hook__", False)
 
 
+class _ThrottledHook:
+    """Wraps a runtime hook function and call it only if the throttle
+    conditions are met.
+
+    """
+
+    __slots__ = ("func", "every", "interval", "at", "_at_values", "_last_call")
+
+    def __init__(self, func, every=None, interval=None, at=None):
+        self.func = func
+        self.every = every
+        self.interval = interval
+        self.at = at
+        self._at_values = None
+        self._last_call = -float("inf")
+
+    def _get_at_values(self, step_start):
+        # convert `at` values (e.g., strings or datetime objects) to
+        # the dtype of the master clock coordinate
+        dtype = step_start.dtype
+
+        if self._at_values is None or self._at_values.dtype != dtype:
+            if dtype.kind in "mM":
+                self._at_values = np.asarray(self.at, dtype=dtype)
+            else:
+                self._at_values = np.asarray(self.at)
+
+        return self._at_values
+
+    def __call__(self, model, context, state):
+        if self.every is not None and context["step"] % self.every:
+            return
+        if self.at is not None:
+            step_start = np.asarray(context["step_start"])
+            if not np.isin(step_start, self._get_at_values(step_start)):
+                return
+        if self.interval is not None:
+            now = time.monotonic()
+            if now - self._last_call < self.interval:
+                return
+            self._last_call = now
+
+        return self.func(model, context, state)
+
+
+class _AsyncHook:
+    """Wraps a runtime hook function and call it in a background thread
+    with a snapshot of the runtime context and the model state.
+
+    """
+
+    _sentinel = object()
+
+    def __init__(self, func, keys=None, queue_size=16, on_full="block"):
+        self.func = func
+        self.keys = keys
+        self.on_full = on_full
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.error = None
+        self.thread = threading.Thread(target=self._work, daemon=True)
+        self.thread.start()
+
+    def _work(self):
+        while True:
+            args = self.queue.get()
+
+            if args is self._sentinel:
+                return
+
+            if self.error is None:
+                try:
+                    self.func(*args)
+                except Exception as e:
+                    self.error = e
+
+    def __call__(self, model, context, state):
+        if self.on_full == "drop" and self.queue.full():
+            return
+
+        snapshot = (model, Frozen(dict(context)), model.snapshot(keys=self.keys))
+
+        if self.on_full == "drop":
+            try:
+                self.queue.put_nowait(snapshot)
+            except queue.Full:
+                pass
+        else:
+            self.queue.put(snapshot)
+
+    def close(self):
+        """Wait for all pending calls and maybe re-raise an error."""
+        self.queue.put(self._sentinel)
+        self.thread.join()
+
+        if self.error is not None:
+            raise self.error
+
+
+def _resolve_hook(func, async_hooks):
+    async_options = getattr(func, "__xsimlab_hook_async__", None)
+    throttle = getattr(func, "__xsimlab_hook_throttle__", None)
+
+    if async_options is not None:
+        func = _AsyncHook(func, **async_options)
+        async_hooks.append(func)
+    if throttle is not None:
+        func = _ThrottledHook(func, **throttle)
+
+    return func
+
+
 class RuntimeHook:
     """Base class for advanced, stateful simulation runtime hooks.
 
@@ -184,3 +371,83 @@ def group_hooks(
         grouped[stage][level][trigger].append(h)
 
     return grouped
+
+
+class StageHooks:
+    """Runtime hook functions to call during one simulation stage, resolved
+    in flat tuples by level and trigger.
+
+    The arguments passed to the hook functions (i.e., the model and frozen
+    views of the runtime context and the model state) are created once
+    and reused for all calls.
+
+    """
+
+    __slots__ = ("args", "model_pre", "model_post", "process_pre", "process_post")
+
+    def __init__(self, args, levels, async_hooks):
+        self.args = args
+
+        def resolve(level, trigger):
+            hooks = levels.get(level, {}).get(trigger, ())
+            return tuple(_resolve_hook(h, async_hooks) for h in hooks)
+
+        self.model_pre = resolve("model", "pre")
+        self.model_post = resolve("model", "post")
+        self.process_pre = resolve("process", "pre")
+        self.process_post = resolve("process", "post")
+
+
+class HookTable:
+    """Runtime hooks resolved once for a simulation run.
+
+    Parameters
+    ----------
+    hooks : dict
+        Runtime hook functions grouped by simulation stage, level and trigger
+        (see :func:`group_hooks`).
+    model : :class:`~xsimlab.Model`
+        The model that is run.
+    runtime_context : mapping
+        The runtime context of the simulation (updated in place during
+        the run).
+
+    """
+
+    __slots__ = ("stages", "_async_hooks")
+
+    def __init__(self, hooks, model, runtime_context: Mapping[str, Any]):
+        args = (model, Frozen(runtime_context), Frozen(model.state))
+        self._async_hooks = []
+
+        self.stages = {
+            stage: StageHooks(args, levels, self._async_hooks)
+            for stage, levels in hooks.items()
+            if levels
+        }
+
+    def get(self, stage: SimulationStage) -> Optional[StageHooks]:
+        """Return the hooks for a given stage or None if there's no hook."""
+        return self.stages.get(stage)
+
+    def close(self):
+        """Wait for the completion of all asynchronous hook calls
+        (if any).
+
+        """
+        async_hooks, self._async_hooks = self._async_hooks, []
+        error = None
+
+        # all hooks are closed before re-raising the first error (if any)
+        for h in async_hooks:
+            try:
+                h.close()
+            except Exception as e:
+                if error is None:
+                    error = e
+
+        if error is not None:
+            raise error
+
+    def __bool__(self):
+        return bool(self.stages)
@@ -1,22 +1,53 @@
 from collections import OrderedDict, defaultdict
 import copy
+import sys
 import time
 
 import attr
-import dask
-from dask.distributed import Client
+import numpy as np
 
+from .hook import HookTable
+from .state import PackedState
 from .variable import VarIntent, VarType
 from .process import (
     filter_variables,
     get_process_cls,
     get_target_variable,
+    bind_process_keys,
+    merge_signals,
+    RuntimeSignal,
     SimulationStage,
 )
 from .utils import AttrMapping, Frozen, variables_dict
 from .formatting import repr_model
 
 
+def _is_distributed_client(obj):
+    # avoid importing dask.distributed if not already loaded
+    if "distributed" not in sys.modules:
+        return False
+
+    from dask.distributed import Client
+
+    return isinstance(obj, Client)
+
+
+def _call_hooks(hooks, args):
+    """Call runtime hook functions and return the signal with the
+    highest priority returned by the functions.
+
+    """
+    signal = RuntimeSignal.NONE
+
+    for h in hooks:
+        h_signal = h(*args)
+
+        if isinstance(h_signal, RuntimeSignal) and h_signal > signal:
+            signal = h_signal
+
+    return signal
+
+
 def _flatten_keys(key_seq):
     """returns a flat list of keys, i.e., ``('foo', 'bar')`` tuples, from
     a nested sequence.
@@ -80,8 +111,17 @@ class _ModelBuilder:
         self._dep_processes = None
         self._sorted_processes = None
 
-        # a cache for group keys
+        # variables declared in each process (computed once)
+        self._processes_vars = {
+            k: variables_dict(cls) for k, cls in processes_cls.items()
+        }
+
+        # a cache for group keys and an index of group variables
         self._group_keys = {}
+        self._group_vars = None
+
+        # key -> readers / writers index (set after process keys)
+        self._key_index = None
 
     def _get_reverse_lookup(self, processes_cls):
         """Return a dictionary with process classes as keys and process names
@@ -105,8 +145,11 @@ class _ModelBuilder:
             p_obj.__xsimlab_model__ = model_obj
             p_obj.__xsimlab_name__ = p_name
 
-    def set_state(self):
-        state = {}
+    def set_state(self, packed=False):
+        if packed:
+            state = PackedState()
+        else:
+            state = {}
 
         # bind state to each process in the model
         for p_obj in self._processes_obj.values():
@@ -187,6 +230,21 @@ class _ModelBuilder:
 
         return state_key, od_key
 
+    def _get_group_vars(self, group):
+        """Return all ``(process_name, variable)`` pairs for variables that
+        belong to a given group (the index of group variables is built once).
+
+        """
+        if self._group_vars is None:
+            self._group_vars = defaultdict(list)
+
+            for p_name, p_vars in self._processes_vars.items():
+                for var in p_vars.values():
+                    for g in var.metadata.get("groups", []):
+                        self._group_vars[g].append((p_name, var))
+
+        return self._group_vars.get(group, [])
+
     def _get_group_var_keys(self, group):
         """Get from cache or find model-wise state and on-demand keys
         for all variables related to a group (except group variables).
@@ -198,14 +256,13 @@ class _ModelBuilder:
         state_keys = []
         od_keys = []
 
-        for p_name, p_obj in self._processes_obj.items():
-            for var in filter_variables(p_obj, group=group).values():
-                state_key, od_key = self._get_var_key(p_name, var)
+        for p_name, var in self._get_group_vars(group):
+            state_key, od_key = self._get_var_key(p_name, var)
 
-                if state_key is not None:
-                    state_keys.append(state_key)
-                if od_key is not None:
-                    od_keys.append(od_key)
+            if state_key is not None:
+                state_keys.append(state_key)
+            if od_key is not None:
+                od_keys.append(od_key)
 
         self._group_keys[group] = state_keys, od_keys
 
@@ -221,7 +278,7 @@ class _ModelBuilder:
 
         """
         for p_name, p_obj in self._processes_obj.items():
-            for var in filter_variables(p_obj).values():
+            for var in self._processes_vars[p_name].values():
                 state_key, od_key = self._get_var_key(p_name, var)
 
                 if state_key is not None:
@@ -229,24 +286,80 @@ class _ModelBuilder:
                 if od_key is not None:
                     p_obj.__xsimlab_od_keys__[var.name] = od_key
 
-    def ensure_no_intent_conflict(self):
-        """Raise an error if more than one variable with
-        intent='out' targets the same variable.
+        self._key_index = None
+
+    def bind_process_keys(self):
+        """Bake the state and on-demand keys into the properties of
+        each process (direct access mode).
 
         """
+        for p_obj in self._processes_obj.values():
+            bind_process_keys(p_obj)
+
+    def _get_key_index(self):
+        """Return an index of all state and on-demand keys in the model,
+        built in one pass over all variables. It contains the following
+        mappings:
+
+        - readers: key -> names of the processes that declare a variable
+          with that key (in any intent)
+        - writers: key -> names of the processes that declare a variable with
+          intent='out' with that key
+        - state_writers: state key -> ``(process_name, var_name)`` of all
+          variables (not on-demand) with intent='out' targeting that key
+        - in_keys / out_keys: state keys of variables that are candidates
+          to model inputs and state keys of variables with intent='out'.
 
-        def filter_out(var):
-            return (
-                var.metadata["intent"] == VarIntent.OUT
-                and var.metadata["var_type"] != VarType.ON_DEMAND
-            )
+        """
+        if self._key_index is not None:
+            return self._key_index
 
-        targets = defaultdict(list)
+        readers = defaultdict(set)
+        writers = defaultdict(list)
+        state_writers = defaultdict(list)
+        in_keys = set()
+        out_keys = set()
 
         for p_name, p_obj in self._processes_obj.items():
-            for var in filter_variables(p_obj, func=filter_out).values():
-                target_key = p_obj.__xsimlab_state_keys__.get(var.name)
-                targets[target_key].append((p_name, var.name))
+            state_keys = p_obj.__xsimlab_state_keys__
+            od_keys = p_obj.__xsimlab_od_keys__
+
+            for key in _flatten_keys([state_keys.values(), od_keys.values()]):
+                readers[key].add(p_name)
+
+            for var in self._processes_vars[p_name].values():
+                var_type = var.metadata["var_type"]
+                intent = var.metadata["intent"]
+                state_key = state_keys.get(var.name)
+
+                if intent == VarIntent.OUT:
+                    out_keys.add(state_key)
+
+                    if var_type == VarType.ON_DEMAND:
+                        writers[od_keys[var.name]].append(p_name)
+                    else:
+                        writers[state_key].append(p_name)
+                        state_writers[state_key].append((p_name, var.name))
+
+                elif var_type != VarType.GROUP:
+                    in_keys.add(state_key)
+
+        self._key_index = {
+            "readers": readers,
+            "writers": writers,
+            "state_writers": state_writers,
+            "in_keys": in_keys,
+            "out_keys": out_keys,
+        }
+
+        return self._key_index
+
+    def ensure_no_intent_conflict(self):
+        """Raise an error if more than one variable with
+        intent='out' targets the same variable.
+
+        """
+        targets = self._get_key_index()["state_writers"]
 
         conflicts = {k: v for k, v in targets.items() if len(v) > 1}
 
@@ -276,30 +389,11 @@ class _ModelBuilder:
           model inputs.
 
         """
+        key_index = self._get_key_index()
 
-        def filter_in(var):
-            return (
-                var.metadata["var_type"] != VarType.GROUP
-                and var.metadata["intent"] != VarIntent.OUT
-            )
-
-        def filter_out(var):
-            return var.metadata["intent"] == VarIntent.OUT
-
-        in_keys = []
-        out_keys = []
-
-        for p_name, p_obj in self._processes_obj.items():
-            in_keys += [
-                p_obj.__xsimlab_state_keys__.get(var.name)
-                for var in filter_variables(p_obj, func=filter_in).values()
-            ]
-            out_keys += [
-                p_obj.__xsimlab_state_keys__.get(var.name)
-                for var in filter_variables(p_obj, func=filter_out).values()
-            ]
-
-        self._input_vars = [k for k in set(in_keys) - set(out_keys) if k is not None]
+        self._input_vars = [
+            k for k in key_index["in_keys"] - key_index["out_keys"] if k is not None
+        ]
 
         return self._input_vars
 
@@ -337,25 +431,13 @@ class _ModelBuilder:
         """
         self._dep_processes = {k: set() for k in self._processes_obj}
 
-        d_keys = {}  # all state/on-demand keys for each process
+        key_index = self._get_key_index()
+        readers = key_index["readers"]
 
-        for p_name, p_obj in self._processes_obj.items():
-            d_keys[p_name] = _flatten_keys(
-                [
-                    p_obj.__xsimlab_state_keys__.values(),
-                    p_obj.__xsimlab_od_keys__.values(),
-                ]
-            )
-
-        for p_name, p_obj in self._processes_obj.items():
-            for var in filter_variables(p_obj, intent=VarIntent.OUT).values():
-                if var.metadata["var_type"] == VarType.ON_DEMAND:
-                    key = p_obj.__xsimlab_od_keys__[var.name]
-                else:
-                    key = p_obj.__xsimlab_state_keys__[var.name]
-
-                for pn in self._processes_obj:
-                    if pn != p_name and key in d_keys[pn]:
+        for key, p_writers in key_index["writers"].items():
+            for p_name in p_writers:
+                for pn in readers.get(key, ()):
+                    if pn != p_name:
                         self._dep_processes[pn].add(p_name)
 
         self._dep_processes = {k: list(v) for k, v in self._dep_processes.items()}
@@ -458,13 +540,27 @@ class Model(AttrMapping):
 
     active = []
 
-    def __init__(self, processes):
+    def __init__(self, processes, direct_access=False, packed_state=False):
         """
         Parameters
         ----------
         processes : dict
             Dictionnary with process names as keys and classes (decorated with
             :func:`process`) as values.
+        direct_access : bool, optional
+            If True, the state keys of all variables are resolved once
+            at model creation and are baked into the properties of each
+            process instance in the model (default: False). This makes
+            getting/setting variable values in process methods faster,
+            which may be significant for processes that access variables
+            many times in tight loops.
+        packed_state : bool, optional
+            If True, the model state is a :class:`~xsimlab.state.PackedState`
+            where all numeric arrays are packed into contiguous buffers (one
+            per data type) after the initialize stage of a simulation
+            (default: False). This makes copying, comparing, restoring or
+            transferring the whole state much cheaper. Note that array values
+            set in the state are then always copied.
 
         Raises
         ------
@@ -478,7 +574,12 @@ class Model(AttrMapping):
         builder.bind_processes(self)
         builder.set_process_keys()
 
-        self._state = builder.set_state()
+        self._options = {"direct_access": direct_access, "packed_state": packed_state}
+
+        if direct_access:
+            builder.bind_process_keys()
+
+        self._state = builder.set_state(packed=packed_state)
         self._var_cache = builder.create_variable_cache()
 
         self._all_vars = builder.get_variables()
@@ -497,6 +598,17 @@ class Model(AttrMapping):
         self._dep_processes = builder.get_process_dependencies()
         self._processes = builder.get_sorted_processes()
 
+        # arrays shared with state snapshots (copy-on-write)
+        self._frozen = {}
+        self._out_keys = {
+            p_name: [
+                p_obj.__xsimlab_state_keys__[k]
+                for k in p_obj.__xsimlab_executor__.out_vars
+            ]
+            for p_name, p_obj in self._processes.items()
+        }
+        self._written_keys = {k for keys in self._out_keys.values() for k in keys}
+
         super(Model, self).__init__(self._processes)
         self._initialized = True
 
@@ -618,12 +730,18 @@ class Model(AttrMapping):
         return self._state
 
     def update_state(
-        self, input_vars, validate=True, ignore_static=False, ignore_invalid_keys=True
+        self,
+        input_vars,
+        validate=True,
+        ignore_static=False,
+        ignore_invalid_keys=True,
+        shared_keys=None,
     ):
         """Update the model's state (only input variables) with new values.
 
         Prior to update the model's state, first convert the values for model
-        variables that have a converter, otherwise copy the values.
+        variables that have a converter, otherwise copy the values (except
+        for shared array values, see ``shared_keys``).
 
         Parameters
         ----------
@@ -642,8 +760,17 @@ class Model(AttrMapping):
             If True (default), ignores keys in ``input_vars`` that do not
             correspond to input variables in the model. Otherwise, raises
             a ``KeyError``.
+        shared_keys : collection, optional
+            Keys of input variables (with no converter) which array values
+            are not copied but set by reference as read-only views, so that
+            they can be shared between several models, e.g., clones used to
+            run a batch of simulations. Updating those values in-place then
+            raises an error.
 
         """
+        if shared_keys is None:
+            shared_keys = ()
+
         for key, value in input_vars.items():
 
             if key not in self.input_vars:
@@ -659,6 +786,11 @@ class Model(AttrMapping):
 
             if var.converter is not None:
                 self._state[key] = var.converter(value)
+            elif key in shared_keys and isinstance(value, np.ndarray):
+                if value.flags.writeable:
+                    value = value.view()
+                    value.flags.writeable = False
+                self._state[key] = value
             else:
                 self._state[key] = copy.copy(value)
 
@@ -666,6 +798,86 @@ class Model(AttrMapping):
             p_names = set([pn for pn, _ in input_vars if pn in self._processes])
             self.validate(p_names)
 
+    def snapshot(self, keys=None):
+        """Returns a consistent, read-only snapshot of the model state.
+
+        The snapshot is cheap: array values are not copied but are shared
+        with the model state and are made read-only. Those arrays are copied
+        later (copy-on-write), only before running a process that may
+        update them (i.e., variables with intent 'out' or 'inout').
+        Packed arrays (see :class:`~xsimlab.state.PackedState`) and arrays
+        that don't own their data are copied immediately. Other values are
+        shallow copies.
+
+        Parameters
+        ----------
+        keys : list, optional
+            Model state keys, i.e., ``('process_name', 'var_name')`` tuples,
+            to include in the snapshot (default: all keys).
+
+        Returns
+        -------
+        snapshot : mapping
+            A read-only mapping of model state keys and values.
+
+        Notes
+        -----
+        Arrays in the model state may still be updated in-place by some
+        processes through variables with intent 'in' or through other
+        references to those arrays, which now raises an error.
+
+        """
+        state = self._state
+
+        if keys is None:
+            keys = list(state)
+
+        if isinstance(state, PackedState):
+            packed_keys = set(state.packed_keys)
+        else:
+            packed_keys = set()
+
+        # drop references to frozen arrays that have been replaced in state
+        # (e.g., copied-on-write in parallel execution)
+        self._frozen = {k: v for k, v in self._frozen.items() if state.get(k) is v}
+
+        snapshot = {}
+
+        for key in keys:
+            value = state[key]
+
+            if not isinstance(value, np.ndarray):
+                snapshot[key] = copy.copy(value)
+            elif key in packed_keys or value.base is not None:
+                snapshot[key] = value.copy()
+            else:
+                if value.flags.writeable:
+                    value.flags.writeable = False
+                    # track only arrays that some process may update
+                    if key in self._written_keys:
+                        self._frozen[key] = value
+                snapshot[key] = value
+
+        return Frozen(snapshot)
+
+    def _thaw(self, p_obj, state=None):
+        """Copy the arrays shared with state snapshots before running
+        a process that may update them.
+
+        """
+        if state is None:
+            # sequential execution: also clear references to frozen arrays
+            state = self._state
+            get_frozen = self._frozen.pop
+        else:
+            get_frozen = self._frozen.get
+
+        for key in self._out_keys[p_obj.__xsimlab_name__]:
+            value = get_frozen(key, None)
+
+            if value is not None and state.get(key) is value:
+                state[key] = value.copy()
+
     @property
     def cache(self):
         """Returns a mapping of model variables and some of their (meta)data cached for
@@ -714,51 +926,69 @@ class Model(AttrMapping):
         for p_obj in processes:
             attr.validate(p_obj)
 
-    def _call_hooks(self, hooks, runtime_context, stage, level, trigger):
-        try:
-            event_hooks = hooks[stage][level][trigger]
-        except KeyError:
-            return
-
-        for h in event_hooks:
-            h(self, Frozen(runtime_context), Frozen(self.state))
-
     def _execute_process(
         self, p_obj, stage, runtime_context, hooks, validate, state=None
     ):
         executor = p_obj.__xsimlab_executor__
         p_name = p_obj.__xsimlab_name__
+        signals = []
+
+        if hooks is not None:
+            signals.append(_call_hooks(hooks.process_pre, hooks.args))
 
-        self._call_hooks(hooks, runtime_context, stage, "process", "pre")
-        out_state = executor.execute(p_obj, stage, runtime_context, state=state)
-        self._call_hooks(hooks, runtime_context, stage, "process", "post")
+        if self._frozen:
+            self._thaw(p_obj, state=state)
+
+        signals.append(executor.run(p_obj, stage, runtime_context, state=state))
+        out_state = executor.get_out_state(p_obj)
+
+        if hooks is not None:
+            signals.append(_call_hooks(hooks.process_post, hooks.args))
 
         if validate:
             self.validate(self._processes_to_validate[p_name])
 
-        return p_name, out_state
+        return p_name, out_state, merge_signals(signals)
 
-    def _build_dask_graph(self, execute_args):
+    def _build_dask_graph(self, execute_args, process_contexts=None):
         """Build a custom, 'stateless' graph of tasks (process execution) that will
         be passed to a Dask scheduler.
 
         """
+        stage, runtime_context, hooks, validate = execute_args
+
+        def exec_process(p_obj, p_context, model_state, out_states):
+            if p_context is None:
+                return p_obj.__xsimlab_name__, {}, RuntimeSignal.NONE
 
-        def exec_process(p_obj, model_state, out_states):
             # update model state with output state from all dependent processes
             state = {}
             state.update(model_state)
-            for _, s in out_states:
+            for _, s, _ in out_states:
                 state.update(s)
 
-            return self._execute_process(p_obj, *execute_args, state=state)
+            return self._execute_process(
+                p_obj, stage, p_context, hooks, validate, state=state
+            )
+
+        if process_contexts is None:
+            process_contexts = {}
 
         dsk = {}
         for p_name, p_deps in self._dep_processes.items():
-            dsk[p_name] = (exec_process, self._processes[p_name], self._state, p_deps)
+            dsk[p_name] = (
+                exec_process,
+                self._processes[p_name],
+                process_contexts.get(p_name, runtime_context),
+                self._state,
+                p_deps,
+            )
 
         # add a node to gather output state from all executed processes
-        dsk["_gather"] = (lambda out_states: dict(out_states), list(self._processes))
+        dsk["_gather"] = (
+            lambda results: {p_name: res for p_name, *res in results},
+            list(self._processes),
+        )
 
         return dsk
 
@@ -766,12 +996,18 @@ class Model(AttrMapping):
         """Collect, merge together and update model state from the output
         states returned by all executed processes (dask graph).
 
+        ``out_states`` is a dictionary of ``(state, signal)`` tuples with
+        process names as keys. Return a signal.
+
         """
         new_state = {}
+        signals = []
 
         # process order matters!
         for p_name in self._processes:
-            new_state.update(out_states[p_name])
+            p_state, p_signal = out_states[p_name]
+            new_state.update(p_state)
+            signals.append(p_signal)
 
         self._state.update(new_state)
 
@@ -780,6 +1016,8 @@ class Model(AttrMapping):
         for p_obj in self._processes.values():
             p_obj.__xsimlab_state__ = self._state
 
+        return merge_signals(signals)
+
     def execute(
         self,
         stage,
@@ -788,6 +1026,7 @@ class Model(AttrMapping):
         validate=False,
         parallel=False,
         scheduler=None,
+        process_contexts=None,
     ):
         """Run one stage of a simulation.
 
@@ -798,9 +1037,10 @@ class Model(AttrMapping):
         runtime_context : dict
             Dictionary containing runtime variables (e.g., time step
             duration, current step).
-        hooks : dict, optional
+        hooks : dict or :class:`~xsimlab.hook.HookTable`, optional
             Runtime hook callables, grouped by simulation stage, level and
-            trigger pre/post.
+            trigger pre/post. For running multiple stages, it is more
+            efficient to resolve those hooks once in a ``HookTable``.
         validate : bool, optional
             If True, run the variable validators in the corresponding
             processes after a process (maybe) sets values through its foreign
@@ -812,6 +1052,17 @@ class Model(AttrMapping):
         scheduler : str, optional
             Dask's scheduler used to run the stage in parallel
             (Dask's threads scheduler is used as failback).
+        process_contexts : dict, optional
+            Runtime contexts specific to some processes (e.g., processes
+            executed on their own clock), with process names as keys. A
+            process is not executed if its context is None.
+
+        Returns
+        -------
+        signal : :class:`~xsimlab.RuntimeSignal`
+            The signal with the highest priority returned by the process
+            runtime methods or runtime hook functions executed during this
+            stage (``RuntimeSignal.NONE`` if no signal has been returned).
 
         Notes
         -----
@@ -839,34 +1090,82 @@ class Model(AttrMapping):
         # TODO: issue warning if validate is True and "processes" or distributed scheduler
         # is used (not supported)
 
-        if hooks is None:
-            hooks = {}
+        stage = SimulationStage(stage)
 
-        dsk_get = dask.base.get_scheduler(scheduler=scheduler)
-        if dsk_get is None:
-            dsk_get = dask.threaded.get
+        if hooks and not isinstance(hooks, HookTable):
+            hook_table = HookTable(hooks, self, runtime_context)
+            try:
+                return self.execute(
+                    stage,
+                    runtime_context,
+                    hooks=hook_table,
+                    validate=validate,
+                    parallel=parallel,
+                    scheduler=scheduler,
+                    process_contexts=process_contexts,
+                )
+            finally:
+                hook_table.close()
 
-        stage = SimulationStage(stage)
-        execute_args = (stage, runtime_context, hooks, validate)
+        stage_hooks = hooks.get(stage) if hooks else None
+        execute_args = (stage, runtime_context, stage_hooks, validate)
+        signals = []
 
-        self._call_hooks(hooks, runtime_context, stage, "model", "pre")
+        if stage_hooks is not None:
+            signals.append(_call_hooks(stage_hooks.model_pre, stage_hooks.args))
 
         if parallel:
-            dsk = self._build_dask_graph(execute_args)
+            import dask.base
+            import dask.threaded
+
+            dsk_get = dask.base.get_scheduler(scheduler=scheduler)
+            if dsk_get is None:
+                dsk_get = dask.threaded.get
+
+            dsk = self._build_dask_graph(execute_args, process_contexts)
             out_states = dsk_get(dsk, "_gather", scheduler=scheduler)
 
             # TODO: without this -> flaky tests (don't know why)
             # state is not well updated -> error when writing output vars in store
-            if isinstance(scheduler, Client):
+            if _is_distributed_client(scheduler):
                 time.sleep(0.001)
 
-            self._merge_and_update_state(out_states)
+            signals.append(self._merge_and_update_state(out_states))
 
-        else:
+        elif process_contexts is not None:
             for p_name, p_obj in self._processes.items():
-                self._execute_process(p_obj, *execute_args)
+                p_context = process_contexts.get(p_name, runtime_context)
+
+                if p_context is not None:
+                    _, _, signal = self._execute_process(
+                        p_obj, stage, p_context, stage_hooks, validate
+                    )
+                    signals.append(signal)
 
-        self._call_hooks(hooks, runtime_context, stage, "model", "post")
+        elif validate or (
+            stage_hooks is not None
+            and (stage_hooks.process_pre or stage_hooks.process_post)
+        ):
+            for p_obj in self._processes.values():
+                _, _, signal = self._execute_process(p_obj, *execute_args)
+                signals.append(signal)
+
+        else:
+            # fast path: no process-level hook nor validation
+            for p_obj in self._processes.values():
+                if self._frozen:
+                    self._thaw(p_obj)
+                signals.append(
+                    p_obj.__xsimlab_executor__.run(p_obj, stage, runtime_context)
+                )
+
+        if stage == SimulationStage.INITIALIZE and self._options["packed_state"]:
+            self._state.pack()
+
+        if stage_hooks is not None:
+            signals.append(_call_hooks(stage_hooks.model_post, stage_hooks.args))
+
+        return merge_signals(signals)
 
     def clone(self):
         """Clone the Model.
@@ -877,8 +1176,58 @@ class Model(AttrMapping):
             New Model instance with the same processes.
 
         """
-        processes_cls = {k: type(obj) for k, obj in self._processes.items()}
-        return type(self)(processes_cls)
+        processes_cls = {k: get_process_cls(obj) for k, obj in self._processes.items()}
+        return type(self)(processes_cls, **self._options)
+
+    def fork(self):
+        """Fork the Model, i.e., clone it with its current state.
+
+        Like for state snapshots (see :meth:`Model.snapshot`), array values
+        are shared between this model and the forked model and are made
+        read-only. Those arrays are copied in the forked model only before
+        running a process that may update them (copy-on-write).
+
+        Other attributes of the process instances (i.e., not declared as
+        model variables) are also shared if they are arrays (made read-only)
+        or are shallow copies otherwise.
+
+        Returns
+        -------
+        forked : Model
+            New Model instance with the same processes and state.
+
+        Notes
+        -----
+        Updating in-place arrays that are shared with the forked model
+        (e.g., through variables with intent 'in' or through process instance
+        attributes) raises an error.
+
+        """
+        forked = self.clone()
+        snapshot = self.snapshot()
+
+        forked._state.update(snapshot)
+        forked._frozen = {k: v for k, v in snapshot.items() if self._frozen.get(k) is v}
+
+        if self._options["packed_state"]:
+            forked._state.pack()
+
+        for p_name, p_obj in self._processes.items():
+            forked_p_obj = forked._processes[p_name]
+
+            for attr_name, value in vars(p_obj).items():
+                if attr_name == "__xsimlab_fingerprints__":
+                    value = dict(value)
+                elif attr_name.startswith("__xsimlab_"):
+                    continue
+                elif isinstance(value, np.ndarray):
+                    value.flags.writeable = False
+                else:
+                    value = copy.copy(value)
+
+                vars(forked_p_obj)[attr_name] = value
+
+        return forked
 
     def update_processes(self, processes):
         """Add or replace processe(s) in this model.
@@ -895,9 +1244,9 @@ class Model(AttrMapping):
             New Model instance with updated processes.
 
         """
-        processes_cls = {k: type(obj) for k, obj in self._processes.items()}
+        processes_cls = {k: get_process_cls(obj) for k, obj in self._processes.items()}
         processes_cls.update(processes)
-        return type(self)(processes_cls)
+        return type(self)(processes_cls, **self._options)
 
     def drop_processes(self, keys):
         """Drop processe(s) from this model.
@@ -917,9 +1266,11 @@ class Model(AttrMapping):
             keys = [keys]
 
         processes_cls = {
-            k: type(obj) for k, obj in self._processes.items() if k not in keys
+            k: get_process_cls(obj)
+            for k, obj in self._processes.items()
+            if k not in keys
         }
-        return type(self)(processes_cls)
+        return type(self)(processes_cls, **self._options)
 
     def __eq__(self, other):
         if not isinstance(other, self.__class__):
@@ -928,7 +1279,7 @@ class Model(AttrMapping):
         for (k1, v1), (k2, v2) in zip(
             self._processes.items(), other._processes.items()
         ):
-            if k1 != k2 or type(v1) is not type(v2):
+            if k1 != k2 or get_process_cls(v1) is not get_process_cls(v2):
                 return False
 
         return True
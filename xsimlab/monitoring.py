@@ -1,7 +1,10 @@
+import numpy as np
+
 from xsimlab.hook import RuntimeHook, runtime_hook
+from xsimlab.process import RuntimeSignal
 
 
-__all__ = ("ProgressBar",)
+__all__ = ("ProgressBar", "SteadyState")
 
 
 class ProgressBar(RuntimeHook):
@@ -81,18 +84,22 @@ class ProgressBar(RuntimeHook):
     def update_init(self, mode, context, state):
         self.pbar_model.update(1)
 
-    @runtime_hook("run_step", trigger="post")
+    # refresh the progress bar at most every 0.1 second
+    # (the progress bar may be updated of several steps at once)
+    @runtime_hook("run_step", trigger="post", interval=0.1)
     def update_run_step(self, model, context, state):
         if not self.custom_description:
             self.pbar_model.set_description_str(
                 f"run step {context['step']}/{context['nsteps']}"
             )
-        self.pbar_model.update(1)
+        self.pbar_model.update(context["step"] + 2 - self.pbar_model.n)
 
     @runtime_hook("finalize", trigger="pre")
     def update_finalize(self, model, context, state):
         if not self.custom_description:
             self.pbar_model.set_description_str("finalize")
+        # maybe catch up with the last (skipped) step updates
+        self.pbar_model.update(self.pbar_model.total - 1 - self.pbar_model.n)
 
     @runtime_hook("finalize", trigger="post")
     def close_bar(self, model, context, state):
@@ -100,3 +107,87 @@ class ProgressBar(RuntimeHook):
         elapsed_time = self.tqdm.format_interval(self.pbar_model.format_dict["elapsed"])
         self.pbar_model.set_description_str(f"Simulation finished in {elapsed_time}")
         self.pbar_model.close()
+
+
+class SteadyState(RuntimeHook):
+    """
+    Stop a simulation early once it has reached a steady state.
+
+    The simulation is stopped at the end of the first time step for which the
+    change in the values of all the given variables is below a given tolerance,
+    i.e., ``abs(new - old) <= atol + rtol * abs(old)`` element-wise (see
+    :func:`numpy.allclose`). The 'finalize' stage is still executed and the
+    unused clock coordinates are trimmed from the output dataset (or marked
+    in the case of a batch of simulations).
+
+    Examples
+    --------
+
+    >>> from xsimlab.monitoring import SteadyState
+    >>> out_ds = in_ds.xsimlab.run(
+    ...     model=model, hooks=[SteadyState(["profile__u"], rtol=1e-6)]
+    ... )
+
+    """
+
+    def __init__(self, variables, rtol=1e-5, atol=0.0, every=1):
+        """
+        Parameters
+        ----------
+        variables : list
+            Model variables to check, given either as ``('p_name', 'var_name')``
+            tuples or ``'p_name__var_name'`` strings.
+        rtol : float, optional
+            Relative tolerance (default: 1e-5).
+        atol : float, optional
+            Absolute tolerance (default: 0).
+        every : int, optional
+            Compare the values every ``every`` time steps (default: 1).
+
+        """
+        from xsimlab.xr_accessor import as_variable_key
+
+        if isinstance(variables, (str, tuple)):
+            variables = [variables]
+
+        self.keys = [as_variable_key(v) for v in variables]
+        self.rtol = rtol
+        self.atol = atol
+        self.every = every
+
+        # values of the previous check for each simulation in a batch
+        self._previous = {}
+
+    def _get_values(self, state):
+        return [np.array(state[k], copy=True) for k in self.keys]
+
+    def _is_steady(self, values, previous):
+        return all(
+            v.shape == p.shape
+            and np.allclose(v, p, rtol=self.rtol, atol=self.atol, equal_nan=True)
+            for v, p in zip(values, previous)
+        )
+
+    @runtime_hook("initialize", trigger="post")
+    def init_values(self, model, context, state):
+        missing = [k for k in self.keys if k not in state]
+        if missing:
+            raise KeyError(f"Invalid variable(s) to check for steady state: {missing}")
+
+        self._previous[context["batch"]] = self._get_values(state)
+
+    @runtime_hook("finalize_step", trigger="post")
+    def check_values(self, model, context, state):
+        if (context["step"] + 1) % self.every:
+            return
+
+        values = self._get_values(state)
+        previous = self._previous[context["batch"]]
+        self._previous[context["batch"]] = values
+
+        if self._is_steady(values, previous):
+            return RuntimeSignal.BREAK
+
+    @runtime_hook("finalize", trigger="post")
+    def clear_values(self, model, context, state):
+        self._previous.pop(context["batch"], None)
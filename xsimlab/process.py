@@ -1,5 +1,6 @@
 from collections import OrderedDict
-from enum import Enum
+import copy
+from enum import Enum, IntEnum
 import inspect
 import sys
 import warnings
@@ -8,6 +9,7 @@ import attr
 
 from .variable import VarIntent, VarType
 from .formatting import add_attribute_section, repr_process, var_details
+from .state import _values_equal
 from .utils import has_method, variables_dict
 
 
@@ -256,6 +258,122 @@ def _make_property_group(var):
     return property(fget=getter_state_or_on_demand, doc=var_details(var))
 
 
+def _make_bound_property_variable(var, prop, state_key, od_key):
+    """Create a property for a variable (or foreign variable) with its
+    state or on-demand key already resolved.
+
+    """
+    var_converter = var.converter
+
+    if od_key is not None:
+        p_name, v_name = od_key
+
+        def get_on_demand(self):
+            return getattr(self.__xsimlab_model__._processes[p_name], v_name)
+
+        return property(fget=get_on_demand, doc=prop.__doc__)
+
+    def get_from_state(self):
+        return self.__xsimlab_state__[state_key]
+
+    if prop.fset is None:
+        return property(fget=get_from_state, doc=prop.__doc__)
+
+    if var_converter is None:
+
+        def put_in_state(self, value):
+            self.__xsimlab_state__[state_key] = value
+
+    else:
+
+        def put_in_state(self, value):
+            self.__xsimlab_state__[state_key] = var_converter(value)
+
+    return property(fget=get_from_state, fset=put_in_state, doc=prop.__doc__)
+
+
+def _make_bound_property_group(var, prop, state_keys, od_keys):
+    """Create a read-only property for a group variable with its state and
+    on-demand keys already resolved.
+
+    """
+    state_keys = tuple(state_keys)
+    od_keys = tuple(od_keys)
+
+    def getter_state_or_on_demand(self):
+        state = self.__xsimlab_state__
+
+        for key in state_keys:
+            yield state[key]
+
+        for p_name, v_name in od_keys:
+            yield getattr(self.__xsimlab_model__._processes[p_name], v_name)
+
+    return property(fget=getter_state_or_on_demand, doc=prop.__doc__)
+
+
+def _new_bound_process_obj(cls, state_keys, od_keys):
+    obj = cls.__new__(cls)
+    obj.__xsimlab_state_keys__ = state_keys
+    obj.__xsimlab_od_keys__ = od_keys
+    bind_process_keys(obj)
+
+    return obj
+
+
+def _reduce_bound_process(obj, protocol):
+    # a bound process class is created dynamically: pickle the object as an
+    # instance of its (unbound) process class and re-bind the keys on unpickle
+    args = (obj.__xsimlab_cls__, obj.__xsimlab_state_keys__, obj.__xsimlab_od_keys__)
+
+    return _new_bound_process_obj, args, obj.__dict__
+
+
+def bind_process_keys(obj):
+    """Bind the state and on-demand keys of all variables to a process
+    object attached to a model.
+
+    The object's class is replaced by a subclass in which each variable
+    property has its resolved key baked in, i.e., getting or setting a
+    variable value doesn't require looking up the key first.
+
+    This must be called after the keys have been set for the object
+    (i.e., ``__xsimlab_state_keys__`` and ``__xsimlab_od_keys__``).
+
+    """
+    cls = type(obj)
+    state_keys = obj.__xsimlab_state_keys__
+    od_keys = obj.__xsimlab_od_keys__
+
+    namespace = {
+        "__slots__": (),
+        "__module__": cls.__module__,
+        "__qualname__": cls.__qualname__,
+        "__xsimlab_process__": False,
+        "__xsimlab_cls__": cls,
+        "__reduce_ex__": _reduce_bound_process,
+    }
+
+    for var_name, var in variables_dict(cls).items():
+        var_type = var.metadata["var_type"]
+        prop = getattr(cls, var_name)
+
+        if var_type == VarType.ON_DEMAND:
+            continue
+
+        elif var_type == VarType.GROUP:
+            namespace[var_name] = _make_bound_property_group(
+                var, prop, state_keys.get(var_name, []), od_keys.get(var_name, [])
+            )
+
+        elif var_name in state_keys or var_name in od_keys:
+            namespace[var_name] = _make_bound_property_variable(
+                var, prop, state_keys.get(var_name), od_keys.get(var_name)
+            )
+
+    obj.__class__ = type(cls.__name__, (cls,), namespace)
+
+
 class _RuntimeMethodExecutor:
     """Used to execute a process 'runtime' method in the context of a
     simulation.
@@ -282,7 +400,7 @@ class _RuntimeMethodExecutor:
 
         args = [runtime_context[k] for k in self.args]
 
-        self.meth(obj, *args)
+        return self.meth(obj, *args)
 
 
 def runtime(meth=None, args=None):
@@ -314,6 +432,12 @@ def runtime(meth=None, args=None):
        The same method that can be called during a simulation
        with runtime data.
 
+    Notes
+    -----
+    A runtime method may return :attr:`RuntimeSignal.BREAK` or
+    :attr:`RuntimeSignal.ABORT` to stop the simulation early (see
+    :class:`RuntimeSignal`).
+
     """
 
     def wrapper(func):
@@ -333,6 +457,39 @@ class SimulationStage(Enum):
     FINALIZE = "finalize"
 
 
+class RuntimeSignal(IntEnum):
+    """Signals that may be returned by process runtime methods or by
+    runtime hook functions in order to control the execution of a
+    simulation.
+
+    - ``NONE``: no effect (same as returning None)
+    - ``BREAK``: stop the simulation at the end of the current time
+      step, i.e., once all processes have been executed for the 'run_step'
+      and 'finalize_step' stages. Outputs are saved for that step and the
+      'finalize' stage is still executed.
+    - ``ABORT``: same as ``BREAK``, except that the outputs are not saved at
+      the end of the simulation and that the simulation is marked as aborted
+      in the output dataset.
+
+    If several signals are returned during a simulation stage, the one with
+    the highest value (priority) is retained. Signals have no effect if
+    returned during the 'finalize' stage.
+
+    """
+
+    NONE = 0
+    BREAK = 1
+    ABORT = 2
+
+
+def merge_signals(signals):
+    """Return the signal with the highest priority from an iterable of
+    runtime signals (NONE if empty).
+
+    """
+    return max(signals, default=RuntimeSignal.NONE)
+
+
 def _create_runtime_executors(cls):
     runtime_executors = OrderedDict()
 
@@ -388,29 +545,127 @@ def _get_out_variables(cls):
     return filter_variables(cls, func=filter_out)
 
 
+def _get_in_variables(cls):
+    def filter_in(var):
+        var_type = var.metadata["var_type"]
+        var_intent = var.metadata["intent"]
+
+        if var_type != VarType.ON_DEMAND and var_intent != VarIntent.OUT:
+            return True
+        else:
+            return False
+
+    return filter_variables(cls, func=filter_in)
+
+
+_MISSING = object()
+
+
+def _copy_value(value):
+    try:
+        return copy.copy(value)
+    except Exception:
+        return value
+
+
+def _flatten_keys(keys):
+    for key in keys:
+        if isinstance(key, list):
+            yield from key
+        else:
+            yield key
+
+
 class _ProcessExecutor:
     """Used to execute a process during simulation runtime."""
 
-    def __init__(self, cls):
+    def __init__(self, cls, pure=False):
         self.cls = cls
         self.runtime_executors = _create_runtime_executors(cls)
         self.out_vars = _get_out_variables(cls)
+        self.in_vars = _get_in_variables(cls)
+        self.pure = pure
 
     @property
     def stages(self):
         return [k.value for k in self.runtime_executors]
 
-    def execute(self, obj, stage, runtime_context, state=None):
+    def run(self, obj, stage, runtime_context, state=None):
+        """Execute the runtime method of a process (if any) for a given
+        simulation stage and return its signal.
+
+        """
         executor = self.runtime_executors.get(stage)
 
         if executor is None:
-            return {}
+            return RuntimeSignal.NONE
+
+        if self.pure:
+            signal = self._run_pure(obj, stage, executor, runtime_context, state)
         else:
-            executor.execute(obj, runtime_context, state=state)
+            signal = executor.execute(obj, runtime_context, state=state)
+
+        if isinstance(signal, RuntimeSignal):
+            return signal
+        else:
+            return RuntimeSignal.NONE
+
+    def _get_fingerprint(self, obj, var_names, sobj):
+        skeys = [obj.__xsimlab_state_keys__[k] for k in var_names]
+        return {k: sobj.get(k, _MISSING) for k in _flatten_keys(skeys)}
+
+    def _run_pure(self, obj, stage, executor, runtime_context, state):
+        # skip execution if neither the inputs read by the process nor its
+        # outputs have changed since its last execution for the same stage
+        if state is not None:
+            obj.__xsimlab_state__ = state
+
+        if any(k in obj.__xsimlab_od_keys__ for k in self.in_vars):
+            # values computed on demand can't be fingerprinted
+            return executor.execute(obj, runtime_context)
 
-            skeys = [obj.__xsimlab_state_keys__[k] for k in self.out_vars]
-            sobj = obj.__xsimlab_state__
-            return {k: sobj[k] for k in skeys if k in sobj}
+        sobj = obj.__xsimlab_state__
+        inputs = self._get_fingerprint(obj, self.in_vars, sobj)
+        inputs.update({("__runtime__", k): runtime_context[k] for k in executor.args})
+
+        last = obj.__xsimlab_fingerprints__.get(stage)
+
+        if last is not None:
+            last_inputs, last_outputs = last
+            current = [
+                (inputs, last_inputs),
+                (self._get_fingerprint(obj, self.out_vars, sobj), last_outputs),
+            ]
+
+            if all(
+                d.keys() == last_d.keys()
+                and all(_values_equal(v, last_d[k]) for k, v in d.items())
+                for d, last_d in current
+            ):
+                return RuntimeSignal.NONE
+
+        inputs = {k: _copy_value(v) for k, v in inputs.items()}
+        signal = executor.execute(obj, runtime_context)
+
+        outputs = {
+            k: _copy_value(v)
+            for k, v in self._get_fingerprint(obj, self.out_vars, sobj).items()
+        }
+        obj.__xsimlab_fingerprints__[stage] = (inputs, outputs)
+
+        return signal
+
+    def get_out_state(self, obj):
+        skeys = [obj.__xsimlab_state_keys__[k] for k in self.out_vars]
+        sobj = obj.__xsimlab_state__
+        return {k: sobj[k] for k in skeys if k in sobj}
+
+    def execute(self, obj, stage, runtime_context, state=None):
+        if stage not in self.runtime_executors:
+            return {}
+        else:
+            self.run(obj, stage, runtime_context, state=state)
+            return self.get_out_state(obj)
 
 
 def _process_cls_init(obj):
@@ -433,6 +688,9 @@ def _process_cls_init(obj):
         Dictionary that maps variable names to the location of their target
         on-demand variable (or a list of locations for group variables).
         Locations are tuples like state keys.
+    __xsimlab_fingerprints__ : dict
+        Copies of the input and output values of a pure process at its last
+        execution, per simulation stage.
 
     """
     obj.__xsimlab_model__ = None
@@ -440,6 +698,7 @@ def _process_cls_init(obj):
     obj.__xsimlab_state__ = None
     obj.__xsimlab_state_keys__ = {}
     obj.__xsimlab_od_keys__ = {}
+    obj.__xsimlab_fingerprints__ = {}
 
 
 class _ProcessBuilder:
@@ -461,8 +720,9 @@ class _ProcessBuilder:
         VarType.GROUP: _make_property_group,
     }
 
-    def __init__(self, attr_cls):
+    def __init__(self, attr_cls, pure=False):
         self._base_cls = attr_cls
+        self._pure = pure
         self._p_cls_dict = {}
 
     def _reset_attributes(self):
@@ -492,7 +752,7 @@ class _ProcessBuilder:
         setattr(p_cls, "__init__", _process_cls_init)
         setattr(p_cls, "__repr__", repr_process)
         setattr(p_cls, "__xsimlab_process__", True)
-        setattr(p_cls, "__xsimlab_executor__", _ProcessExecutor(p_cls))
+        setattr(p_cls, "__xsimlab_executor__", _ProcessExecutor(p_cls, pure=self._pure))
 
         return p_cls
 
@@ -520,7 +780,7 @@ class _ProcessBuilder:
         return p_cls
 
 
-def process(maybe_cls=None, autodoc=True):
+def process(maybe_cls=None, autodoc=True, pure=False):
     """A class decorator that adds everything needed to use the class
     as a process.
 
@@ -550,13 +810,25 @@ def process(maybe_cls=None, autodoc=True):
         (default: True) Automatically adds an attributes section to the
         docstring of the class to which the decorator is applied, using the
         metadata of each variable declared in the class.
+    pure : bool, optional
+        If True, the runtime methods of the process are assumed to depend
+        only on the values of the process input variables (and runtime
+        arguments) and to have no other side effect than setting the
+        values of its output variables (default: False). At each stage of a
+        simulation, the execution of the process is skipped if none of those
+        inputs and outputs have changed since the last execution of the
+        process for the same stage, i.e., the previous output values are
+        kept. Note that the fingerprint of inputs and outputs involves
+        copying and comparing their values, which may be costly for large
+        arrays. Processes that get values from on-demand variables are
+        always executed.
 
     """
 
     def wrap(cls):
         attr_cls = attr.attrs(cls, repr=False)
 
-        builder = _ProcessBuilder(attr_cls)
+        builder = _ProcessBuilder(attr_cls, pure=pure)
 
         builder.add_properties()
 
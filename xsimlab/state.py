@@ -0,0 +1,237 @@
+from collections import defaultdict
+
+import numpy as np
+
+
+def _is_packable(value):
+    # read-only arrays (e.g., shared with other states) are not packed
+    return (
+        isinstance(value, np.ndarray)
+        and value.dtype.kind in "biufc"
+        and value.flags.writeable
+    )
+
+
+def _make_view(buffer, offset, shape):
+    return np.ndarray(shape, buffer.dtype, buffer, offset * buffer.itemsize)
+
+
+def _values_equal(value, other):
+    if value is other:
+        return True
+
+    try:
+        if isinstance(value, np.ndarray) or isinstance(other, np.ndarray):
+            try:
+                return np.array_equal(value, other, equal_nan=True)
+            except TypeError:
+                return np.array_equal(value, other)
+        return bool(value == other)
+    except (TypeError, ValueError):
+        return False
+
+
+def _rebuild_packed_state(buffers, slots, values):
+    state = PackedState(values)
+    state._set_layout(buffers, slots)
+    return state
+
+
+class PackedState(dict):
+    """Model state where numeric arrays are packed in contiguous buffers.
+
+    This is a dictionary that may be used as an alternative backend for the
+    state of a :class:`~xsimlab.Model` (see the ``packed_state`` option).
+
+    After calling :meth:`PackedState.pack`, all numeric (i.e., boolean,
+    integer, float or complex) and writeable :class:`numpy.ndarray` values
+    are packed into one contiguous buffer per data type and the state values
+    become views of those buffers. Assigning a new array with the same shape and
+    data type to a packed variable copies the data into the buffer.
+    Assigning any other value unpacks the variable.
+
+    Copying, comparing, restoring or pickling the whole state then mostly
+    consists of a few operations on large buffers.
+
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        self._buffers = {}
+        self._slots = {}
+
+    def __setitem__(self, key, value):
+        slot = self._slots.get(key)
+
+        if slot is not None:
+            view = dict.__getitem__(self, key)
+
+            if value is view:
+                return
+
+            elif (
+                isinstance(value, np.ndarray)
+                and value.shape == view.shape
+                and value.dtype == view.dtype
+            ):
+                view[...] = value
+                return
+
+            del self._slots[key]
+
+        super().__setitem__(key, value)
+
+    def __delitem__(self, key):
+        self._slots.pop(key, None)
+        super().__delitem__(key)
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def pop(self, key, *args):
+        self._slots.pop(key, None)
+        return super().pop(key, *args)
+
+    def popitem(self):
+        key, value = super().popitem()
+        self._slots.pop(key, None)
+        return key, value
+
+    def clear(self):
+        super().clear()
+        self._buffers = {}
+        self._slots = {}
+
+    def _set_layout(self, buffers, slots):
+        self._buffers = buffers
+        self._slots = slots
+
+        for key, (dtype, offset, shape) in slots.items():
+            dict.__setitem__(self, key, _make_view(buffers[dtype], offset, shape))
+
+    @property
+    def buffers(self):
+        """Returns a dictionary of the contiguous buffers (1-d arrays) in which
+        the values are packed, with data types as keys.
+        """
+        return dict(self._buffers)
+
+    @property
+    def packed_keys(self):
+        """Returns the keys of all variables which values are currently packed."""
+        return list(self._slots)
+
+    def pack(self):
+        """(Re)pack all numeric arrays of the state into contiguous buffers.
+
+        Values are copied into the new buffers. Note that all references to
+        the current arrays (e.g., kept as other process attributes) are no
+        longer in sync with the state after packing. This also applies to
+        variables that currently share the same array.
+
+        """
+        keys_by_dtype = defaultdict(list)
+
+        for key, value in dict.items(self):
+            if _is_packable(value):
+                keys_by_dtype[value.dtype].append(key)
+
+        buffers = {}
+        slots = {}
+
+        for dtype, keys in keys_by_dtype.items():
+            values = [dict.__getitem__(self, k) for k in keys]
+            offsets = np.cumsum([0] + [v.size for v in values])
+            buffer = np.empty(offsets[-1], dtype=dtype)
+
+            for key, value, offset in zip(keys, values, offsets):
+                buffer[offset : offset + value.size] = value.ravel()
+                slots[key] = (dtype, int(offset), value.shape)
+
+            buffers[dtype] = buffer
+
+        self._set_layout(buffers, slots)
+
+    def _has_same_layout(self, other):
+        return isinstance(other, PackedState) and other._slots == self._slots
+
+    def copy(self):
+        """Returns a copy of this state.
+
+        Packed values are copied (buffer copy). Other values are not copied
+        (shallow copy).
+
+        """
+        values = {k: v for k, v in dict.items(self) if k not in self._slots}
+        buffers = {dtype: buf.copy() for dtype, buf in self._buffers.items()}
+
+        return _rebuild_packed_state(buffers, dict(self._slots), values)
+
+    __copy__ = copy
+
+    def __reduce__(self):
+        values = {k: v for k, v in dict.items(self) if k not in self._slots}
+        return _rebuild_packed_state, (self._buffers, self._slots, values)
+
+    def restore(self, other):
+        """Set the values of this state from another state (e.g., a copy
+        returned by :meth:`PackedState.copy`).
+
+        If both states have the same layout, packed values are restored
+        by copying the buffers.
+
+        """
+        if self._has_same_layout(other):
+            for dtype, buffer in self._buffers.items():
+                np.copyto(buffer, other._buffers[dtype])
+
+            keys = [k for k in other if k not in self._slots]
+        else:
+            keys = list(other)
+
+        for key in keys:
+            self[key] = other[key]
+
+    def diff(self, other):
+        """Returns the keys of the variables which values differ between
+        this state and another state (mapping).
+
+        If both states have the same layout, packed values are compared
+        buffer-wise.
+
+        """
+        changed = set(self).symmetric_difference(other)
+
+        if self._has_same_layout(other):
+            for dtype, buffer in self._buffers.items():
+                other_buffer = other._buffers[dtype]
+                neq = buffer != other_buffer
+
+                if dtype.kind in "fc":
+                    neq &= ~(np.isnan(buffer) & np.isnan(other_buffer))
+
+                idx = np.flatnonzero(neq)
+
+                if idx.size:
+                    keys = [k for k, s in self._slots.items() if s[0] == dtype]
+                    starts = np.array([self._slots[k][1] for k in keys])
+                    order = np.argsort(starts, kind="stable")
+                    pos = np.searchsorted(starts[order], idx, side="right") - 1
+                    changed.update(keys[order[i]] for i in np.unique(pos))
+
+            keys = [k for k in self if k not in self._slots]
+        else:
+            keys = self
+
+        for key in keys:
+            if key in other and not _values_equal(self[key], other[key]):
+                changed.add(key)
+
+        return changed
@@ -1,19 +1,46 @@
+from collections import defaultdict
 from collections.abc import MutableMapping
-from typing import Any, Dict, Optional, Tuple, Union
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from enum import Enum
+from functools import reduce
+import hashlib
+import itertools
+from math import gcd
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple, Union
 
 import numpy as np
 import xarray as xr
-import zarr
 
 from . import Model
+from .state import _values_equal
 from .utils import get_batch_size, normalize_encoding
 from .variable import VarType
 
+if TYPE_CHECKING:
+    import zarr
+
 
 VarKey = Tuple[str, str]
 EncodingDict = Dict[str, Dict[str, Any]]
 
 _DIMENSION_KEY = "_ARRAY_DIMENSIONS"
+_INPUT_REFS_KEY = "__xsimlab_input_refs__"
+_RAGGED_KEY = "__xsimlab_ragged__"
+_PACKED_KEY = "__xsimlab_packed__"
+_PACKED_ATTRS_KEY = "__xsimlab_packed_attrs__"
+_RECHUNK_KEY = "__xsimlab_rechunk__"
+_RECHUNK_OLD_KEY = "__xsimlab_rechunk_old__"
+_CLOCK_KEY = "__xsimlab_output_clock__"
+_END_STEP_KEY = "__xsimlab_end_step__"
+_STATUS_KEY = "__xsimlab_status__"
+_STATUS_VALUES = ("completed", "stopped", "aborted")
+
+
+class StoreInputsOption(Enum):
+    COPY = "copy"
+    REFERENCE = "reference"
+    SKIP = "skip"
 
 
 def _get_var_info(
@@ -34,14 +61,24 @@ def _get_var_info(
         )
 
         # encoding defined in model variable + update
-        v_encoding = var_cache["metadata"]["encoding"]
+        # (copy: do not update the variable metadata in place)
+        v_encoding = dict(var_cache["metadata"]["encoding"])
         v_encoding.update(run_encoding)
 
+        ragged = bool(v_encoding.pop("ragged", False))
+
+        if ragged and clock is None:
+            raise ValueError(
+                f"Ragged encoding set for variable '{var_cache['name']}', "
+                "which is not saved at clock coordinate values"
+            )
+
         var_info[var_key] = {
             "clock": clock,
             "name": var_cache["name"],
             "metadata": var_cache["metadata"],
             "encoding": v_encoding,
+            "ragged": ragged,
         }
 
     return var_info
@@ -71,10 +108,345 @@ def default_fill_value_from_dtype(dtype=None):
         return 0
 
 
-def get_auto_chunks(shape, dtype):
-    # A hack to get chunks guessed by zarr
-    arr = zarr.create(shape, dtype=dtype)
-    return arr.chunks
+def _get_checksum(value: Any) -> str:
+    arr = np.ascontiguousarray(value)
+
+    h = hashlib.sha1(str((arr.dtype.str, arr.shape)).encode())
+    h.update(arr.tobytes())
+
+    return h.hexdigest()
+
+
+def _is_dask_array(obj):
+    return type(obj).__module__.startswith("dask.array")
+
+
+def _unwrap_zarr_array(obj):
+    """Follow the chain of xarray's lazy array wrappers and return the
+    zarr array at the end of the chain, or None if there's no such array
+    or if the wrapped array is only a subset of the zarr array.
+
+    """
+    while obj is not None:
+        key = getattr(obj, "key", None)
+
+        if key is not None and any(
+            not isinstance(k, slice) or k != slice(None) for k in key.tuple
+        ):
+            return None
+
+        if hasattr(obj, "get_array") and hasattr(obj, "datastore"):
+            return obj.get_array()
+
+        obj = getattr(obj, "array", None)
+
+    return None
+
+
+def get_zarr_source(xr_var: xr.Variable) -> Optional["zarr.Array"]:
+    """Return the zarr array from which the data of a (lazily loaded)
+    xarray variable is read, or None if the variable is not fully backed
+    by a zarr array.
+
+    """
+    data = xr_var._data
+
+    if _is_dask_array(data):
+        layers = data.dask.layers
+
+        # only direct reads (no other operation in the task graph)
+        if len(layers) != 2:
+            return None
+
+        zarray = None
+        for layer in layers.values():
+            if len(layer) == 1:
+                zarray = _unwrap_zarr_array(next(iter(layer.values())))
+            if zarray is not None:
+                break
+    else:
+        zarray = _unwrap_zarr_array(data)
+
+    if zarray is None or zarray.shape != xr_var.shape:
+        return None
+
+    return zarray
+
+
+class ChunkHint(Enum):
+    AUTO = "auto"
+    TIME_SERIES = "time_series"
+    SNAPSHOT = "snapshot"
+    BATCH_MAJOR = "batch_major"
+
+
+class ChunkPolicy:
+    """Define the default chunk layout of the zarr arrays created in a
+    simulation store for model outputs.
+
+    Chunk shapes are computed analytically from the shape and dtype of the
+    arrays, so that chunks have a size close to (but not larger than) a target
+    size in bytes, and are cached.
+
+    Parameters
+    ----------
+    hint : {'auto', 'time_series', 'snapshot', 'batch_major'}, optional
+        Expected access pattern when reading the outputs:
+
+        - 'auto': chunk layout guessed by zarr (default)
+        - 'time_series': chunks span as many clock coordinates as possible
+        - 'snapshot': one clock coordinate per chunk, chunks span as many
+          elements as possible along the other dimensions
+        - 'batch_major': chunks span ``batch_chunk_size`` simulations in a
+          batch (the simulations of one chunk are run one after each other)
+
+    target_bytes : int, optional
+        Target size of the chunks in bytes (default: 1 MiB). For the 'auto'
+        hint, this is ignored unless it is given explicitly.
+    batch_chunk_size : int, optional
+        Size of the chunks along the batch dimension, only used with the
+        'batch_major' hint (default: 16).
+
+    Notes
+    -----
+    Chunks set explicitly via the ``encoding`` options of a variable have
+    precedence over this policy.
+
+    """
+
+    def __init__(self, hint="auto", target_bytes=None, batch_chunk_size=16):
+        self.hint = ChunkHint(hint)
+        self._auto_target = target_bytes is None
+        self.target_bytes = int(target_bytes or 2 ** 20)
+        self.batch_chunk_size = batch_chunk_size
+        self._cache = {}
+
+    def get_batch_chunk_size(self, batch_size: int) -> int:
+        if self.hint == ChunkHint.BATCH_MAJOR:
+            return max(1, min(self.batch_chunk_size, batch_size))
+        else:
+            return 1
+
+    def _fit(self, shape, itemsize, order):
+        # shrink chunks along the given dimensions (in order) until the
+        # target size is reached
+        chunks = [max(n, 1) for n in shape]
+        target = max(self.target_bytes // itemsize, 1)
+
+        for dim in order:
+            others = int(np.prod(chunks)) // chunks[dim]
+            if others * chunks[dim] <= target:
+                break
+            chunks[dim] = max(target // others, 1)
+
+        return chunks
+
+    def _halve(self, shape, itemsize):
+        # halve the largest chunk dimension until the target size is reached
+        chunks = [max(n, 1) for n in shape]
+        target = max(self.target_bytes // itemsize, 1)
+
+        while int(np.prod(chunks)) > target and max(chunks) > 1:
+            dim = int(np.argmax(chunks))
+            chunks[dim] = -(-chunks[dim] // 2)
+
+        return chunks
+
+    def get_chunks(
+        self, shape: Tuple[int, ...], dtype: Any, clock: Optional[str] = None
+    ) -> Tuple[int, ...]:
+        """Return the chunk shape of an array.
+
+        Parameters
+        ----------
+        shape : tuple
+            Shape of the array, without the batch dimension and including the
+            clock dimension (first) if ``clock`` is not None.
+        dtype : dtype
+            Array data type.
+        clock : str, optional
+            Name of the clock dimension, if any.
+
+        """
+        dtype = np.dtype(dtype)
+        key = (tuple(shape), dtype.str, clock)
+
+        if key in self._cache:
+            return self._cache[key]
+
+        itemsize = max(dtype.itemsize, 1)
+        ndim = len(shape)
+
+        if self.hint == ChunkHint.AUTO and self._auto_target:
+            from zarr.util import guess_chunks
+
+            chunks = guess_chunks(shape, itemsize)
+        elif clock is None or self.hint in (ChunkHint.AUTO, ChunkHint.BATCH_MAJOR):
+            chunks = self._halve(shape, itemsize)
+        elif self.hint == ChunkHint.TIME_SERIES:
+            # shrink other dimensions (leading dimensions first) before clock
+            chunks = self._fit(shape, itemsize, list(range(1, ndim)) + [0])
+        else:
+            # snapshot: one clock coordinate per chunk
+            chunks = self._fit([1] + list(shape[1:]), itemsize, range(1, ndim))
+
+        chunks = tuple(int(c) for c in chunks)
+        self._cache[key] = chunks
+
+        return chunks
+
+    def __repr__(self):
+        return (
+            f"ChunkPolicy(hint={self.hint.value!r}, "
+            f"target_bytes={self.target_bytes}, "
+            f"batch_chunk_size={self.batch_chunk_size})"
+        )
+
+
+def _as_chunk_policy(obj):
+    if obj is None:
+        return ChunkPolicy()
+    elif isinstance(obj, ChunkPolicy):
+        return obj
+    elif isinstance(obj, str):
+        return ChunkPolicy(hint=obj)
+    else:
+        return ChunkPolicy(**obj)
+
+
+def _decode_ragged(values, offsets, size, fill_value, batch=None):
+    """Return a padded array from the flat values and offsets of a ragged
+    variable (i.e., ``values[offsets[i]:offsets[i + 1]]`` for each
+    clock index ``i``).
+
+    ``values`` may be a zarr array, in which case only the data of the given
+    batch member (if any) is read.
+
+    """
+    # offsets not written (e.g., unused clock indexes) are left to zero
+    offsets = np.maximum.accumulate(offsets)
+    counts = np.diff(offsets)
+
+    if batch is None:
+        flat_values = values[: offsets[-1]]
+    else:
+        flat_values = values[batch, : offsets[-1]]
+
+    padded = np.full(
+        (counts.size, size) + flat_values.shape[1:],
+        fill_value,
+        dtype=flat_values.dtype,
+    )
+
+    rows = np.repeat(np.arange(counts.size), counts)
+    cols = np.arange(offsets[-1]) - np.repeat(offsets[:-1], counts)
+    padded[rows, cols] = flat_values
+
+    return padded
+
+
+def _get_batch_chunk_size(encoding, batch_size, default=1):
+    """Return the chunk size along the batch dimension set in the
+    encoding of a variable.
+
+    """
+    chunks = encoding.get("chunks")
+
+    if chunks is None or chunks is True:
+        return default
+    if isinstance(chunks, int):
+        size = chunks
+    else:
+        size = chunks[0]
+
+    if size is None or size == -1:
+        return batch_size
+
+    return size
+
+
+def _merge_attrs(attrs, other):
+    """Merge two dictionaries of attributes, dropping conflicting items
+    (i.e., same as ``combine_attrs="drop_conflicts"`` in recent versions of
+    xarray).
+
+    """
+    merged = dict(attrs)
+    conflicts = set()
+
+    for k, v in other.items():
+        if k not in merged:
+            merged[k] = v
+        elif not _values_equal(merged[k], v):
+            conflicts.add(k)
+
+    for k in conflicts:
+        del merged[k]
+
+    return merged
+
+
+def _get_ragged_chunks(chunks, default):
+    """Return the chunks of the flat values of a ragged variable with a
+    batch dimension, from the chunks set in its encoding.
+
+    The chunk size along the batch dimension is always 1: the values
+    of each batch member are appended independently of the other members,
+    which may run in different batch groups.
+
+    """
+    if chunks is True or chunks is None:
+        chunks = default
+    elif isinstance(chunks, int):
+        chunks = [chunks] * len(default)
+
+    return [1] + list(chunks)[1:]
+
+
+class _BatchGroupBuffer:
+    """Accumulates in memory the output values of a group of batch
+    members, which are then written at once as whole zarr chunks.
+
+    """
+
+    def __init__(self, batches):
+        self.start = batches[0]
+        self.size = len(batches)
+        self.arrays = {}
+
+    def write(self, zarray, idx, value):
+        shape = (self.size,) + zarray.shape[1:]
+        buf = self.arrays.get(zarray.path)
+
+        if buf is None or buf.shape != shape:
+            fill_value = zarray.fill_value
+            if fill_value is None:
+                fill_value = 0
+
+            new_buf = np.full(shape, fill_value, dtype=zarray.dtype)
+
+            if buf is not None:
+                new_buf[tuple(slice(0, n) for n in buf.shape)] = buf
+
+            buf = new_buf
+            self.arrays[zarray.path] = buf
+
+        if isinstance(idx, tuple):
+            local_idx = (idx[0] - self.start,) + idx[1:]
+        else:
+            local_idx = idx - self.start
+
+        buf[local_idx] = value
+
+    def flush(self, zgroup):
+        prefix = zgroup.path + "/" if zgroup.path else ""
+
+        for path, buf in self.arrays.items():
+            region = (slice(self.start, self.start + self.size),)
+            region += tuple(slice(0, n) for n in buf.shape[1:])
+            zgroup[path[len(prefix) :]][region] = buf
+
+        self.arrays.clear()
 
 
 class DummyLock:
@@ -101,11 +473,17 @@ class ZarrSimulationStore:
         self,
         dataset: xr.Dataset,
         model: Model,
-        zobject: Optional[Union[zarr.Group, MutableMapping, str]] = None,
+        zobject: Optional[Union["zarr.Group", MutableMapping, str]] = None,
         encoding: Optional[EncodingDict] = None,
         batch_dim: Optional[str] = None,
         lock: Optional[Any] = None,
+        store_inputs: Union[StoreInputsOption, str] = StoreInputsOption.COPY,
+        check_index_vars: bool = False,
+        chunk_policy: Optional[Union[ChunkPolicy, str, Dict[str, Any]]] = None,
+        pack_scalars: bool = False,
     ):
+        import zarr
+
         self.dataset = dataset
         self.model = model
 
@@ -130,6 +508,9 @@ class ZarrSimulationStore:
 
         self.batch_dim = batch_dim
         self.batch_size = get_batch_size(dataset, batch_dim)
+        self.chunk_policy = _as_chunk_policy(chunk_policy)
+        self.batch_group_size = self._get_batch_group_size()
+        self._batch_buffers = {}
 
         self.mclock_dim = dataset.xsimlab.master_clock_dim
         self.clock_sizes = dataset.xsimlab.clock_sizes
@@ -146,18 +527,90 @@ class ZarrSimulationStore:
         else:
             self.lock = lock
 
+        self.store_inputs = StoreInputsOption(store_inputs)
+
+        # input variables not written in the zarr group
+        # (merged back when opening the store as a xarray Dataset)
+        self.input_refs = xr.Dataset()
+
+        # names of the zarr arrays known to exist in the zarr group
+        self._zarr_arrays = set()
+
+        # index variables are written once (batch-invariant)
+        self.check_index_vars = check_index_vars
+        self._index_checksums = {}
+
+        # current end position in the flat values of ragged variables
+        self._ragged_ends = defaultdict(int)
+
+        # master clock index at the end of simulations stopped early
+        self._end_steps = {}
+
+        # scalar outputs packed in one array per clock
+        self.pack_scalars = pack_scalars
+        self._packed_arrays = {}
+
+    def _get_batch_group_size(self):
+        # smallest group of batch members that is aligned with the
+        # chunks of all output variables along the batch dimension
+        if self.batch_dim is None:
+            return 1
+
+        default = self.chunk_policy.get_batch_chunk_size(self.batch_size)
+
+        sizes = [
+            _get_batch_chunk_size(vi["encoding"], self.batch_size, default)
+            for vi in self.var_info.values()
+            if vi["metadata"]["var_type"] != VarType.INDEX and not vi["ragged"]
+        ]
+
+        lcm = reduce(lambda a, b: a * b // gcd(a, b), sizes, 1)
+
+        return min(lcm, self.batch_size)
+
+    def get_batch_groups(self):
+        """Iterate over groups of batch members (lists of indices) such that
+        each group covers whole chunks along the batch dimension of all output
+        variables.
+
+        """
+        n = self.batch_group_size
+
+        for i in range(0, self.batch_size, n):
+            yield list(range(i, min(i + n, self.batch_size)))
+
+    @contextmanager
+    def buffer_batch_group(self, batches):
+        """Context manager that accumulates in memory the output values of a
+        group of batch members and writes them as whole chunks on exit.
+
+        If ``batches`` is a group returned by :meth:`get_batch_groups`, no other
+        group writes to the same chunks, so that the output values can be
+        written concurrently without any lock (only the creation and the resizing
+        of zarr arrays, i.e., metadata updates, are protected by the lock).
+
+        """
+        buffer = _BatchGroupBuffer(batches)
+
+        for batch in batches:
+            self._batch_buffers[batch] = buffer
+
+        try:
+            yield buffer
+            buffer.flush(self.zgroup)
+        finally:
+            for batch in batches:
+                self._batch_buffers.pop(batch, None)
+
     def _init_clock_incrementers(self):
+        # incrementers are lazily set for each batch member, which may be
+        # many when running large parameter sweeps
         clock_incs = {}
 
         clock_keys = list(self.dataset.xsimlab.clock_coords) + [None]
 
         for clock in clock_keys:
-            clock_incs[clock] = {}
-
-            batch_keys = range(self.batch_size) if self.batch_dim else [-1]
-
-            for batch in batch_keys:
-                clock_incs[clock][batch] = 0
+            clock_incs[clock] = defaultdict(int)
 
         return clock_incs
 
@@ -169,8 +622,43 @@ class ZarrSimulationStore:
         # remove xarray-simlab reserved attributes for output variables
         ds.xsimlab._reset_output_vars(self.model, {})
 
+        if self.store_inputs == StoreInputsOption.SKIP:
+            self.input_refs = ds
+            return
+
+        ref_attrs = {}
+
+        if self.store_inputs == StoreInputsOption.REFERENCE:
+            ref_names = []
+
+            for name, xr_var in ds.data_vars.items():
+                zarray = get_zarr_source(xr_var.variable)
+                if zarray is None:
+                    continue
+
+                ref_names.append(name)
+
+                zpath = getattr(zarray.chunk_store, "path", None)
+                if zpath is not None:
+                    ref_attrs[name] = {"store": str(zpath), "path": zarray.path}
+
+            if ref_names:
+                self.input_refs = ds[ref_names]
+                ds = ds.drop(ref_names)
+
         ds.to_zarr(self.zgroup.store, group=self.zgroup.path, mode="a")
 
+        if self.store_inputs == StoreInputsOption.REFERENCE and ref_attrs:
+            self.zgroup.attrs[_INPUT_REFS_KEY] = ref_attrs
+
+    def _has_zarr_dataset(self, name: str) -> bool:
+        # the zarr array may have been created by another simulation in a batch
+        # (possibly from another process, hence the fallback to a store lookup)
+        if name not in self._zarr_arrays and name in self.zgroup:
+            self._zarr_arrays.add(name)
+
+        return name in self._zarr_arrays
+
     def _create_zarr_dataset(
         self, model: Model, var_key: VarKey, name: Optional[str] = None
     ):
@@ -179,12 +667,15 @@ class ZarrSimulationStore:
         if name is None:
             name = var_info["name"]
 
+        if self._has_zarr_dataset(name):
+            # already existing dataset (batches of simulations)
+            return
+
         value = model.cache[var_key]["value"]
         clock = var_info["clock"]
 
         dtype = getattr(value, "dtype", np.asarray(value).dtype)
         shape = list(np.shape(value))
-        chunks = list(get_auto_chunks(shape, dtype))
 
         add_batch_dim = (
             self.batch_dim is not None
@@ -193,11 +684,13 @@ class ZarrSimulationStore:
 
         if clock is not None:
             shape.insert(0, self.clock_sizes[clock])
-            chunks = list(get_auto_chunks(shape, dtype))
+
+        chunks = list(self.chunk_policy.get_chunks(shape, dtype, clock=clock))
+
         if add_batch_dim:
             shape.insert(0, self.batch_size)
-            # by default: chunk of length 1 along batch dimension
-            chunks.insert(0, 1)
+            # aligned with the groups of batch members buffered in memory
+            chunks.insert(0, self.chunk_policy.get_batch_chunk_size(self.batch_size))
 
         zkwargs = {
             "shape": tuple(shape),
@@ -209,13 +702,17 @@ class ZarrSimulationStore:
 
         zkwargs.update(var_info["encoding"])
 
-        try:
-            zdataset = self.zgroup.create_dataset(name, **zkwargs)
-        except ValueError:
-            # return early if already existing dataset (batches of simulations)
-            return
+        zdataset = self.zgroup.create_dataset(name, **zkwargs)
+        self._zarr_arrays.add(name)
 
         # add dimension labels and variable attributes as metadata
+        dim_labels = self._get_dim_labels(var_info, value, name, add_batch_dim)
+        self._set_zarr_attrs(zdataset, var_info, dim_labels)
+
+        # reset consolidated since metadata has just been updated
+        self.consolidated = False
+
+    def _get_dim_labels(self, var_info, value, name, add_batch_dim):
         dim_labels = None
 
         for dims in var_info["metadata"]["dims"]:
@@ -224,24 +721,236 @@ class ZarrSimulationStore:
 
         if dim_labels is None:
             raise ValueError(
-                f"Output array of {value.ndim} dimension(s) "
+                f"Output array of {np.ndim(value)} dimension(s) "
                 f"for variable '{name}' doesn't match any of "
                 f"its accepted dimension(s): {var_info['metadata']['dims']}"
             )
 
-        if clock is not None:
-            dim_labels.insert(0, clock)
+        if var_info["clock"] is not None:
+            dim_labels.insert(0, var_info["clock"])
         if add_batch_dim:
             dim_labels.insert(0, self.batch_dim)
 
-        zdataset.attrs[_DIMENSION_KEY] = tuple(dim_labels)
+        return dim_labels
+
+    def _set_zarr_attrs(self, zobj, var_info, dim_labels):
+        zobj.attrs[_DIMENSION_KEY] = tuple(dim_labels)
         if var_info["metadata"]["description"]:
-            zdataset.attrs["description"] = var_info["metadata"]["description"]
-        zdataset.attrs.update(var_info["metadata"]["attrs"])
+            zobj.attrs["description"] = var_info["metadata"]["description"]
+        zobj.attrs.update(var_info["metadata"]["attrs"])
+
+    def _create_ragged_zarr_dataset(self, model: Model, var_key: VarKey):
+        # A ragged variable is saved in a zarr (sub)group with two arrays:
+        # flat values concatenated along their 1st dimension and offsets
+        # (start position in the flat values at each clock index).
+        var_info = self.var_info[var_key]
+        name = var_info["name"]
+        path = f"{_RAGGED_KEY}/{name}"
+
+        if self._has_zarr_dataset(f"{path}/values"):
+            return
+
+        value = model.cache[var_key]["value"]
+        clock = var_info["clock"]
+        add_batch_dim = self.batch_dim is not None
+
+        if not np.ndim(value):
+            raise ValueError(
+                f"Ragged variable '{name}' must have one dimension or more"
+            )
+
+        dim_labels = self._get_dim_labels(var_info, value, name, add_batch_dim)
+
+        dtype = getattr(value, "dtype", np.asarray(value).dtype)
+        shape = list(np.shape(value))
+        shape[0] *= self.clock_sizes[clock]
+        chunks = list(self.chunk_policy.get_chunks(shape, dtype))
+        offsets_shape = [self.clock_sizes[clock] + 1]
+
+        if add_batch_dim:
+            shape.insert(0, self.batch_size)
+            offsets_shape.insert(0, self.batch_size)
+            # always one batch member per chunk
+            chunks.insert(0, 1)
+
+        zkwargs = {
+            "shape": tuple(shape),
+            "chunks": chunks,
+            "dtype": dtype,
+            "compressor": "default",
+            "fill_value": default_fill_value_from_dtype(dtype),
+        }
+
+        zkwargs.update(var_info["encoding"])
+
+        if add_batch_dim:
+            zkwargs["chunks"] = _get_ragged_chunks(zkwargs["chunks"], chunks)
+
+        zgroup = self.zgroup.require_group(path)
+        self._set_zarr_attrs(zgroup, var_info, dim_labels)
+
+        zgroup.create_dataset(
+            "offsets",
+            shape=tuple(offsets_shape),
+            chunks=tuple(offsets_shape[:-1] and [1]) + tuple(offsets_shape[-1:]),
+            dtype="i8",
+            fill_value=0,
+        )
+        zgroup.create_dataset("values", **zkwargs)
+        self._zarr_arrays.add(f"{path}/values")
 
-        # reset consolidated since metadata has just been updated
         self.consolidated = False
 
+    def _write_ragged_zarr_dataset(
+        self, model: Model, var_key: VarKey, batch: int, clock_inc: int
+    ):
+        name = self.var_info[var_key]["name"]
+        zgroup = self.zgroup[f"{_RAGGED_KEY}/{name}"]
+        zvalues = zgroup["values"]
+
+        value = np.asarray(model.cache[var_key]["value"])
+        batch_idx = () if batch == -1 else (batch,)
+
+        if value.shape[1:] != zvalues.shape[len(batch_idx) + 1 :]:
+            raise ValueError(
+                f"Ragged variable '{name}' may only change in size along "
+                "its first dimension"
+            )
+
+        start = self._ragged_ends[(name, batch)]
+        end = start + value.shape[0]
+
+        if end > zvalues.shape[len(batch_idx)]:
+            new_shape = list(zvalues.shape)
+            new_shape[len(batch_idx)] = end
+            with self.lock:
+                # the array may have been resized by another batch member
+                # since its metadata was loaded: re-open it and never shrink it
+                zvalues = zgroup["values"]
+                new_shape = np.maximum(zvalues.shape, new_shape)
+                if tuple(new_shape) != zvalues.shape:
+                    zvalues.resize(tuple(int(s) for s in new_shape))
+
+        zvalues[batch_idx + (slice(start, end),)] = value
+        zgroup["offsets"][batch_idx + (clock_inc + 1,)] = end
+
+        self._ragged_ends[(name, batch)] = end
+
+    def _is_packable(self, model: Model, var_key: VarKey) -> bool:
+        var_info = self.var_info[var_key]
+        value = model.cache[var_key]["value"]
+
+        return (
+            not var_info["ragged"]
+            and not var_info["encoding"]
+            and np.ndim(value) == 0
+            and np.asarray(value).dtype.kind in "biuf"
+        )
+
+    def _create_packed_zarr_dataset(
+        self, model: Model, clock: str, var_keys: List[VarKey]
+    ):
+        # Scalar output variables saved at the same clock are packed in one
+        # zarr array (in a sub-group) with a structured dtype, i.e., one field
+        # per variable, so that only one chunk is written at each clock index
+        # instead of one chunk per variable.
+        if clock in self._packed_arrays:
+            return
+
+        path = f"{_PACKED_KEY}/{clock}"
+
+        if self._has_zarr_dataset(path):
+            # already created by another simulation in the batch
+            zarray = self.zgroup[path]
+        else:
+            pack_keys = [
+                vk
+                for vk in var_keys
+                if self._is_packable(model, vk)
+                and not self._has_zarr_dataset(self.var_info[vk]["name"])
+            ]
+
+            if len(pack_keys) < 2:
+                # nothing worth packing
+                self._packed_arrays[clock] = (None, {})
+                return
+
+            fields = [
+                (self.var_info[vk]["name"], np.asarray(model.cache[vk]["value"]).dtype,)
+                for vk in pack_keys
+            ]
+            dtype = np.dtype(fields)
+            fill_value = np.array(
+                tuple(default_fill_value_from_dtype(dt) for _, dt in fields),
+                dtype=dtype,
+            )[()]
+
+            shape = [self.clock_sizes[clock]]
+            chunks = list(self.chunk_policy.get_chunks(shape, dtype, clock=clock))
+            dim_labels = [clock]
+
+            if self.batch_dim is not None:
+                shape.insert(0, self.batch_size)
+                chunks.insert(
+                    0, self.chunk_policy.get_batch_chunk_size(self.batch_size)
+                )
+                dim_labels.insert(0, self.batch_dim)
+
+            zarray = self.zgroup.require_group(_PACKED_KEY).create_dataset(
+                clock,
+                shape=tuple(shape),
+                chunks=chunks,
+                dtype=dtype,
+                compressor="default",
+                fill_value=fill_value,
+            )
+            self._zarr_arrays.add(path)
+
+            var_attrs = {}
+            for vk in pack_keys:
+                metadata = self.var_info[vk]["metadata"]
+                attrs = var_attrs[self.var_info[vk]["name"]] = {}
+                if metadata["description"]:
+                    attrs["description"] = metadata["description"]
+                attrs.update(metadata["attrs"])
+
+            zarray.attrs[_DIMENSION_KEY] = tuple(dim_labels)
+            zarray.attrs[_PACKED_ATTRS_KEY] = var_attrs
+
+            self.consolidated = False
+
+        fields = {
+            vk: self.var_info[vk]["name"]
+            for vk in var_keys
+            if self.var_info[vk]["name"] in zarray.dtype.names
+        }
+        self._packed_arrays[clock] = (zarray, fields)
+
+    def _write_packed_zarr_dataset(
+        self, model: Model, clock: str, batch: int, clock_inc: int
+    ):
+        zarray, fields = self._packed_arrays[clock]
+        record = np.empty((), dtype=zarray.dtype)
+
+        for vk, name in fields.items():
+            value = model.cache[vk]["value"]
+
+            if np.ndim(value):
+                raise ValueError(
+                    f"Output variable '{name}' packed with other scalar "
+                    "outputs must remain a scalar"
+                )
+
+            record[name] = value
+
+        idx = (clock_inc,) if batch == -1 else (batch, clock_inc)
+        buffer = self._batch_buffers.get(batch)
+
+        if buffer is None:
+            zarray[idx] = record
+        else:
+            buffer.write(zarray, idx, record)
+
     def _maybe_resize_zarr_dataset(
         self, model: Model, var_key: VarKey,
     ):
@@ -268,11 +977,27 @@ class ZarrSimulationStore:
             with self.lock:
                 self.zgroup[zkey].resize(new_shape)
 
-    def write_output_vars(self, batch: int, step: int, model: Optional[Model] = None):
+    def write_output_vars(
+        self, batch: int, step: int, model: Optional[Model] = None
+    ) -> Dict[str, Any]:
+        """Write the values of the output variables that are saved at a given
+        step of the master clock (-1 for the end of the simulation).
+
+        Returns the saved values, with variable names as keys.
+
+        """
         if model is None:
             model = self.model
 
-        save_istep = self.output_save_steps.isel(**{self.mclock_dim: step})
+        saved = {}
+
+        if step == -1:
+            # the simulation may have been stopped early
+            save_step = self._end_steps.pop(batch, -1)
+        else:
+            save_step = step
+
+        save_istep = self.output_save_steps.isel(**{self.mclock_dim: save_step})
 
         for clock, var_keys in self.output_vars.items():
             if clock is None and step != -1:
@@ -284,13 +1009,34 @@ class ZarrSimulationStore:
 
             for vk in var_keys:
                 model.update_cache(vk)
+                saved[self.var_info[vk]["name"]] = model.cache[vk]["value"]
+
+            if self.pack_scalars and clock is not None:
+                if clock_inc == 0:
+                    with self.lock:
+                        self._create_packed_zarr_dataset(model, clock, var_keys)
+
+                packed = self._packed_arrays[clock][1]
+            else:
+                packed = {}
+
+            if packed:
+                self._write_packed_zarr_dataset(model, clock, batch, clock_inc)
+                var_keys = [vk for vk in var_keys if vk not in packed]
 
             if clock_inc == 0:
                 for vk in var_keys:
                     with self.lock:
-                        self._create_zarr_dataset(model, vk)
+                        if self.var_info[vk]["ragged"]:
+                            self._create_ragged_zarr_dataset(model, vk)
+                        else:
+                            self._create_zarr_dataset(model, vk)
 
             for vk in var_keys:
+                if self.var_info[vk]["ragged"]:
+                    self._write_ragged_zarr_dataset(model, vk, batch, clock_inc)
+                    continue
+
                 zkey = self.var_info[vk]["name"]
                 value = model.cache[vk]["value"]
 
@@ -312,26 +1058,262 @@ class ZarrSimulationStore:
 
                     idx = tuple(idx_dims)
 
-                self.zgroup[zkey][idx] = value
+                buffer = self._batch_buffers.get(batch)
+
+                if buffer is None:
+                    self.zgroup[zkey][idx] = value
+                else:
+                    buffer.write(self.zgroup[zkey], idx, value)
 
             self.clock_incs[clock][batch] += 1
 
+        if step == -1:
+            self._release_member(batch)
+
+        return saved
+
+    def _release_member(self, batch: int):
+        # no more writes for this batch member (end of simulation): drop its
+        # entries, which may be many when running large parameter sweeps
+        for incs in self.clock_incs.values():
+            incs.pop(batch, None)
+
+        for var_info in self.var_info.values():
+            if var_info["ragged"]:
+                self._ragged_ends.pop((var_info["name"], batch), None)
+
+    def _create_member_zarr_dataset(self, name: str, dtype: str, fill_value: Any):
+        # small array with one value per simulation (or a scalar)
+        if self.batch_dim is None:
+            shape, chunks, dims = (), (), ()
+        else:
+            # aligned with the groups of batch members
+            shape = (self.batch_size,)
+            chunks = (self.batch_group_size,)
+            dims = (self.batch_dim,)
+
+        zdataset = self.zgroup.create_dataset(
+            name, shape=shape, chunks=chunks, dtype=dtype, fill_value=fill_value
+        )
+        zdataset.attrs[_DIMENSION_KEY] = dims
+        self._zarr_arrays.add(name)
+        self.consolidated = False
+
+    def write_end_step(self, batch: int, step: int, status: str = "stopped"):
+        """Mark the end of a simulation that has been stopped early.
+
+        ``step`` is the index of the master clock coordinate at which the
+        simulation has stopped. Unless the simulation has been aborted
+        (``status='aborted'``), the outputs saved at the end of the
+        simulation are written at this coordinate. The clock indexes after
+        this coordinate are trimmed (or marked as unused in a batch of
+        simulations) when opening the store as a xarray Dataset.
+
+        """
+        if status == "stopped":
+            self._end_steps[batch] = step
+        elif status == "aborted":
+            # no outputs are written at the end of an aborted simulation
+            self._release_member(batch)
+
+        with self.lock:
+            if not self._has_zarr_dataset(_END_STEP_KEY):
+                self._create_member_zarr_dataset(_END_STEP_KEY, "i8", -1)
+                self._create_member_zarr_dataset(_STATUS_KEY, "i1", 0)
+
+        idx = Ellipsis if batch == -1 else batch
+
+        self.zgroup[_END_STEP_KEY][idx] = step
+        self.zgroup[_STATUS_KEY][idx] = _STATUS_VALUES.index(status)
+
+    def _trim_clocks(self, ds: xr.Dataset) -> xr.Dataset:
+        # drop the clock indexes after the end of the (longest) simulation
+        # and add the status (and the end of each simulation in a batch)
+        # as coordinate(s)
+        mclock = ds[self.mclock_dim]
+        end_steps = ds[_END_STEP_KEY].values
+        end_steps = np.where(end_steps < 0, mclock.size - 1, end_steps)
+        end = mclock.values[end_steps.max()]
+        status = np.array(_STATUS_VALUES)[ds[_STATUS_KEY].values]
+        dims = ds[_STATUS_KEY].dims
+
+        ds = ds.drop_vars([_END_STEP_KEY, _STATUS_KEY])
+
+        for clock in self.clock_sizes:
+            ds = ds.isel({clock: ds[clock].values <= end})
+
+        ds.coords["simulation_status"] = (
+            dims,
+            status,
+            {"description": "status of the simulation"},
+        )
+
+        if self.batch_dim is not None:
+            end_name = f"{self.mclock_dim}_end"
+            ds.coords[end_name] = (
+                self.batch_dim,
+                mclock.values[end_steps],
+                {"description": "end of the simulation"},
+            )
+
+        return ds
+
+    def _check_index_var(self, name: str, value: Any):
+        # compare the checksum of the given index values with the one of the
+        # values already written in the store
+        checksum = _get_checksum(value)
+
+        if name not in self._index_checksums:
+            self._index_checksums[name] = _get_checksum(self.zgroup[name][:])
+
+        if checksum != self._index_checksums[name]:
+            raise ValueError(
+                f"Values of index variable '{name}' differ between "
+                "simulations in the batch"
+            )
+
     def write_index_vars(self, model: Optional[Model] = None):
         if model is None:
             model = self.model
 
         for var_key in model.index_vars:
             _, vname = var_key
-            model.update_cache(var_key)
 
-            self._create_zarr_dataset(model, var_key, name=vname)
-            self.zgroup[vname][:] = model.cache[var_key]["value"]
+            with self.lock:
+                written = self._has_zarr_dataset(vname)
+
+                if not written:
+                    model.update_cache(var_key)
+                    value = model.cache[var_key]["value"]
+
+                    self._create_zarr_dataset(model, var_key, name=vname)
+                    self.zgroup[vname][:] = value
+
+                    if self.check_index_vars:
+                        self._index_checksums[vname] = _get_checksum(value)
+
+            # index variables are batch-invariant: written only once
+            if written and self.check_index_vars:
+                model.update_cache(var_key)
+                self._check_index_var(vname, model.cache[var_key]["value"])
 
     def consolidate(self):
+        import zarr
+
         zarr.consolidate_metadata(self.zgroup.store)
         self.consolidated = True
 
-    def open_as_xr_dataset(self) -> xr.Dataset:
+    def _open_ragged_vars(self, ragged: str) -> Dict[str, xr.Variable]:
+        # Open the ragged variables found in the zarr group either as
+        # flat values + offsets or as padded arrays (lazily decoded
+        # unless in-memory store)
+        if _RAGGED_KEY not in self.zgroup:
+            return {}
+
+        xr_vars = {}
+
+        for name, zgroup in self.zgroup[_RAGGED_KEY].groups():
+            attrs = dict(zgroup.attrs)
+            dims = list(attrs.pop(_DIMENSION_KEY))
+            zvalues = zgroup["values"]
+            offsets = zgroup["offsets"][:]
+            has_batch = offsets.ndim > 1
+
+            if ragged == "flat":
+                ndim_flat = 2 if has_batch else 1
+                vdims = dims[: ndim_flat - 1] + [f"{name}_flat"] + dims[ndim_flat + 1 :]
+                if self.in_memory:
+                    values = zvalues[:]
+                else:
+                    import dask.array as dsa
+
+                    values = dsa.from_zarr(zvalues)
+                xr_vars[name] = xr.Variable(vdims, values, attrs=attrs)
+                odims = dims[: ndim_flat - 1] + [f"{dims[ndim_flat - 1]}_edges"]
+                xr_vars[f"{name}_offsets"] = xr.Variable(odims, offsets)
+                continue
+
+            offsets_2d = offsets if has_batch else offsets[None, :]
+            counts = np.diff(np.maximum.accumulate(offsets_2d, axis=-1), axis=-1)
+            size = int(counts.max()) if counts.size else 0
+            fill_value = zvalues.fill_value
+            batch_shape = (counts.shape[1], size) + zvalues.shape[
+                2 if has_batch else 1 :
+            ]
+
+            batches = range(len(offsets_2d)) if has_batch else [None]
+            args = (size, fill_value)
+
+            if self.in_memory:
+                members = [
+                    _decode_ragged(zvalues, o, *args, batch=b)
+                    for b, o in zip(batches, offsets_2d)
+                ]
+                data = np.stack(members)
+            else:
+                import dask
+                import dask.array as dsa
+
+                members = [
+                    dsa.from_delayed(
+                        dask.delayed(_decode_ragged)(zvalues, o, *args, batch=b),
+                        batch_shape,
+                        dtype=zvalues.dtype,
+                    )
+                    for b, o in zip(batches, offsets_2d)
+                ]
+                data = dsa.stack(members)
+
+            if not has_batch:
+                data = data[0]
+
+            xr_vars[name] = xr.Variable(dims, data, attrs=attrs)
+
+        return xr_vars
+
+    def _open_packed_vars(self) -> Dict[str, xr.Variable]:
+        # Unpack the scalar outputs packed by clock (each variable is a view
+        # of one field of the structured array, lazily loaded unless
+        # in-memory store)
+        if _PACKED_KEY not in self.zgroup:
+            return {}
+
+        xr_vars = {}
+
+        for _, zarray in self.zgroup[_PACKED_KEY].arrays():
+            dims = zarray.attrs[_DIMENSION_KEY]
+            var_attrs = zarray.attrs[_PACKED_ATTRS_KEY]
+
+            if self.in_memory:
+                table = zarray[...]
+            else:
+                import dask.array as dsa
+
+                table = dsa.from_zarr(zarray)
+
+            for name in zarray.dtype.names:
+                # same attributes than other variables opened with xr.open_zarr
+                attrs = dict(var_attrs.get(name, {}))
+                attrs["_FillValue"] = zarray.fill_value[name]
+                xr_vars[name] = xr.Variable(dims, table[name], attrs=attrs)
+
+        return xr_vars
+
+    def open_as_xr_dataset(self, ragged: str = "padded") -> xr.Dataset:
+        """Open the zarr group as a xarray Dataset.
+
+        Parameters
+        ----------
+        ragged : {'padded', 'flat'}, optional
+            How variables saved with a ragged encoding are returned, i.e.,
+            either as arrays padded to their largest size with fill values
+            (default, lazily decoded) or as flat values along with their
+            offsets for each clock coordinate.
+
+        """
+        if ragged not in ("padded", "flat"):
+            raise ValueError(f"Invalid value for ragged: {ragged!r}")
+
         if self.in_memory:
             chunks = None
         else:
@@ -355,4 +1337,176 @@ class ZarrSimulationStore:
                 if not da.dims:
                     da.load()
 
+        ragged_vars = self._open_ragged_vars(ragged)
+
+        if ragged_vars:
+            ds = ds.assign(ragged_vars)
+
+        packed_vars = self._open_packed_vars()
+
+        if packed_vars:
+            ds = ds.assign(packed_vars)
+
+        if self.input_refs.variables:
+            ds.attrs.pop(_INPUT_REFS_KEY, None)
+            attrs = _merge_attrs(ds.attrs, self.input_refs.attrs)
+            ds = ds.merge(self.input_refs)
+            ds.attrs = attrs
+
+        if _END_STEP_KEY in ds:
+            ds = self._trim_clocks(ds)
+
         return ds
+
+
+def _get_copy_block(shape, chunks, itemsize, max_mem):
+    # largest block (multiple of chunks) that fits in memory,
+    # growing the trailing dimensions first
+    block = list(chunks)
+
+    for dim in reversed(range(len(shape))):
+        others = int(np.prod(block)) // block[dim]
+        n = max_mem // (itemsize * others) // chunks[dim] * chunks[dim]
+        block[dim] = min(shape[dim], max(chunks[dim], n))
+
+    return block
+
+
+def _copy_array(source: "zarr.Array", target: "zarr.Group", name: str, chunks, max_mem):
+    zarray = target.create_dataset(
+        name,
+        shape=source.shape,
+        chunks=chunks,
+        dtype=source.dtype,
+        compressor=source.compressor,
+        filters=source.filters,
+        fill_value=source.fill_value,
+        order=source.order,
+        overwrite=True,
+    )
+    zarray.attrs.update(source.attrs.asdict())
+
+    if not source.shape:
+        zarray[...] = source[...]
+        return
+
+    block = _get_copy_block(source.shape, chunks, source.itemsize, max_mem)
+    starts = [range(0, n, b) for n, b in zip(source.shape, block)]
+
+    for start in itertools.product(*starts):
+        region = tuple(slice(i, i + b) for i, b in zip(start, block))
+        zarray[region] = source[region]
+
+
+def _get_rechunk_chunks(zarray, chunk_policy, clocks, batch_dim):
+    dims = list(zarray.attrs.get(_DIMENSION_KEY, []))
+    shape = list(zarray.shape)
+
+    has_batch = bool(dims) and dims[0] == batch_dim
+    if has_batch:
+        dims.pop(0)
+        batch_size = shape.pop(0)
+
+    clock = dims[0] if dims and dims[0] in clocks else None
+
+    chunks = list(chunk_policy.get_chunks(tuple(shape), zarray.dtype, clock=clock))
+    if has_batch:
+        chunks.insert(0, chunk_policy.get_batch_chunk_size(batch_size))
+
+    return tuple(chunks)
+
+
+def rechunk_store(
+    source: Union["zarr.Group", MutableMapping, str],
+    target: Optional[Union["zarr.Group", MutableMapping, str]] = None,
+    chunk_policy: Union[ChunkPolicy, str, Dict[str, Any]] = "time_series",
+    batch_dim: Optional[str] = None,
+    max_mem: int = 2 ** 28,
+    max_workers: Optional[int] = None,
+) -> "zarr.Group":
+    """Rewrite the arrays of a (finished) simulation store with a new chunk
+    layout, e.g., optimized for reading the outputs.
+
+    Parameters
+    ----------
+    source : :class:`zarr.Group` or mapping or str
+        Zarr group, store or path of the simulation store.
+    target : :class:`zarr.Group` or mapping or str, optional
+        Zarr group, store or path where to write the rechunked arrays. If None
+        (default), ``source`` is rechunked in place.
+    chunk_policy : str or dict or :class:`ChunkPolicy`, optional
+        Chunk layout of the rechunked arrays (default: 'time_series'). See
+        :class:`ChunkPolicy`.
+    batch_dim : str, optional
+        Name of the batch dimension, if any.
+    max_mem : int, optional
+        Approximate maximum memory (in bytes) used to copy the data, shared
+        between all workers (default: 256 MiB).
+    max_workers : int, optional
+        Maximum number of variables rewritten in parallel (threads).
+
+    Returns
+    -------
+    target : :class:`zarr.Group`
+        The zarr group with the rechunked arrays. Its metadata is consolidated
+        once all arrays have been written.
+
+    Notes
+    -----
+    Only the arrays directly contained in the group are rechunked. Ragged
+    variables and packed scalar outputs are left unchanged (or copied as is
+    to ``target``).
+
+    """
+    import zarr
+
+    if not isinstance(source, zarr.Group):
+        source = zarr.open_group(store=source, mode="r+")
+
+    in_place = target is None
+
+    if in_place:
+        target = source
+        dest = source.require_group(_RECHUNK_KEY)
+    else:
+        if not isinstance(target, zarr.Group):
+            target = zarr.group(store=target)
+        dest = target
+
+    chunk_policy = _as_chunk_policy(chunk_policy)
+    clocks = {name for name, arr in source.arrays() if arr.attrs.get(_CLOCK_KEY)}
+
+    to_copy = {}
+    for name, zarray in source.arrays():
+        chunks = _get_rechunk_chunks(zarray, chunk_policy, clocks, batch_dim)
+        if not in_place or chunks != zarray.chunks:
+            to_copy[name] = chunks
+
+    if max_workers is None:
+        max_workers = min(len(to_copy), 4) or 1
+    worker_mem = max(max_mem // max_workers, 1)
+
+    def copy(name):
+        _copy_array(source[name], dest, name, to_copy[name], worker_mem)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        list(executor.map(copy, to_copy))
+
+    if in_place:
+        # original arrays are moved aside and deleted only once all
+        # rechunked arrays are in place (no array lost on failure)
+        source.require_group(_RECHUNK_OLD_KEY)
+        for name in to_copy:
+            source.move(name, f"{_RECHUNK_OLD_KEY}/{name}")
+            source.move(f"{_RECHUNK_KEY}/{name}", name)
+        del source[_RECHUNK_KEY]
+        del source[_RECHUNK_OLD_KEY]
+    else:
+        target.attrs.update(source.attrs.asdict())
+        for name, zgroup in source.groups():
+            zarr.copy(zgroup, target, name=name)
+
+    # single update of the consolidated metadata
+    zarr.consolidate_metadata(target.store)
+
+    return target
@@ -0,0 +1,162 @@
+import os
+import time
+
+import numpy as np
+import pytest
+import xarray as xr
+
+import xsimlab as xs
+from xsimlab.cache import ResultCache, _tokenize_model
+
+
+@pytest.fixture
+def cache(tmpdir):
+    return ResultCache(str(tmpdir.join("cache")))
+
+
+@pytest.fixture
+def batch_dataset(in_dataset, model):
+    return in_dataset.xsimlab.update_vars(
+        model=model, input_vars={"roll__shift": ("batch", [1, 2, 3])}
+    )
+
+
+class TestResultCache:
+    def test_put_get(self, cache):
+        ds = xr.Dataset({"a": ("x", np.arange(3.0))})
+
+        assert cache.get("key") is None
+
+        cache.put("key", ds)
+        assert "key" in cache
+        assert len(cache) == 1
+        assert cache.size > 0
+        xr.testing.assert_equal(cache.get("key"), ds)
+
+        cache.clear()
+        assert len(cache) == 0
+
+    def test_evict(self, cache):
+        ds = xr.Dataset({"a": ("x", np.arange(100.0))})
+
+        now = time.time()
+
+        for i, key in enumerate(["a", "b", "c"]):
+            cache.put(key, ds)
+            # ensure distinct access times
+            t = now - 30 + 10 * i
+            os.utime(os.path.join(cache.path, key), (t, t))
+
+        entry_size = cache.size // 3
+
+        # "a" is the most recently used entry
+        cache.get("a")
+
+        cache = ResultCache(cache.path, max_size=2 * entry_size)
+        assert sorted(cache.keys()) == ["a", "c"]
+
+        cache.max_size = 0
+        cache.put("d", ds)
+        assert len(cache) == 0
+
+
+def test_tokenize_model(model, simple_model):
+    assert _tokenize_model(model) == _tokenize_model(model.clone())
+    assert _tokenize_model(model) != _tokenize_model(simple_model)
+
+
+@pytest.fixture
+def runs(monkeypatch):
+    # record the simulations that are actually run (batch indices)
+    import xsimlab.drivers
+
+    runs = []
+    _run = xsimlab.drivers._run
+
+    def counting_run(*args, **kwargs):
+        runs.append(kwargs.get("batch", -1))
+        return _run(*args, **kwargs)
+
+    monkeypatch.setattr(xsimlab.drivers, "_run", counting_run)
+
+    return runs
+
+
+def test_run_cached(model, in_dataset, batch_dataset, cache, runs):
+    expected = in_dataset.xsimlab.run(model=model)
+    runs.clear()
+
+    for _ in range(2):
+        actual = in_dataset.xsimlab.run(model=model, cache=cache)
+        xr.testing.assert_identical(actual, expected)
+
+    assert runs == [-1]
+    assert len(cache) == 1
+
+    # only run options that may change the results are part of the key
+    in_dataset.xsimlab.run(model=model, cache=cache, validate=None)
+    assert len(cache) == 1
+
+    encoding = {"profile__u": {"dtype": "float32"}}
+    in_dataset.xsimlab.run(model=model, cache=cache, encoding=encoding)
+    assert len(cache) == 2
+
+    # per-member entries
+    expected = batch_dataset.xsimlab.run(model=model, batch_dim="batch")
+    runs.clear()
+
+    sub_ds = batch_dataset.isel(batch=[2, 0])
+    sub_ds.xsimlab.run(model=model, batch_dim="batch", cache=cache)
+    assert len(runs) == 2
+
+    actual = batch_dataset.xsimlab.run(model=model, batch_dim="batch", cache=cache.path)
+    xr.testing.assert_identical(actual, expected)
+    assert len(runs) == 3
+
+
+def test_run_cached_hooks(model, in_dataset, cache, runs):
+    @xs.runtime_hook("run_step")
+    def stop(model, context, state):
+        return xs.RuntimeSignal.BREAK
+
+    in_dataset.xsimlab.run(model=model, cache=cache)
+    runs.clear()
+
+    # hooks may change the results: cache not used
+    with pytest.warns(UserWarning, match=r".*cache is not used.*"):
+        actual = in_dataset.xsimlab.run(model=model, cache=cache, hooks=[stop])
+
+    assert runs == [-1]
+    assert actual.clock.size < in_dataset.clock.size
+
+
+@xs.process
+class BatchNumber:
+    offset = xs.variable()
+    value = xs.variable(intent="out")
+
+    @xs.runtime(args=["batch", "batch_size"])
+    def initialize(self, batch, batch_size):
+        self.value = self.offset + batch * 10 + batch_size
+
+
+def test_run_cached_batch_args(cache, runs):
+    model = xs.Model({"p": BatchNumber})
+
+    in_ds = xs.create_setup(
+        model=model,
+        clocks={"clock": [0, 1]},
+        # same inputs for all members
+        input_vars={"p__offset": ("batch", [0, 0, 0])},
+        output_vars={"p__value": None},
+    )
+
+    out_ds = in_ds.xsimlab.run(model=model, batch_dim="batch", cache=cache)
+    np.testing.assert_array_equal(out_ds.p__value, [3, 13, 23])
+
+    # only member 1 is run, with its batch index and the batch size
+    runs.clear()
+    in_ds["p__offset"] = ("batch", [0, 5, 0])
+    out_ds = in_ds.xsimlab.run(model=model, batch_dim="batch", cache=cache)
+    assert len(runs) == 1
+    np.testing.assert_array_equal(out_ds.p__value, [3, 18, 23])
@@ -1,3 +1,10 @@
+import os
+import pickle
+import subprocess
+import sys
+import time
+from textwrap import dedent
+
 import numpy as np
 import pandas as pd
 import pytest
@@ -8,7 +15,11 @@ from xsimlab.drivers import (
     BaseSimulationDriver,
     RuntimeContext,
     XarraySimulationDriver,
+    _InitializedModels,
+    _compute_streaming,
+    _create_shared_inputs,
     _get_input_vars,
+    _get_shared_input_keys,
 )
 
 
@@ -49,6 +60,25 @@ def test_runtime_context_in_model(in_dataset, model):
         driver.run_model()
 
 
+def test_runtime_step_end():
+    @xs.process
+    class P:
+        end = xs.variable(intent="out")
+
+        @xs.runtime(args=["step_start", "step_end"])
+        def run_step(self, start, end):
+            self.end = end
+
+    model = xs.Model({"p": P})
+
+    in_ds = xs.create_setup(
+        model=model, clocks={"clock": [0, 1, 3]}, output_vars={"p__end": "clock"},
+    )
+    out_ds = in_ds.xsimlab.run(model=model)
+
+    np.testing.assert_array_equal(out_ds.p__end.values, [1, 3, 3])
+
+
 class TestBaseSimulationDriver:
     def test_constructor(self, model):
         driver = BaseSimulationDriver(model)
@@ -83,6 +113,104 @@ def test_get_input_vars_scalar(in_dataset, model, value, is_scalar):
         assert not np.isscalar(actual)
 
 
+def test_create_shared_inputs(monkeypatch):
+    monkeypatch.setattr(xs.drivers, "_SHARED_MEMORY_MIN_NBYTES", 16)
+
+    ds = xr.Dataset(
+        {
+            "large": ("x", np.arange(4.0)),
+            "small": ("y", [1.0]),
+            "batch_var": (("batch", "x"), np.ones((2, 4))),
+        }
+    )
+
+    names, shm_blocks, shm_specs = _create_shared_inputs(ds, "batch")
+
+    try:
+        assert names == ["large"]
+        shm_name, dims, shape, dtype, _ = shm_specs["large"]
+        assert dims == ("x",)
+        assert shape == (4,)
+
+        shared = np.ndarray(shape, dtype=dtype, buffer=shm_blocks[0].buf)
+        np.testing.assert_array_equal(shared, ds["large"].values)
+    finally:
+        for shm in shm_blocks:
+            shm.close()
+            shm.unlink()
+
+
+def test_compute_streaming():
+    import dask
+
+    finished = []
+
+    def run(i, delay):
+        time.sleep(delay)
+        finished.append(i)
+
+    delays = [0.5, 0, 0, 0]
+    tasks = (dask.delayed(run)(i, d) for i, d in enumerate(delays))
+
+    with dask.config.set(num_workers=2):
+        _compute_streaming(tasks, 2, scheduler="threads")
+
+    # no barrier: tasks are submitted while the slow task is running
+    assert finished == [1, 2, 3, 0]
+
+
+def test_compute_streaming_processes(monkeypatch):
+    import dask
+    import dask.multiprocessing
+    import xsimlab.drivers
+
+    pools = []
+
+    class CountingPool(xsimlab.drivers.ProcessPoolExecutor):
+        def __init__(self, *args, **kwargs):
+            pools.append(self)
+            super().__init__(*args, **kwargs)
+
+    monkeypatch.setattr(xsimlab.drivers, "ProcessPoolExecutor", CountingPool)
+    monkeypatch.setattr(dask.multiprocessing, "ProcessPoolExecutor", CountingPool)
+
+    tasks = [dask.delayed(abs)(-i) for i in range(4)]
+
+    with dask.config.set(num_workers=2):
+        _compute_streaming(tasks, 2, scheduler="processes")
+
+    # a single process pool for all tasks
+    assert len(pools) == 1
+
+
+def test_parallel_lazy_distributed():
+    # dask.distributed should not be imported when using a local scheduler
+    code = dedent(
+        """
+        import sys
+        import xsimlab as xs
+
+        @xs.process
+        class Foo:
+            a = xs.variable()
+
+        model = xs.Model({"foo": Foo})
+        in_ds = xs.create_setup(
+            model=model, clocks={"clock": [0, 1]}, input_vars={"foo__a": ("batch", [1, 2])}
+        )
+        for scheduler in (None, "threads", "sync"):
+            in_ds.xsimlab.run(
+                model=model, batch_dim="batch", parallel=True, scheduler=scheduler
+            )
+        print("distributed" in sys.modules)
+        """
+    )
+    root_dir = os.path.dirname(os.path.dirname(xs.__file__))
+    out = subprocess.check_output([sys.executable, "-c", code], cwd=root_dir)
+
+    assert out.strip() == b"False"
+
+
 class TestXarraySimulationDriver:
     def test_constructor(self, in_dataset, model):
         invalid_ds = in_dataset.drop("clock")
@@ -104,6 +232,14 @@ class TestXarraySimulationDriver:
         assert out_ds_actual is not out_dataset
         xr.testing.assert_identical(out_ds_actual.load(), out_dataset)
 
+    @pytest.mark.parametrize("store_inputs", ["reference", "skip"])
+    def test_store_inputs(self, in_dataset, out_dataset, model, store_inputs):
+        driver = XarraySimulationDriver(in_dataset, model, store_inputs=store_inputs)
+        driver.run_model()
+        out_ds = driver.get_results()
+
+        xr.testing.assert_equal(out_ds.load(), out_dataset)
+
     def test_static_var_as_scalar_coord(self, in_dataset, out_dataset, model):
         # test that a model input (static variable) given as a scalar coordinate
         # doesn't cause any trouble
@@ -128,3 +264,444 @@ class TestXarraySimulationDriver:
         out_dataset = driver.get_results()
 
         pd.testing.assert_index_equal(out_dataset.indexes["dummy"], midx)
+
+
+@xs.process
+class FastCounter:
+    count = xs.variable(intent="out")
+
+    def initialize(self):
+        self.count = 0
+
+    def run_step(self):
+        self.count += 1
+
+
+@xs.process
+class SlowCounter:
+    count = xs.variable(intent="out")
+    delta = xs.variable(intent="out")
+
+    def initialize(self):
+        self.count = 0
+        self.delta = 0
+
+    @xs.runtime(args="step_delta")
+    def run_step(self, dt):
+        self.count += 1
+        self.delta = dt
+
+
+@pytest.mark.parametrize("parallel", [False, True])
+def test_process_clocks(parallel):
+    model = xs.Model({"fast": FastCounter, "slow": SlowCounter})
+
+    in_ds = xs.create_setup(
+        model=model,
+        clocks={"clock": np.arange(11), "slow_clock": [0, 5, 8]},
+        master_clock="clock",
+        output_vars={
+            "fast__count": "clock",
+            "slow__count": "clock",
+            "slow__delta": "clock",
+        },
+        process_clocks={"slow": "slow_clock"},
+    )
+
+    out_ds = in_ds.xsimlab.run(model=model, parallel=parallel)
+
+    assert out_ds.fast__count.values[-1] == 10
+    np.testing.assert_array_equal(
+        out_ds.slow__count.values, [1, 1, 1, 1, 1, 2, 2, 2, 3, 3, 3]
+    )
+    np.testing.assert_array_equal(
+        out_ds.slow__delta.values, [5, 5, 5, 5, 5, 3, 3, 3, 2, 2, 2]
+    )
+
+    with pytest.raises(KeyError, match=r"Process 'slow' set with clock.*"):
+        in_ds.xsimlab.run(model=model.drop_processes("slow"))
+
+
+@xs.process
+class AdaptiveStep:
+    dt_max = xs.variable()
+    count = xs.variable(intent="out")
+    time = xs.variable(intent="out")
+    max_delta = xs.on_demand()
+
+    def initialize(self):
+        self.count = 0
+        self.time = 0.0
+
+    @xs.runtime(args=["step_start", "step_end", "step_delta"])
+    def run_step(self, start, end, dt):
+        assert np.isclose(start, self.time)
+        assert np.isclose(end, start + dt)
+        self.count += 1
+
+    @xs.runtime(args="step_delta")
+    def finalize_step(self, dt):
+        self.time += dt
+
+    @max_delta.compute
+    def _get_max_delta(self):
+        return self.dt_max
+
+
+def test_adaptive_time_step():
+    model = xs.Model({"adapt": AdaptiveStep, "slow": SlowCounter})
+
+    in_ds = xs.create_setup(
+        model=model,
+        clocks={"clock": [0, 1, 2]},
+        input_vars={"adapt__dt_max": 0.3},
+        output_vars={"adapt__count": "clock", "slow__count": "clock"},
+    )
+
+    out_ds = in_ds.xsimlab.run(model=model, max_step_delta="adapt__max_delta")
+    np.testing.assert_array_equal(out_ds.adapt__count.values, [1, 5, 8])
+    np.testing.assert_array_equal(out_ds.slow__count.values, [1, 5, 8])
+
+    # sub-cycled processes are executed only once per master clock step
+    out_ds = in_ds.xsimlab.update_clocks(
+        model=model, process_clocks={"slow": "clock"}
+    ).xsimlab.run(model=model, max_step_delta=[("adapt", "max_delta")])
+    np.testing.assert_array_equal(out_ds.slow__count.values, [1, 5, 8])
+
+    out_ds = in_ds.xsimlab.update_clocks(
+        model=model,
+        clocks={"slow_clock": [0, 1]},
+        process_clocks={"slow": "slow_clock"},
+    ).xsimlab.run(model=model, max_step_delta="adapt__max_delta")
+    np.testing.assert_array_equal(out_ds.slow__count.values, [1, 2, 2])
+
+    # no spurious sub-step due to round-off errors
+    out_ds = in_ds.xsimlab.update_vars(
+        model=model, input_vars={"adapt__dt_max": 0.1}
+    ).xsimlab.run(model=model, max_step_delta="adapt__max_delta")
+    np.testing.assert_array_equal(out_ds.adapt__count.values, [1, 11, 20])
+
+    in_ds["adapt__dt_max"] = 0
+    with pytest.raises(ValueError, match=r"Invalid maximum step duration.*"):
+        in_ds.xsimlab.run(model=model, max_step_delta="adapt__max_delta")
+
+    with pytest.raises(KeyError, match=r".*not valid key.*"):
+        in_ds.xsimlab.run(model=model, max_step_delta="adapt__invalid")
+
+
+@xs.process
+class StopCounter:
+    stop_at = xs.variable()
+    count = xs.variable(intent="out")
+
+    def initialize(self):
+        self.count = 0
+
+    def run_step(self):
+        self.count += 1
+
+    @xs.runtime(args="step")
+    def finalize_step(self, step):
+        if step == self.stop_at:
+            return xs.RuntimeSignal.BREAK
+
+
+@pytest.mark.parametrize("parallel", [False, True])
+def test_runtime_signal_break(parallel):
+    model = xs.Model({"counter": StopCounter})
+    finalized = []
+
+    @xs.runtime_hook("finalize")
+    def finalize_hook(model, context, state):
+        finalized.append(context["batch"])
+
+    in_ds = xs.create_setup(
+        model=model,
+        clocks={"clock": range(6), "out": [0, 2, 4]},
+        master_clock="clock",
+        input_vars={"counter__stop_at": 1},
+        output_vars={"counter__count": "clock"},
+    )
+
+    out_ds = in_ds.xsimlab.run(model=model, parallel=parallel, hooks=[finalize_hook])
+    np.testing.assert_array_equal(out_ds.clock, [0, 1, 2])
+    np.testing.assert_array_equal(out_ds.out, [0, 2])
+    np.testing.assert_array_equal(out_ds.counter__count, [1, 2, 2])
+    assert finalized == [-1]
+
+    # batch: members stopped at different steps (or not stopped)
+    in_ds["counter__stop_at"] = ("batch", [0, 10, 2])
+    out_ds = in_ds.xsimlab.run(
+        model=model, batch_dim="batch", parallel=parallel, hooks=[finalize_hook]
+    )
+    np.testing.assert_array_equal(out_ds.clock_end, [1, 5, 3])
+    np.testing.assert_array_equal(out_ds.clock, range(6))
+    np.testing.assert_array_equal(out_ds.counter__count[0, :2], [1, 1])
+    np.testing.assert_array_equal(out_ds.counter__count[1], [1, 2, 3, 4, 5, 5])
+    assert sorted(finalized) == [-1, 0, 1, 2]
+
+    in_ds["counter__stop_at"] = ("batch", [0, 0, 2])
+    out_ds = in_ds.xsimlab.run(model=model, batch_dim="batch", parallel=parallel)
+    np.testing.assert_array_equal(out_ds.clock, [0, 1, 2, 3])
+
+
+@xs.process
+class Grow:
+    rate = xs.variable()
+    abort_at = xs.variable()
+    u = xs.variable(intent="out")
+
+    def initialize(self):
+        self.u = 1.0
+
+    @xs.runtime(args="step")
+    def run_step(self, step):
+        self.u = self.u * self.rate
+
+        if step == self.abort_at:
+            return xs.RuntimeSignal.ABORT
+
+
+@xs.process
+class Setup:
+    scale = xs.variable()
+    grid = xs.variable(dims="x", intent="out")
+
+    calls = []
+
+    def initialize(self):
+        self.calls.append(self.scale)
+        self.grid = np.arange(3.0) * self.scale
+
+
+@xs.process
+class Forced:
+    grid = xs.foreign(Setup, "grid")
+    forcing = xs.variable()
+    u = xs.variable(dims="x", intent="out")
+
+    def initialize(self):
+        self.u = np.zeros_like(self.grid)
+
+    def run_step(self):
+        self.u += self.grid * self.forcing
+
+
+@pytest.mark.parametrize("parallel", [False, True])
+def test_fork_init(parallel):
+    model = xs.Model({"setup": Setup, "forced": Forced})
+
+    in_ds = xs.create_setup(
+        model=model,
+        clocks={"clock": range(4)},
+        input_vars={
+            "setup__scale": ("batch", [1.0, 2.0, 1.0, 1.0]),
+            "forced__forcing": (("batch", "clock"), np.arange(16).reshape(4, 4)),
+        },
+        output_vars={"forced__u": None},
+    )
+
+    expected = in_ds.xsimlab.run(model=model, batch_dim="batch")
+    Setup.calls.clear()
+
+    init_batches = []
+
+    @xs.runtime_hook("initialize", "model", "post")
+    def init_hook(model, context, state):
+        init_batches.append(context["batch"])
+
+    actual = in_ds.xsimlab.run(
+        model=model,
+        batch_dim="batch",
+        parallel=parallel,
+        fork_init=True,
+        hooks=[init_hook],
+    )
+    xr.testing.assert_identical(actual, expected)
+
+    assert sorted(Setup.calls) == [1.0, 2.0]
+    assert sorted(init_batches) == [0, 1, 2, 3]
+
+    with pytest.raises(ValueError, match=r".*batch_dim must be set.*"):
+        in_ds.isel(batch=0).xsimlab.run(model=model, fork_init=True)
+
+    with pytest.raises(ValueError, match=r".*not supported with a multi-process.*"):
+        in_ds.xsimlab.run(
+            model=model,
+            batch_dim="batch",
+            parallel=True,
+            scheduler="processes",
+            fork_init=True,
+        )
+
+
+def test_initialized_models_pickle():
+    init_models = _InitializedModels(["a", "b", "a"])
+    unpickled = pickle.loads(pickle.dumps(init_models))
+
+    assert init_models._counts == {"a": 2, "b": 1}
+    assert unpickled.keys == init_models.keys
+    assert not unpickled._counts
+
+    # initialized models kept in a worker process (LRU)
+    unpickled.max_models = 1
+    model = xs.Model({})
+    calls = []
+
+    def initialize(m):
+        calls.append(m)
+        return xs.RuntimeSignal.NONE
+
+    for batch in [0, 2, 1]:
+        unpickled.fork(batch, model, initialize)
+
+    assert len(calls) == 2
+    assert list(unpickled._models) == ["b"]
+
+
+@xs.process
+class CountInit:
+    path = xs.variable()
+    forcing = xs.variable()
+    u = xs.variable(intent="out")
+
+    def initialize(self):
+        with open(self.path, "a") as f:
+            f.write("init\n")
+        self.u = 0.0
+
+    def run_step(self):
+        self.u += self.forcing
+
+
+def test_fork_init_processes(tmpdir):
+    path = str(tmpdir.join("init_calls"))
+    model = xs.Model({"count": CountInit})
+
+    in_ds = xs.create_setup(
+        model=model,
+        clocks={"clock": range(3)},
+        input_vars={
+            "count__path": path,
+            "count__forcing": (("batch", "clock"), np.ones((16, 3))),
+        },
+        output_vars={"count__u": None},
+    )
+
+    out_ds = in_ds.xsimlab.run(
+        model=model,
+        batch_dim="batch",
+        parallel="processes",
+        fork_init=True,
+        store=str(tmpdir.join("out.zarr")),
+    )
+    np.testing.assert_array_equal(out_ds.count__u.values, np.full(16, 2.0))
+
+    # initialized (at most) once per worker process
+    with open(path) as f:
+        ncalls = len(f.readlines())
+    assert ncalls <= min(os.cpu_count() or 1, 16)
+
+
+@xs.process
+class Terrain:
+    elevation = xs.variable(dims="x", static=True)
+    uplift = xs.variable(dims="x", static=True)
+    height = xs.variable(dims="x", intent="out")
+
+    elevations = []
+
+    def initialize(self):
+        self.elevations.append(self.elevation)
+        self.height = self.elevation + self.uplift
+
+
+def test_get_shared_input_keys():
+    @xs.process
+    class Other:
+        depth = xs.variable(dims="x", static=True, intent="inout")
+
+    model = xs.Model({"terrain": Terrain})
+    ds = xr.Dataset(
+        {
+            "terrain__elevation": ("x", [1.0, 2.0]),
+            "terrain__uplift": (("batch", "x"), [[0.0, 1.0], [1.0, 2.0]]),
+        }
+    )
+
+    # single simulation: values are copied
+    assert _get_shared_input_keys(ds, model) == []
+    assert _get_shared_input_keys(ds, model, "batch") == [("terrain", "elevation")]
+
+    model = xs.Model({"terrain": Terrain, "other": Other})
+    ds["other__depth"] = ("x", [1.0, 1.0])
+    assert ("other", "depth") in model.input_vars
+    assert ("other", "depth") not in _get_shared_input_keys(ds, model, "batch")
+
+
+@pytest.mark.parametrize("parallel", [False, True])
+def test_shared_static_inputs(parallel):
+    model = xs.Model({"terrain": Terrain})
+
+    in_ds = xs.create_setup(
+        model=model,
+        clocks={"clock": range(3)},
+        input_vars={
+            "terrain__elevation": ("x", np.arange(4.0)),
+            "terrain__uplift": (("batch", "x"), np.ones((3, 4))),
+        },
+        output_vars={"terrain__height": None},
+    )
+
+    Terrain.elevations.clear()
+    out_ds = in_ds.xsimlab.run(model=model, batch_dim="batch", parallel=parallel)
+
+    np.testing.assert_array_equal(out_ds.terrain__height[-1], np.arange(4.0) + 1)
+
+    elevation = in_ds.terrain__elevation.values
+    assert len(Terrain.elevations) == 3
+    for arr in Terrain.elevations:
+        assert np.shares_memory(arr, elevation)
+        assert not arr.flags.writeable
+    assert elevation.flags.writeable
+
+    # values are copied for a single simulation
+    Terrain.elevations.clear()
+    in_ds.isel(batch=0).xsimlab.run(model=model)
+
+    assert not np.shares_memory(Terrain.elevations[0], elevation)
+    assert Terrain.elevations[0].flags.writeable
+
+
+@pytest.mark.parametrize("parallel", [False, True])
+def test_abort_batch_members(parallel):
+    model = xs.Model({"grow": Grow})
+
+    in_ds = xs.create_setup(
+        model=model,
+        clocks={"clock": range(8), "out": [0, 3, 6]},
+        master_clock="clock",
+        input_vars={"grow__rate": ("batch", [0.5, 2.0, 3.0]), "grow__abort_at": -1},
+        output_vars={"grow__u": "out"},
+    )
+
+    out_ds = in_ds.xsimlab.run(
+        model=model,
+        batch_dim="batch",
+        parallel=parallel,
+        abort_if=lambda out: out["grow__u"] > 10,
+    )
+    np.testing.assert_array_equal(
+        out_ds.simulation_status, ["completed", "aborted", "aborted"]
+    )
+    np.testing.assert_array_equal(out_ds.clock_end, [7, 4, 4])
+    np.testing.assert_array_equal(out_ds.grow__u[1], [2.0, 16.0, np.nan])
+
+    # abort signal returned by a process
+    in_ds["grow__abort_at"] = ("batch", [-1, 0, 1])
+    out_ds = in_ds.xsimlab.run(model=model, batch_dim="batch", parallel=parallel)
+    np.testing.assert_array_equal(
+        out_ds.simulation_status, ["completed", "aborted", "aborted"]
+    )
+    np.testing.assert_array_equal(out_ds.clock_end, [7, 1, 2])
+    np.testing.assert_array_equal(out_ds.grow__u[1], [2.0, np.nan, np.nan])
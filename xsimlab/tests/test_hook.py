@@ -1,7 +1,14 @@
+from datetime import datetime
+import threading
+import time
+
+import pandas as pd
 import pytest
 
 import xsimlab as xs
 from xsimlab import runtime_hook, RuntimeHook
+from xsimlab.hook import HookTable, group_hooks
+from xsimlab.process import SimulationStage
 
 
 @xs.process
@@ -36,6 +43,51 @@ def test_runtime_hook():
         def func2():
             pass
 
+    with pytest.raises(ValueError, match=".*only supported for.*"):
+
+        @runtime_hook("initialize", every=2)
+        def func3():
+            pass
+
+
+@pytest.mark.parametrize(
+    "throttle,expected_steps",
+    [
+        ({"every": 3}, [0, 3, 6, 9]),
+        ({"at": [2, 5]}, [2, 5]),
+        ({"every": 2, "at": [2, 5]}, [2]),
+        ({"interval": 3600}, [0]),
+    ],
+)
+def test_runtime_hook_throttle(model, throttle, expected_steps):
+    steps = []
+
+    @runtime_hook("run_step", **throttle)
+    def test_hook(_model, context, state):
+        steps.append(context["step"])
+
+    in_ds = xs.create_setup(model=model, clocks={"c": range(11)})
+    in_ds.xsimlab.run(model=model, hooks=[test_hook])
+
+    assert steps == expected_steps
+
+
+@pytest.mark.parametrize(
+    "at", [["2000-01-03", "2000-01-06"], [datetime(2000, 1, 3), datetime(2000, 1, 6)]]
+)
+def test_runtime_hook_throttle_datetime(model, at):
+    steps = []
+
+    @runtime_hook("run_step", at=at)
+    def test_hook(_model, context, state):
+        steps.append(context["step"])
+
+    clock = pd.date_range("2000-01-01", periods=11)
+    in_ds = xs.create_setup(model=model, clocks={"c": clock})
+    in_ds.xsimlab.run(model=model, hooks=[test_hook])
+
+    assert steps == [2, 5]
+
 
 @pytest.mark.parametrize(
     "event,expected_ncalls,expected_u",
@@ -67,6 +119,76 @@ def test_runtime_hook_calls(model, event, expected_ncalls, expected_u):
     assert inc[0] == expected_ncalls
 
 
+def test_runtime_hook_async(model):
+    main_thread = threading.current_thread()
+    calls = []
+
+    @runtime_hook("run_step", async_=True, keys=[("p", "u")])
+    def test_hook(_model, context, state):
+        assert threading.current_thread() is not main_thread
+        assert list(state) == [("p", "u")]
+        # (slow) snapshot values not updated by the simulation
+        time.sleep(0.01)
+        calls.append((context["step"], state[("p", "u")]))
+
+    in_ds = xs.create_setup(model=model, clocks={"c": range(5)})
+    in_ds.xsimlab.run(model=model, hooks=[test_hook])
+
+    assert calls == [(0, 1), (1, 2), (2, 3), (3, 4)]
+
+
+def test_runtime_hook_async_drop(model):
+    calls = []
+    event = threading.Event()
+
+    @runtime_hook("run_step", async_=True, queue_size=1, on_full="drop")
+    def test_hook(_model, context, state):
+        event.wait()
+        calls.append(context["step"])
+
+    @runtime_hook("finalize", trigger="pre")
+    def release(_model, context, state):
+        event.set()
+
+    in_ds = xs.create_setup(model=model, clocks={"c": range(5)})
+    in_ds.xsimlab.run(model=model, hooks=[test_hook, release])
+
+    # 1st call is blocked in the worker, at most one call is queued,
+    # others are dropped
+    assert calls[0] == 0
+    assert len(calls) <= 2
+
+
+def test_runtime_hook_async_error(model):
+    @runtime_hook("run_step", async_=True)
+    def test_hook(_model, context, state):
+        raise RuntimeError("error in hook")
+
+    in_ds = xs.create_setup(model=model, clocks={"c": range(3)})
+
+    with pytest.raises(RuntimeError, match="error in hook"):
+        in_ds.xsimlab.run(model=model, hooks=[test_hook])
+
+
+def test_runtime_hook_async_error_simulation(model):
+    @xs.process
+    class Fail:
+        def run_step(self):
+            raise ValueError("error in simulation")
+
+    @runtime_hook("run_step", "model", "pre", async_=True)
+    def test_hook(_model, context, state):
+        raise RuntimeError("error in hook")
+
+    m = model.update_processes({"fail": Fail})
+    in_ds = xs.create_setup(model=m, clocks={"c": range(3)})
+
+    # the simulation error is reported
+    with pytest.warns(UserWarning, match="error in hook"):
+        with pytest.raises(ValueError, match="error in simulation"):
+            in_ds.xsimlab.run(model=m, hooks=[test_hook])
+
+
 def test_runtime_hook_call_frozen(model):
     in_ds = xs.create_setup(model=model, clocks={"c": [0, 1]})
 
@@ -146,3 +268,31 @@ def test_hook_arg_type(model):
 
     with pytest.raises(TypeError, match=".*not a RuntimeHook.*"):
         in_ds.xsimlab.run(model=model, hooks=[1])
+
+
+def test_hook_table(model):
+    @runtime_hook("run_step", "model", "pre")
+    def model_hook(_model, context, state):
+        pass
+
+    @runtime_hook("run_step", "process", "post")
+    def process_hook(_model, context, state):
+        pass
+
+    context = {}
+    table = HookTable(group_hooks([model_hook, process_hook]), model, context)
+
+    assert table
+    assert table.get(SimulationStage.INITIALIZE) is None
+
+    stage_hooks = table.get(SimulationStage.RUN_STEP)
+    assert stage_hooks.model_pre == (model_hook,)
+    assert stage_hooks.model_post == ()
+    assert stage_hooks.process_post == (process_hook,)
+
+    # frozen views created once
+    assert stage_hooks.args[0] is model
+    assert stage_hooks.args[1].mapping is context
+    assert stage_hooks.args[2].mapping is model.state
+
+    assert not HookTable({}, model, context)
@@ -1,6 +1,11 @@
+import os
+import subprocess
+import sys
+
 import attr
 import numpy as np
 import pytest
+import xarray as xr
 
 import xsimlab as xs
 from xsimlab.process import get_process_cls
@@ -239,6 +244,14 @@ class TestModel:
         # test invalid key ignored
         assert ("not-a-model", "input") not in model.state
 
+        # test shared (read-only) values
+        model.update_state(
+            {("add", "offset"): arr}, validate=False, shared_keys=[("add", "offset")]
+        )
+        assert np.shares_memory(model.state[("add", "offset")], arr)
+        assert not model.state[("add", "offset")].flags.writeable
+        assert arr.flags.writeable
+
         # test validate
         with pytest.raises(TypeError, match=r".*'int'.*"):
             model.update_state({("roll", "shift"): 2.5})
@@ -254,6 +267,81 @@ class TestModel:
                 input_vars, ignore_static=True, ignore_invalid_keys=False
             )
 
+    def test_snapshot(self):
+        @xs.process
+        class P:
+            u = xs.variable(dims="x", intent="inout")
+            v = xs.variable(dims="x")
+            w = xs.variable(intent="out")
+
+            def run_step(self):
+                self.u += 1
+                self.w = self.u.sum()
+
+            def finalize(self):
+                self.v[:] = 0
+
+        model = xs.Model({"p": P})
+        model.update_state(
+            {("p", "u"): np.zeros(3), ("p", "v"): np.ones(3)}, validate=False
+        )
+
+        snapshot = model.snapshot(keys=[("p", "u"), ("p", "v")])
+        assert set(snapshot) == {("p", "u"), ("p", "v")}
+
+        # no copy yet
+        assert snapshot[("p", "u")] is model.state[("p", "u")]
+        assert not snapshot[("p", "u")].flags.writeable
+
+        model.execute("run_step", {})
+        np.testing.assert_array_equal(snapshot[("p", "u")], np.zeros(3))
+        np.testing.assert_array_equal(model.state[("p", "u")], np.ones(3))
+        assert model.state[("p", "u")].flags.writeable
+
+        snapshot = model.snapshot()
+        assert snapshot[("p", "w")] == 3
+
+        # variables with intent='in' are not copied-on-write
+        with pytest.raises(ValueError, match=r".*read-only.*"):
+            model.execute("finalize", {})
+
+    def test_snapshot_frozen(self):
+        @xs.process
+        class P:
+            u = xs.variable(dims="x", intent="inout")
+            v = xs.variable(dims="x")
+
+            def run_step(self):
+                self.u += 1
+
+        model = xs.Model({"p": P})
+        model.update_state(
+            {("p", "u"): np.zeros(3), ("p", "v"): np.ones(3)}, validate=False
+        )
+
+        # arrays that no process updates are not tracked
+        model.snapshot()
+        assert set(model._frozen) == {("p", "u")}
+
+        model.execute("run_step", {})
+        assert not model._frozen
+
+        # arrays replaced in state are no longer tracked after a new snapshot
+        model.snapshot()
+        model.state[("p", "u")] = np.zeros(3)
+        model.snapshot(keys=[("p", "v")])
+        assert not model._frozen
+
+    def test_snapshot_packed_state(self):
+        model = xs.Model({"profile": Profile}, packed_state=True)
+        model.state[("profile", "u")] = np.zeros(3)
+        model.state.pack()
+
+        snapshot = model.snapshot()
+        model.state[("profile", "u")] = np.ones(3)
+
+        np.testing.assert_array_equal(snapshot[("profile", "u")], np.zeros(3))
+
     def test_update_cache(self, model):
         model.state[("init_profile", "n_points")] = 10
         model.update_cache(("init_profile", "n_points"))
@@ -272,12 +360,132 @@ class TestModel:
         with pytest.raises(TypeError, match=r".*'int'.*"):
             model.validate(["roll"])
 
+    @pytest.mark.parametrize(
+        "kwargs", [{}, {"validate": True}, {"parallel": True}, {"process_contexts": {}}]
+    )
+    def test_execute_signal(self, kwargs):
+        @xs.process
+        class P:
+            @xs.runtime(args="step")
+            def run_step(self, step):
+                if step:
+                    return xs.RuntimeSignal.BREAK
+
+        model = xs.Model({"p": P})
+        assert model.execute("run_step", {"step": 0}, **kwargs) is xs.RuntimeSignal.NONE
+        assert (
+            model.execute("run_step", {"step": 1}, **kwargs) is xs.RuntimeSignal.BREAK
+        )
+
+        @xs.runtime_hook("run_step", "process", "post")
+        def hook(model, context, state):
+            return xs.RuntimeSignal.BREAK
+
+        signal = model.execute("run_step", {"step": 0}, hooks={}, **kwargs)
+        assert signal is xs.RuntimeSignal.NONE
+        hooks = xs.hook.group_hooks([hook])
+        signal = model.execute("run_step", {"step": 0}, hooks=hooks, **kwargs)
+        assert signal is xs.RuntimeSignal.BREAK
+
+        @xs.runtime_hook("run_step", "model", "pre")
+        def abort_hook(model, context, state):
+            return xs.RuntimeSignal.ABORT
+
+        hooks = xs.hook.group_hooks([hook, abort_hook])
+        signal = model.execute("run_step", {"step": 1}, hooks=hooks, **kwargs)
+        assert signal is xs.RuntimeSignal.ABORT
+
     def test_clone(self, model):
         cloned = model.clone()
 
         for p_name in model:
             assert cloned[p_name] is not model[p_name]
 
+    @pytest.mark.parametrize("packed_state", [False, True])
+    def test_fork(self, packed_state):
+        @xs.process
+        class P:
+            u = xs.variable(dims="x", intent="inout")
+            v = xs.variable(dims="x")
+
+            def initialize(self):
+                self.count = 0
+                self.grid = np.arange(3.0)
+
+            def run_step(self):
+                self.count += 1
+                self.u += self.grid
+
+            def finalize(self):
+                self.v[:] = 0
+
+        model = xs.Model({"p": P}, packed_state=packed_state)
+        model.update_state(
+            {("p", "u"): np.zeros(3), ("p", "v"): np.ones(3)}, validate=False
+        )
+        model.execute("initialize", {})
+
+        forked = model.fork()
+        assert forked.p is not model.p
+        assert forked.p.grid is model.p.grid
+        assert not model.p.grid.flags.writeable
+
+        if not packed_state:
+            assert forked.state[("p", "v")] is model.state[("p", "v")]
+
+        for _ in range(2):
+            forked.execute("run_step", {})
+
+        assert forked.p.count == 2
+        np.testing.assert_array_equal(forked.state[("p", "u")], [0.0, 2.0, 4.0])
+        assert model.p.count == 0
+        np.testing.assert_array_equal(model.state[("p", "u")], np.zeros(3))
+
+        if not packed_state:
+            with pytest.raises(ValueError, match=r".*read-only.*"):
+                forked.execute("finalize", {})
+
+    def test_direct_access(self, model, in_dataset):
+        m = xs.Model(
+            {k: get_process_cls(v) for k, v in model.items()}, direct_access=True
+        )
+
+        assert m == model
+        assert m.clone() == model
+        assert type(m.profile) is not get_process_cls(m.profile)
+        assert isinstance(m.profile, Profile)
+
+        m.state[("init_profile", "n_points")] = 5
+        m.state[("profile", "u")] = np.arange(5.0)
+        m.state[("add", "offset")] = 1.0
+
+        np.testing.assert_array_equal(m.roll.u, np.arange(5.0))
+        np.testing.assert_array_equal(m.profile.u_opp, -np.arange(5.0))
+
+        m.init_profile.initialize()
+        np.testing.assert_array_equal(m.init_profile.x, np.arange(5))
+
+        with pytest.raises(AttributeError):
+            m.roll.u = 0
+
+        m.roll.u_diff = np.ones(5)
+        assert [np.sum(d) for d in m.profile.u_diffs] == [5.0, 1.0]
+
+        cloudpickle = pytest.importorskip("cloudpickle")
+        unpickled = cloudpickle.loads(cloudpickle.dumps(m))
+        assert unpickled == model
+        np.testing.assert_array_equal(unpickled.profile.u, m.profile.u)
+
+        # keys are bound again after a pickle round trip
+        assert type(unpickled.profile) is not get_process_cls(unpickled.profile)
+        assert isinstance(unpickled.profile, Profile)
+        unpickled.state[("profile", "u")] = np.ones(5)
+        np.testing.assert_array_equal(unpickled.roll.u, np.ones(5))
+
+        expected = in_dataset.xsimlab.run(model=model)
+        actual = in_dataset.xsimlab.run(model=m)
+        xr.testing.assert_identical(actual, expected)
+
     def test_update_processes(self, no_init_model, model):
         m = no_init_model.update_processes(
             {"add": AddOnDemand, "init_profile": InitProfile}
@@ -315,3 +523,15 @@ class TestModel:
 
     def test_repr(self, simple_model, simple_model_repr):
         assert repr(simple_model) == simple_model_repr
+
+
+def test_lazy_imports():
+    # dask.distributed and zarr should be imported only when needed
+    code = (
+        "import sys, xsimlab; "
+        "print(any(m in sys.modules for m in ('distributed', 'zarr')))"
+    )
+    root_dir = os.path.dirname(os.path.dirname(xs.__file__))
+    out = subprocess.check_output([sys.executable, "-c", code], cwd=root_dir)
+
+    assert out.strip() == b"False"
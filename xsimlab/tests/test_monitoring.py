@@ -1,8 +1,10 @@
 import importlib
 
+import numpy as np
 import pytest
 
-from ..monitoring import ProgressBar
+import xsimlab as xs
+from ..monitoring import ProgressBar, SteadyState
 from . import has_tqdm
 
 
@@ -67,10 +69,15 @@ def test_progress_bar_update_run_step():
     pbar = ProgressBar()
     pbar.init_bar(None, {"nsteps": 10}, {})
     pbar.update_init(None, {}, {})
-    pbar.update_run_step(None, {"nsteps": 10, "step": 1}, {})
+    pbar.update_run_step(None, {"nsteps": 10, "step": 0}, {})
 
     assert pbar.pbar_model.format_dict["n"] == 2
-    assert pbar.pbar_model.format_dict["prefix"] == "run step 1/10"
+    assert pbar.pbar_model.format_dict["prefix"] == "run step 0/10"
+
+    # (throttled) update of several steps at once
+    pbar.update_run_step(None, {"nsteps": 10, "step": 5}, {})
+
+    assert pbar.pbar_model.format_dict["n"] == 7
 
 
 @pytest.mark.skipif(not has_tqdm, reason="requires tqdm")
@@ -90,3 +97,33 @@ def test_progress_bar_close_bar():
 
     assert pbar.pbar_model.format_dict["n"] == 1
     assert pbar.pbar_model.format_dict["prefix"].startswith("Simulation finished")
+
+
+def test_steady_state():
+    @xs.process
+    class Decay:
+        u = xs.variable(dims="x", intent="out")
+
+        def initialize(self):
+            self.u = np.full(3, 1.0)
+
+        def run_step(self):
+            self.u = self.u * 0.5
+
+    model = xs.Model({"decay": Decay})
+    in_ds = xs.create_setup(
+        model=model, clocks={"clock": range(10)}, output_vars={"decay__u": "clock"},
+    )
+
+    hook = SteadyState("decay__u", atol=0.2)
+    out_ds = in_ds.xsimlab.run(model=model, hooks=[hook])
+    np.testing.assert_array_equal(out_ds.clock, [0, 1, 2, 3])
+    assert hook._previous == {}
+
+    out_ds = in_ds.xsimlab.run(
+        model=model, hooks=[SteadyState([("decay", "u")], atol=0.2, every=2)]
+    )
+    np.testing.assert_array_equal(out_ds.clock, [0, 1, 2, 3, 4])
+
+    with pytest.raises(KeyError, match=r"Invalid variable.*"):
+        in_ds.xsimlab.run(model=model, hooks=[SteadyState("decay__v")])
@@ -303,6 +303,63 @@ def test_process_executor_raise():
                 pass
 
 
+def test_process_executor_pure():
+    calls = []
+
+    @xs.process(pure=True)
+    class P:
+        in_var = xs.variable()
+        out_var = xs.variable(intent="out")
+
+        @xs.runtime(args="step")
+        def run_step(self, step):
+            calls.append(step)
+            self.out_var = self.in_var * 2
+
+        def finalize_step(self):
+            calls.append("finalize_step")
+
+    m = xs.Model({"p": P})
+    executor = m.p.__xsimlab_executor__
+    state = {("p", "in_var"): 1}
+
+    def run(stage, step=0):
+        return executor.execute(m.p, stage, {"step": step}, state=state)
+
+    assert run(SimulationStage.RUN_STEP) == {("p", "out_var"): 2}
+    assert run(SimulationStage.RUN_STEP) == {("p", "out_var"): 2}
+    assert calls == [0]
+
+    # fingerprints are stored per stage
+    run(SimulationStage.FINALIZE_STEP)
+    run(SimulationStage.FINALIZE_STEP)
+    assert calls == [0, "finalize_step"]
+
+    # changed input, runtime argument or output
+    state[("p", "in_var")] = 2
+    assert run(SimulationStage.RUN_STEP) == {("p", "out_var"): 4}
+    run(SimulationStage.RUN_STEP, step=1)
+    state[("p", "out_var")] = 0
+    assert run(SimulationStage.RUN_STEP, step=1) == {("p", "out_var"): 4}
+    assert calls == [0, "finalize_step", 0, 1, 1]
+
+    @xs.process(pure=True)
+    class Q:
+        var = xs.variable(intent="inout")
+
+        def run_step(self):
+            self.var += 1
+
+    m = xs.Model({"q": Q})
+    state = {("q", "var"): 0}
+    executor = m.q.__xsimlab_executor__
+
+    for _ in range(3):
+        executor.execute(m.q, SimulationStage.RUN_STEP, {}, state=state)
+
+    assert state[("q", "var")] == 3
+
+
 def test_process_decorator():
     @xs.process(autodoc=True)
     class Dummy_t:
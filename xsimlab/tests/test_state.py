@@ -0,0 +1,117 @@
+import pickle
+
+import numpy as np
+import pytest
+import xarray as xr
+
+import xsimlab as xs
+from xsimlab.process import get_process_cls
+from xsimlab.state import PackedState
+
+
+@pytest.fixture
+def state():
+    state = PackedState()
+    state[("a", "x")] = np.arange(4.0)
+    state[("a", "y")] = np.ones((2, 3))
+    state[("b", "i")] = np.arange(3)
+    state[("b", "s")] = 1.0
+    state[("b", "obj")] = "foo"
+
+    state.pack()
+
+    return state
+
+
+class TestPackedState:
+    def test_pack(self, state):
+        assert set(state.packed_keys) == {("a", "x"), ("a", "y"), ("b", "i")}
+
+        buffers = state.buffers
+        assert set(buffers) == {np.dtype("d"), np.dtype(int)}
+        assert buffers[np.dtype("d")].size == 10
+
+        assert state[("a", "y")].shape == (2, 3)
+        assert np.shares_memory(state[("a", "y")], buffers[np.dtype("d")])
+        np.testing.assert_array_equal(state[("a", "x")], np.arange(4.0))
+        assert state[("b", "s")] == 1.0
+
+    def test_setitem(self, state):
+        view = state[("a", "x")]
+
+        # same shape and dtype: copy into buffer
+        state[("a", "x")] = np.zeros(4)
+        assert state[("a", "x")] is view
+        np.testing.assert_array_equal(view, 0.0)
+
+        # in-place update
+        x = state[("a", "x")]
+        x += 1
+        state[("a", "x")] = x
+        np.testing.assert_array_equal(state[("a", "x")], 1.0)
+
+        # other shape: unpack
+        state[("a", "x")] = np.zeros(5)
+        assert ("a", "x") not in state.packed_keys
+        assert state[("a", "x")] is not view
+
+        state.update({("b", "i"): 1})
+        assert state[("b", "i")] == 1
+        assert state.packed_keys == [("a", "y")]
+
+        del state[("a", "y")]
+        assert state.packed_keys == []
+
+    def test_copy_restore(self, state):
+        copied = state.copy()
+
+        assert isinstance(copied, PackedState)
+        assert copied.packed_keys == state.packed_keys
+        assert copied[("b", "obj")] == "foo"
+
+        state[("a", "x")] = np.full(4, 9.0)
+        np.testing.assert_array_equal(copied[("a", "x")], np.arange(4.0))
+
+        state.restore(copied)
+        np.testing.assert_array_equal(state[("a", "x")], np.arange(4.0))
+        assert not np.shares_memory(state[("a", "x")], copied[("a", "x")])
+
+    def test_diff(self, state):
+        copied = state.copy()
+        assert state.diff(copied) == set()
+
+        state[("a", "y")] = np.zeros((2, 3))
+        state[("b", "obj")] = "bar"
+        assert state.diff(copied) == {("a", "y"), ("b", "obj")}
+
+        state[("a", "x")] = np.full(4, np.nan)
+        copied[("a", "x")] = np.full(4, np.nan)
+        assert state.diff(copied) == {("a", "y"), ("b", "obj")}
+
+        assert state.diff(dict(copied)) == {("a", "y"), ("b", "obj")}
+
+        del copied[("b", "s")]
+        assert ("b", "s") in state.diff(copied)
+
+    def test_pickle(self, state):
+        unpickled = pickle.loads(pickle.dumps(state))
+
+        assert isinstance(unpickled, PackedState)
+        assert unpickled.packed_keys == state.packed_keys
+        assert unpickled.diff(state) == set()
+        assert np.shares_memory(unpickled[("a", "y")], unpickled.buffers[np.dtype("d")])
+
+
+def test_model_packed_state(model, in_dataset):
+    m = xs.Model({k: get_process_cls(v) for k, v in model.items()}, packed_state=True)
+
+    assert isinstance(m.state, PackedState)
+    assert isinstance(m.clone().state, PackedState)
+
+    m.state[("init_profile", "n_points")] = 5
+    m.execute("initialize", {})
+    assert ("profile", "u") in m.state.packed_keys
+
+    expected = in_dataset.xsimlab.run(model=model)
+    actual = in_dataset.xsimlab.run(model=m)
+    xr.testing.assert_identical(actual, expected)
@@ -4,7 +4,14 @@ import xarray as xr
 import zarr
 
 import xsimlab as xs
-from xsimlab.stores import DummyLock, ZarrSimulationStore
+from xsimlab.stores import (
+    ChunkPolicy,
+    DummyLock,
+    ZarrSimulationStore,
+    _merge_attrs,
+    get_zarr_source,
+    rechunk_store,
+)
 
 
 @pytest.fixture(params=["directory", zarr.MemoryStore])
@@ -64,6 +71,41 @@ def test_dummy_lock():
         assert not lock.locked()
 
 
+def test_merge_attrs():
+    attrs = {"a": 1, "b": np.array([1, 2]), "c": "x"}
+    other = {"a": 1, "b": np.array([1, 3]), "d": "y"}
+
+    assert _merge_attrs(attrs, other) == {"a": 1, "c": "x", "d": "y"}
+
+
+@pytest.mark.parametrize(
+    "hint,clock,expected",
+    [
+        ("time_series", "clock", (100, 1, 10)),
+        ("time_series", None, (7, 13, 10)),
+        ("snapshot", "clock", (1, 50, 20)),
+        ("batch_major", "clock", (7, 13, 10)),
+        ("auto", "clock", (7, 13, 10)),
+    ],
+)
+def test_chunk_policy(hint, clock, expected):
+    policy = ChunkPolicy(hint=hint, target_bytes=8000)
+    shape = (100, 50, 20)
+
+    chunks = policy.get_chunks(shape, "f8", clock=clock)
+    assert np.prod(chunks) * 8 <= 8000
+    assert chunks == expected
+
+    # cached
+    assert policy._cache[(shape, "<f8", clock)] == chunks
+
+
+def test_chunk_policy_batch():
+    assert ChunkPolicy().get_batch_chunk_size(10) == 1
+    assert ChunkPolicy("batch_major", batch_chunk_size=4).get_batch_chunk_size(10) == 4
+    assert ChunkPolicy("batch_major").get_batch_chunk_size(10) == 10
+
+
 class TestZarrSimulationStore:
     @pytest.mark.parametrize("zobj", [None, "dir", zarr.MemoryStore(), zarr.group()])
     def test_constructor(self, in_ds, model, zobj, tmpdir):
@@ -100,6 +142,51 @@ class TestZarrSimulationStore:
         # check output variables attrs removed before saving input dataset
         assert not ds.xsimlab.output_vars
 
+    @pytest.mark.parametrize("chunks", [None, {}])
+    def test_get_zarr_source(self, tmpdir, chunks):
+        ds = xr.Dataset({"a": ("x", [1.0, 2.0, 3.0]), "b": ("x", [4.0, 5.0, 6.0])})
+        ds.to_zarr(str(tmpdir))
+
+        src = xr.open_zarr(str(tmpdir), chunks=chunks)
+
+        zarray = get_zarr_source(src["a"].variable)
+        assert isinstance(zarray, zarr.Array)
+        assert zarray.path == "a"
+
+        # subset or computed data is not backed by the zarr array
+        assert get_zarr_source(src["a"].isel(x=[0, 1]).variable) is None
+        if chunks is not None:
+            assert get_zarr_source((src["a"] * 2).variable) is None
+
+        assert get_zarr_source(ds["a"].variable) is None
+
+    @pytest.mark.parametrize("store_inputs", ["reference", "skip"])
+    def test_write_input_xr_dataset_refs(self, in_ds, model, tmpdir, store_inputs):
+        src_path = str(tmpdir.join("src.zarr"))
+        in_ds[["roll__shift"]].to_zarr(src_path)
+        in_ds["roll__shift"] = xr.open_zarr(src_path)["roll__shift"]
+
+        zstore = zarr.MemoryStore()
+        store = ZarrSimulationStore(
+            in_ds, model, zobject=zstore, store_inputs=store_inputs
+        )
+        store.write_input_xr_dataset()
+
+        ztest = zarr.open_group(zstore, mode="r")
+        assert "roll__shift" not in ztest
+
+        if store_inputs == "reference":
+            assert "init_profile__n_points" in ztest
+            refs = ztest.attrs["__xsimlab_input_refs__"]
+            assert refs["roll__shift"] == {"store": src_path, "path": "roll__shift"}
+        else:
+            assert "init_profile__n_points" not in ztest
+
+        ds = store.open_as_xr_dataset()
+        assert ds["roll__shift"].item() == 1
+        assert ds["init_profile__n_points"].item() == 5
+        assert "__xsimlab_input_refs__" not in ds.attrs
+
     def test_write_output_vars(self, in_ds, store):
         model = store.model
         model.state[("profile", "u")] = np.array([1.0, 2.0, 3.0])
@@ -172,6 +259,64 @@ class TestZarrSimulationStore:
         # test default chunk size along batch dim
         assert ztest.profile__u.chunks[0] == 1
 
+    def test_write_output_vars_release(self, store_batch, model_batch1, model_batch2):
+        for m in (model_batch1, model_batch2):
+            m.state[("profile", "u")] = np.array([1.0, 2.0, 3.0])
+            m.state[("roll", "u_diff")] = np.array([-1.0, 1.0, 0.0])
+            m.state[("add", "offset")] = 2.0
+
+        store_batch.write_output_vars(0, 0, model=model_batch1)
+        store_batch.write_output_vars(1, 0, model=model_batch2)
+        assert set(store_batch.clock_incs["clock"]) == {0, 1}
+
+        store_batch.write_output_vars(0, -1, model=model_batch1)
+        assert set(store_batch.clock_incs["clock"]) == {1}
+
+        store_batch.write_end_step(1, 1, status="aborted")
+        assert not any(store_batch.clock_incs.values())
+
+    def test_batch_groups(self, in_ds_batch, model, zobject):
+        store = ZarrSimulationStore(
+            in_ds_batch, model, zobject=zobject, batch_dim="batch"
+        )
+        assert list(store.get_batch_groups()) == [[0], [1]]
+
+        encoding = {"profile__u": {"chunks": (2, 1, 3)}}
+        store = ZarrSimulationStore(
+            in_ds_batch, model, zobject=zobject, batch_dim="batch", encoding=encoding
+        )
+        assert list(store.get_batch_groups()) == [[0, 1]]
+
+    def test_buffer_batch_group(self, in_ds_batch, model, model_batch1, model_batch2):
+        encoding = {"profile__u": {"chunks": (2, 1, 3)}}
+        store = ZarrSimulationStore(
+            in_ds_batch, model, batch_dim="batch", encoding=encoding
+        )
+
+        for m, v in zip([model_batch1, model_batch2], [1.0, 2.0]):
+            m.state[("profile", "u")] = np.array([v, v, v])
+            m.state[("roll", "u_diff")] = np.array([v, v, v])
+            m.state[("add", "offset")] = v
+
+        with store.buffer_batch_group([0, 1]):
+            store.write_output_vars(0, 0, model=model_batch1)
+            store.write_output_vars(1, 0, model=model_batch2)
+
+            # values not yet written in zarr arrays
+            assert np.all(np.isnan(store.zgroup.profile__u[:]))
+
+            # dynamic resize
+            model_batch2.state[("profile", "u")] = np.array([2.0, 2.0, 2.0, 2.0])
+            store.write_output_vars(1, 1, model=model_batch2)
+
+        ztest = zarr.open_group(store.zgroup.store, mode="r")
+
+        assert ztest.profile__u.chunks[0] == 2
+        np.testing.assert_array_equal(ztest.profile__u[0, 0], [1.0, 1.0, 1.0, np.nan])
+        np.testing.assert_array_equal(ztest.profile__u[1, 0], [2.0, 2.0, 2.0, np.nan])
+        np.testing.assert_array_equal(ztest.profile__u[1, 1], [2.0, 2.0, 2.0, 2.0])
+        np.testing.assert_array_equal(ztest.roll__u_diff[:, 0], [[1.0] * 3, [2.0] * 3])
+
     def test_write_index_vars(self, store):
         store.model.state[("init_profile", "x")] = np.array([1.0, 2.0, 3.0])
 
@@ -189,6 +334,27 @@ class TestZarrSimulationStore:
 
         np.testing.assert_array_equal(ztest.x, np.array([1.0, 2.0, 3.0]))
 
+    @pytest.mark.parametrize("check", [True, False])
+    def test_write_index_vars_once(
+        self, in_ds_batch, model, model_batch1, model_batch2, check
+    ):
+        store = ZarrSimulationStore(
+            in_ds_batch, model, batch_dim="batch", check_index_vars=check
+        )
+
+        model_batch1.state[("init_profile", "x")] = np.array([1.0, 2.0, 3.0])
+        model_batch2.state[("init_profile", "x")] = np.array([4.0, 5.0, 6.0])
+
+        store.write_index_vars(model=model_batch1)
+
+        if check:
+            with pytest.raises(ValueError, match=r".*'x' differ between.*"):
+                store.write_index_vars(model=model_batch2)
+        else:
+            # not overwritten
+            store.write_index_vars(model=model_batch2)
+            np.testing.assert_array_equal(store.zgroup.x, [1.0, 2.0, 3.0])
+
     def test_resize_zarr_dataset(self):
         @xs.process
         class P:
@@ -213,6 +379,172 @@ class TestZarrSimulationStore:
         )
         np.testing.assert_array_equal(ztest.p__arr, expected)
 
+    @pytest.mark.parametrize("batch", [-1, 0])
+    def test_ragged(self, batch):
+        @xs.process
+        class P:
+            arr = xs.variable(dims="x", intent="out", encoding={"ragged": True})
+
+        model = xs.Model({"p": P})
+
+        in_ds = xs.create_setup(
+            model=model, clocks={"clock": [0, 1, 2]}, output_vars={"p__arr": "clock"},
+        )
+        batch_dim = None
+
+        if batch != -1:
+            in_ds = in_ds.assign_coords(batch=[0])
+            batch_dim = "batch"
+
+        store = ZarrSimulationStore(in_ds, model, batch_dim=batch_dim)
+
+        for step, size in zip([0, 1, -1], [1, 3, 2]):
+            model.state[("p", "arr")] = np.arange(size, dtype="d")
+            store.write_output_vars(batch, step)
+
+        # entries of the batch member are dropped at the end of the simulation
+        assert not store._ragged_ends
+        assert not any(store.clock_incs.values())
+
+        zgroup = store.zgroup["__xsimlab_ragged__/p__arr"]
+        assert "p__arr" not in store.zgroup
+        np.testing.assert_array_equal(np.squeeze(zgroup.offsets), [0, 1, 4, 6])
+
+        expected = np.array([[0, np.nan, np.nan], [0, 1, 2], [0, 1, np.nan]])
+        ds = store.open_as_xr_dataset()
+        np.testing.assert_array_equal(np.squeeze(ds.p__arr), expected)
+
+        ds = store.open_as_xr_dataset(ragged="flat")
+        np.testing.assert_array_equal(np.squeeze(ds.p__arr), [0, 0, 1, 2, 0, 1])
+        np.testing.assert_array_equal(np.squeeze(ds.p__arr_offsets), [0, 1, 4, 6])
+
+    def test_ragged_batch(self):
+        @xs.process
+        class P:
+            arr = xs.variable(
+                dims="x", intent="out", encoding={"ragged": True, "chunks": (2, 4)}
+            )
+
+        model = xs.Model({"p": P})
+
+        in_ds = xs.create_setup(
+            model=model, clocks={"clock": [0, 1]}, output_vars={"p__arr": "clock"},
+        ).assign_coords(batch=[0, 1])
+
+        class ResizingLock:
+            # another batch member grows the array while waiting for the lock
+            armed = False
+
+            def __enter__(self):
+                if not self.armed:
+                    return
+                zvalues = store.zgroup["__xsimlab_ragged__/p__arr/values"]
+                zvalues.resize(2, 10)
+                zvalues[1, :8] = 1
+                store.zgroup["__xsimlab_ragged__/p__arr/offsets"][1] = [0, 4, 8]
+
+            def __exit__(self, *args):
+                pass
+
+        store = ZarrSimulationStore(
+            in_ds, model, batch_dim="batch", lock=ResizingLock()
+        )
+
+        model.state[("p", "arr")] = np.arange(1, dtype="d")
+        store.write_output_vars(0, 0)
+
+        # one batch member per chunk, whatever the encoding
+        zvalues = store.zgroup["__xsimlab_ragged__/p__arr/values"]
+        assert zvalues.chunks[0] == 1
+        assert zvalues.shape == (2, 2)
+
+        model.state[("p", "arr")] = np.arange(3, dtype="d")
+        store.lock.armed = True
+        store.write_output_vars(0, 1)
+
+        assert store.zgroup["__xsimlab_ragged__/p__arr/values"].shape == (2, 10)
+        ds = store.open_as_xr_dataset()
+        np.testing.assert_array_equal(ds.p__arr[1], np.ones((2, 4)))
+        np.testing.assert_array_equal(ds.p__arr[0, 1, :3], [0, 1, 2])
+
+    def test_chunk_policy(self, in_ds_batch, model, model_batch1, model_batch2):
+        store = ZarrSimulationStore(
+            in_ds_batch, model, batch_dim="batch", chunk_policy="batch_major"
+        )
+        assert store.batch_group_size == 2
+
+        with store.buffer_batch_group([0, 1]):
+            for batch, m in zip([0, 1], [model_batch1, model_batch2]):
+                m.state[("profile", "u")] = np.array([1.0, 2.0, 3.0])
+                m.state[("roll", "u_diff")] = np.array([-1.0, 1.0, 0.0])
+                m.state[("add", "offset")] = 2.0
+                store.write_output_vars(batch, 0, model=m)
+
+        assert store.zgroup.profile__u.chunks[0] == 2
+
+    def test_ragged_error(self):
+        @xs.process
+        class P:
+            arr = xs.variable(dims="x", intent="out", encoding={"ragged": True})
+
+        model = xs.Model({"p": P})
+
+        in_ds = xs.create_setup(
+            model=model, clocks={"clock": [0, 1]}, output_vars={"p__arr": None},
+        )
+
+        with pytest.raises(ValueError, match=r"Ragged encoding set.*"):
+            ZarrSimulationStore(in_ds, model)
+
+    @pytest.mark.parametrize("batch", [-1, 0])
+    def test_pack_scalars(self, batch, zobject):
+        @xs.process
+        class P:
+            a = xs.variable(intent="out", attrs={"units": "m"})
+            b = xs.variable(intent="out")
+            c = xs.variable(intent="out", encoding={"dtype": np.float32})
+            arr = xs.variable(dims="x", intent="out")
+
+        model = xs.Model({"p": P})
+
+        in_ds = xs.create_setup(
+            model=model,
+            clocks={"clock": [0, 1, 2]},
+            output_vars={"p__a": "clock", "p__b": "clock", "p__c": "clock"},
+        )
+        batch_dim = None
+
+        if batch != -1:
+            in_ds = in_ds.assign_coords(batch=[0])
+            batch_dim = "batch"
+
+        store = ZarrSimulationStore(
+            in_ds, model, zobject=zobject, batch_dim=batch_dim, pack_scalars=True
+        )
+
+        for step in [0, 1]:
+            model.state[("p", "a")] = step + 0.5
+            model.state[("p", "b")] = step
+            model.state[("p", "c")] = step
+            store.write_output_vars(batch, step)
+
+        ztable = store.zgroup["__xsimlab_packed__/clock"]
+        assert ztable.dtype.names == ("p__a", "p__b")
+        assert "p__a" not in store.zgroup
+        assert "p__c" in store.zgroup
+
+        store.consolidate()
+        ds = store.open_as_xr_dataset()
+
+        assert list(ds.p__a.dims) == ztable.attrs["_ARRAY_DIMENSIONS"]
+        assert ds.p__a.attrs["units"] == "m"
+        np.testing.assert_array_equal(np.squeeze(ds.p__a), [0.5, 1.5, np.nan])
+        np.testing.assert_array_equal(np.squeeze(ds.p__b), [0, 1, 0])
+
+        model.state[("p", "a")] = np.ones(2)
+        with pytest.raises(ValueError, match=r".*must remain a scalar"):
+            store.write_output_vars(batch, 2)
+
     def test_encoding(self):
         @xs.process
         class P:
@@ -267,3 +599,54 @@ class TestZarrSimulationStore:
 
             # test scalars still loaded in memory
             assert isinstance(ds.variables["add__offset"]._data, np.ndarray)
+
+
+@pytest.mark.parametrize("in_place", [True, False])
+def test_rechunk_store(in_place):
+    source = zarr.group()
+    zarr_clock = source.create_dataset("clock", data=np.arange(10), chunks=5)
+    zarr_clock.attrs.update(
+        {"_ARRAY_DIMENSIONS": ["clock"], "__xsimlab_output_clock__": 1}
+    )
+    data = np.arange(2 * 10 * 6.0).reshape(2, 10, 6)
+    zarray = source.create_dataset("var", data=data, chunks=(1, 1, 6))
+    zarray.attrs.update({"_ARRAY_DIMENSIONS": ["batch", "clock", "x"], "units": "m"})
+    source.create_dataset("scalar", data=1.0, shape=())
+    source.create_group("sub").create_dataset("a", data=[1, 2])
+
+    target = None if in_place else zarr.group()
+
+    # small memory: copied by blocks
+    actual = rechunk_store(source, target, batch_dim="batch", max_mem=8 * 12)
+
+    assert actual.var.chunks == (1, 10, 6)
+    assert actual.clock.chunks == (10,)
+    np.testing.assert_array_equal(actual.var[:], data)
+    assert actual.var.attrs["units"] == "m"
+    assert actual.scalar[()] == 1.0
+    np.testing.assert_array_equal(actual.sub.a[:], [1, 2])
+    assert ".zmetadata" in actual.store
+    assert "__xsimlab_rechunk__" not in actual
+    assert "__xsimlab_rechunk_old__" not in actual
+
+
+def test_rechunk_store_in_place_error(monkeypatch):
+    source = zarr.group()
+    data = np.arange(10.0)
+    zarray = source.create_dataset("var", data=data, chunks=1)
+    zarray.attrs["_ARRAY_DIMENSIONS"] = ["x"]
+
+    move = zarr.Group.move
+
+    def failing_move(self, src, dst):
+        if src.startswith("__xsimlab_rechunk__"):
+            raise RuntimeError("move failed")
+        move(self, src, dst)
+
+    monkeypatch.setattr(zarr.Group, "move", failing_move)
+
+    with pytest.raises(RuntimeError):
+        rechunk_store(source)
+
+    # original array not lost
+    np.testing.assert_array_equal(source["__xsimlab_rechunk_old__/var"][:], data)
@@ -281,6 +281,32 @@ class TestSimlabAccessor:
         new_ds = ds.xsimlab.update_clocks(model=model, clocks={"out2": [0, 2]})
         assert new_ds.xsimlab.master_clock_dim == "clock"
 
+    def test_process_clocks(self, model):
+        ds = xr.Dataset()
+        ds = ds.xsimlab.update_clocks(
+            model=model,
+            clocks={"clock": [0, 1, 2], "out": [0, 2]},
+            master_clock="clock",
+            process_clocks={"roll": "out"},
+        )
+        assert ds.xsimlab.process_clocks == {"roll": "out"}
+
+        ds2 = ds.xsimlab.update_clocks(model=model, process_clocks={"add": "out"})
+        assert ds2.xsimlab.process_clocks == {"roll": "out", "add": "out"}
+
+        ds2 = ds.xsimlab.update_clocks(model=model, process_clocks={"roll": None})
+        assert ds2.xsimlab.process_clocks == {}
+        assert ds.xsimlab.process_clocks == {"roll": "out"}
+
+        ds2 = ds.drop_vars("out").xsimlab.update_clocks(model=model)
+        assert ds2.xsimlab.process_clocks == {}
+
+        with pytest.raises(KeyError, match=r".*not valid process name.*"):
+            ds.xsimlab.update_clocks(model=model, process_clocks={"invalid": "out"})
+
+        with pytest.raises(ValueError, match=r".*not a valid clock coordinate.*"):
+            ds.xsimlab.update_clocks(model=model, process_clocks={"roll": "invalid"})
+
     def test_update_vars(self, model, in_dataset):
         ds = in_dataset.xsimlab.update_vars(
             model=model,
@@ -413,6 +439,14 @@ class TestSimlabAccessor:
 
         xr.testing.assert_equal(out_ds.load(), out_dataset)
 
+    @pytest.mark.parametrize("rechunk", [True, {"hint": "snapshot"}])
+    def test_run_rechunk(self, model, in_dataset, out_dataset, rechunk):
+        zg = zarr.group(zarr.TempStore())
+        out_ds = in_dataset.xsimlab.run(model=model, store=zg, rechunk=rechunk)
+
+        xr.testing.assert_equal(out_ds.load(), out_dataset)
+        assert "__xsimlab_rechunk__" not in zg
+
     def test_run_safe_mode(self, model, in_dataset):
         # safe mode True: ensure model is cloned (empty state)
         _ = in_dataset.xsimlab.run(model=model, safe_mode=True)
@@ -539,6 +573,109 @@ class TestSimlabAccessor:
         expected = xr.DataArray(data, dims=dims, coords=coords) * 2
         xr.testing.assert_equal(out_ds["p__out_var"], expected)
 
+    def test_run_batch_chunks(self, parallel, scheduler):
+        @xs.process
+        class P:
+            in_var = xs.variable()
+            out_var = xs.variable(dims="x", intent="out")
+
+            def run_step(self):
+                self.out_var = np.full(3, self.in_var)
+
+        m = xs.Model({"p": P})
+
+        in_ds = xs.create_setup(
+            model=m,
+            clocks={"clock": [0, 1, 2]},
+            input_vars={"p__in_var": ("batch", np.arange(5))},
+            output_vars={"p__out_var": "clock"},
+        )
+
+        # batch chunks > 1: no zarr synchronizer needed
+        out_ds = in_ds.xsimlab.run(
+            model=m,
+            batch_dim="batch",
+            parallel=parallel,
+            scheduler=scheduler,
+            store=zarr.TempStore(),
+            encoding={"p__out_var": {"chunks": (2, 1, 3)}},
+        )
+
+        expected = np.broadcast_to(np.arange(5)[:, None], (5, 3)).astype("d")
+        np.testing.assert_array_equal(out_ds.p__out_var.isel(clock=0), expected)
+        np.testing.assert_array_equal(out_ds.p__out_var.isel(clock=1), expected)
+
+    def test_run_batch_lazy(self, parallel, scheduler):
+        da = pytest.importorskip("dask.array")
+
+        @xs.process
+        class P:
+            in_var = xs.variable()
+            out_var = xs.variable(intent="out")
+
+            def run_step(self):
+                self.out_var = self.in_var * 2
+
+        m = xs.Model({"p": P})
+
+        in_ds = xs.create_setup(
+            model=m,
+            clocks={"clock": [0, 1]},
+            input_vars={"p__in_var": ("batch", da.arange(7, chunks=3))},
+            output_vars={"p__out_var": None},
+        )
+
+        # small window: groups of simulations are submitted in several steps
+        out_ds = in_ds.xsimlab.run(
+            model=m,
+            batch_dim="batch",
+            parallel=parallel,
+            scheduler=scheduler,
+            store=zarr.TempStore(),
+            batch_window=2,
+        )
+
+        np.testing.assert_array_equal(out_ds.p__out_var, np.arange(7) * 2)
+
+    def test_run_batch_processes(self, monkeypatch):
+        # share all batch-invariant inputs
+        monkeypatch.setattr(xs.drivers, "_SHARED_MEMORY_MIN_NBYTES", 0)
+
+        @xs.process
+        class P:
+            grid = xs.variable(dims="x")
+            factor = xs.variable()
+            out_var = xs.variable(dims="x", intent="out")
+
+            def run_step(self):
+                self.out_var = self.grid * self.factor
+
+        m = xs.Model({"p": P})
+
+        in_ds = xs.create_setup(
+            model=m,
+            clocks={"clock": [0, 1, 2]},
+            input_vars={
+                "p__grid": ("x", np.arange(4.0)),
+                "p__factor": ("batch", [1.0, 2.0, 3.0]),
+            },
+            output_vars={"p__out_var": "clock"},
+        )
+
+        out_ds = in_ds.xsimlab.run(
+            model=m, batch_dim="batch", parallel="processes", store=zarr.TempStore()
+        )
+
+        expected = np.array([1.0, 2.0, 3.0])[:, None] * np.arange(4.0)
+        np.testing.assert_array_equal(out_ds.p__out_var.isel(clock=0), expected)
+        xr.testing.assert_equal(out_ds.p__grid, in_ds.p__grid)
+
+        with pytest.raises(ValueError, match=r".*in-memory store.*"):
+            in_ds.xsimlab.run(model=m, batch_dim="batch", parallel="processes")
+
+        with pytest.raises(ValueError, match=r".*batch_dim must be set.*"):
+            in_ds.xsimlab.run(model=m, parallel="processes")
+
 
 def test_create_setup(model, in_dataset):
     expected = xr.Dataset()
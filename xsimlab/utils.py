@@ -51,6 +51,7 @@ def normalize_encoding(encoding, extra_keys=None):
         "order",
         "filters",
         "object_codec",
+        "ragged",
     ]
 
     if extra_keys is not None:
@@ -179,7 +179,9 @@ def variable(
         serialized format (i.e., as a zarr dataset). Currently used keys
         include 'dtype', 'compressor', 'fill_value', 'order', 'filters'
         and 'object_codec'. See :func:`zarr.creation.create` for details
-        about these options. Other keys are ignored.
+        about these options. Set 'ragged' to True for saving the values of
+        a variable that changes in size along its first dimension as a flat
+        array with offsets. Other keys are ignored.
 
     See Also
     --------
@@ -9,7 +9,9 @@ import attr
 import numpy as np
 from xarray import as_variable, Dataset, register_dataset_accessor
 
+from .cache import run_cached
 from .drivers import XarraySimulationDriver
+from .hook import RuntimeHook
 from .model import get_model_variables, Model
 from .utils import Frozen, variables_dict
 from .variable import VarType
@@ -130,6 +132,7 @@ class SimlabAccessor:
     _clock_key = "__xsimlab_output_clock__"
     _master_clock_key = "__xsimlab_master_clock__"
     _output_vars_key = "__xsimlab_output_vars__"
+    _process_clocks_key = "__xsimlab_process_clocks__"
 
     def __init__(self, ds):
         self._ds = ds
@@ -445,6 +448,52 @@ class SimlabAccessor:
 
         return Frozen(o_vars)
 
+    @property
+    def process_clocks(self):
+        """Returns a dictionary of process names as keys and the clock
+        dimension names on which those processes are executed as values.
+
+        Processes that are not present here are executed at each step of
+        the master clock.
+
+        Cannot be modified directly.
+        """
+        clock_str = self._ds.attrs.get(self._process_clocks_key)
+
+        if not clock_str:
+            return Frozen({})
+
+        return Frozen(dict(item.split(":") for item in clock_str.split(",")))
+
+    def _set_process_clocks(self, model, process_clocks):
+        p_clocks = dict(process_clocks)
+
+        invalid_processes = set(p_clocks) - set(model)
+        if invalid_processes:
+            raise KeyError(
+                ", ".join(invalid_processes)
+                + f" is/are not valid process name(s) in model {model}"
+            )
+
+        for p_name, clock in list(p_clocks.items()):
+            if clock is None or clock == self.master_clock_dim:
+                del p_clocks[p_name]
+            elif clock not in self.clock_coords:
+                raise ValueError(
+                    f"{clock!r} coordinate is not a valid clock coordinate."
+                )
+
+        attrs = self._ds.attrs.copy()
+
+        if p_clocks:
+            attrs[self._process_clocks_key] = ",".join(
+                f"{p_name}:{clock}" for p_name, clock in p_clocks.items()
+            )
+        else:
+            attrs.pop(self._process_clocks_key, None)
+
+        self._ds.attrs = attrs
+
     @property
     def output_vars_by_clock(self):
         """Returns a dictionary of output variables grouped by clock (keys).
@@ -458,7 +507,9 @@ class SimlabAccessor:
 
         return Frozen(dict(o_vars))
 
-    def update_clocks(self, model=None, clocks=None, master_clock=None):
+    def update_clocks(
+        self, model=None, clocks=None, master_clock=None, process_clocks=None
+    ):
         """Set or update clock coordinates.
 
         Also copy from the replaced coordinates any attribute that is
@@ -484,6 +535,16 @@ class SimlabAccessor:
             - ``units`` : units of all clock coordinate labels
             - ``calendar`` : a unique calendar for all (time) clock coordinates
 
+        process_clocks : dict, optional
+            Dictionary with process names as keys and clock dimension names as
+            values, for processes that must be executed only at the time
+            steps given by the clock coordinate labels (sub-cycling) instead of
+            at each step of the master clock. Those processes then get the
+            start, end and duration of the step of their own clock as runtime
+            arguments, and the last values of their output variables are kept
+            between two executions. A value of None (or the master clock)
+            resets the given process to the master clock.
+
         Returns
         -------
         updated : Dataset
@@ -539,6 +600,10 @@ class SimlabAccessor:
         o_vars = {k: v for k, v in self.output_vars.items() if v is None or v in ds}
         ds.xsimlab._set_output_vars(model, o_vars)
 
+        p_clocks = {k: v for k, v in self.process_clocks.items() if v in ds}
+        p_clocks.update(process_clocks or {})
+        ds.xsimlab._set_process_clocks(model, p_clocks)
+
         return ds
 
     def update_vars(self, model=None, input_vars=None, output_vars=None):
@@ -681,6 +746,16 @@ class SimlabAccessor:
         parallel=False,
         scheduler=None,
         safe_mode=True,
+        store_inputs="copy",
+        batch_window=None,
+        check_index_vars=False,
+        chunk_policy=None,
+        rechunk=None,
+        max_step_delta=None,
+        abort_if=None,
+        cache=None,
+        fork_init=False,
+        pack_scalars=False,
     ):
         """Run the model.
 
@@ -735,11 +810,16 @@ class SimlabAccessor:
             :func:`~xsimlab.runtime_hook` or instances of
             :class:`~xsimlab.RuntimeHook`. The latter can also be used using
             the ``with`` statement or using their ``register()`` method.
-        parallel : bool, optional
+        parallel : bool or {'processes'}, optional
             If True, run the simulation(s) in parallel using Dask (default: False).
             If a dimension label is set for ``batch_dim``, each simulation in
             the batch will be run in parallel. Otherwise, the processes in
             ``model`` will be executed in parallel for each simulation stage.
+            If 'processes', run a batch of simulations (``batch_dim`` is
+            required) in a pool of worker processes (see
+            :class:`concurrent.futures.ProcessPoolExecutor`), sharing large
+            input arrays that don't vary along ``batch_dim`` in shared memory.
+            The default in-memory store is not supported in this case.
         scheduler : str, optional
             Dask's scheduler used to run the simulation(s) in parallel. See
             :func:`dask.compute`. It also accepts any instance of
@@ -750,6 +830,97 @@ class SimlabAccessor:
             simultaneously (provided that the code executed in ``model`` is
             thread-safe too). Generally safe mode shouldn't be disabled, except
             in a few cases (e.g., debugging).
+        store_inputs : {'copy', 'reference', 'skip'}, optional
+            Define how model inputs are saved in ``store``. It may be one of
+            the following options:
+
+            - 'copy': all input variables are written in the store (default)
+            - 'reference': input variables that are already fully backed by a
+              zarr array (e.g., lazily loaded with :func:`xarray.open_zarr`)
+              are not copied but only referenced, all other input variables
+              are written in the store
+            - 'skip': input variables are not written in the store
+
+            In all cases, referenced or skipped input variables are (lazily)
+            merged into the output Dataset.
+        batch_window : int, optional
+            Maximum number of groups of simulations in a batch that are
+            submitted (i.e., in flight) at a time when ``parallel`` is enabled
+            (default: 4 times the number of CPUs). A new group is submitted as
+            soon as one has finished. The input data of each simulation is loaded
+            only when it starts, so that a large batch (possibly generated
+            lazily with dask) can be run with bounded memory usage.
+        check_index_vars : bool, optional
+            Index variables are assumed to be the same for all simulations in
+            a batch and are thus written only once in ``store``. If True,
+            the values computed in each simulation are checked against the
+            written values (using a checksum) and an error is raised if they
+            differ (default: False).
+        chunk_policy : str or dict or :class:`~xsimlab.stores.ChunkPolicy`, optional
+            Default chunk layout of the zarr arrays created for model outputs.
+            Either one of the access pattern hints 'auto' (default),
+            'time_series', 'snapshot' or 'batch_major', or a dictionary of
+            :class:`~xsimlab.stores.ChunkPolicy` arguments (e.g.,
+            ``{'hint': 'time_series', 'target_bytes': 4_000_000}``). Chunks
+            set in ``encoding`` have precedence over this policy.
+        rechunk : bool or str or dict or :class:`~xsimlab.stores.ChunkPolicy`, optional
+            If set, ``store`` is rewritten at the end of the simulation(s)
+            with a chunk layout optimized for reading the outputs, given as a
+            chunk policy (True is the same than 'time_series'). See also
+            :func:`~xsimlab.rechunk_store`. Default: no rechunking.
+        max_step_delta : str or tuple or list, optional
+            Name(s) of model variables, e.g., ``'foo__bar'`` or
+            ``('foo', 'bar')``, which values are the maximum step durations
+            proposed by processes (e.g., from a CFL condition). If set,
+            each step of the master clock is split into sub-steps of duration
+            given by the minimum of those values, evaluated at the beginning of
+            each sub-step (adaptive time stepping). The labels of the master
+            clock coordinate are always reached exactly, so that outputs are
+            saved at those labels. Default: no sub-step.
+        abort_if : callable or list, optional
+            Condition(s) evaluated each time outputs are saved during a
+            simulation, given as function(s) that accept a dictionary of the
+            saved values (with variable names as keys, e.g.,
+            ``'foo__bar'``) and return True if the simulation must be aborted.
+            An aborted simulation stops at the end of the current step and its
+            remaining outputs (including those saved at the end of the
+            simulation) are left unset, i.e., set to fill values. See also
+            :class:`~xsimlab.RuntimeSignal`.
+        cache : str or :class:`~xsimlab.ResultCache`, optional
+            If set, results are retrieved from (or saved to) this on-disk
+            cache (a path may be given), so that simulations are not re-run
+            when the model, the input data and the run options are the same
+            than in a previous run. In a batch, each simulation has its own
+            cache entry. Results retrieved from the cache are loaded in
+            memory and are not written in ``store``. The cache is not used
+            when runtime hooks are active, since they may change the results
+            (e.g., stop a simulation early). Default: no cache.
+        fork_init : bool, optional
+            If True, the simulations in a batch (``batch_dim`` is required)
+            that have the same inputs at the initialize stage, i.e., that
+            differ only by time-varying inputs, share the same initialization:
+            the 'initialize' stage is run once for each group of such
+            simulations and each simulation then starts from a fork of the
+            initialized model (see :meth:`xsimlab.Model.fork`). This is useful
+            when the initialization is costly. Arrays set at initialization
+            are shared between simulations and copied only before being
+            updated by a process (through variables with intent 'out' or
+            'inout'). Updating them in-place otherwise raises an error. Only
+            the model-level runtime hooks are called at the initialize stage
+            of each simulation. With ``parallel='processes'``, the
+            initialization is run (at most) once in each worker process.
+            Not supported with dask multi-process or distributed schedulers.
+            Default: False.
+        pack_scalars : bool, optional
+            If True, scalar (numeric) output variables saved at the same clock
+            are packed in the zarr store into a single array, with one field
+            per variable, so that only one chunk is written at each clock
+            coordinate instead of one chunk per variable. This may greatly
+            speed-up the simulation(s) when many scalar variables are saved.
+            Variables with encoding options are not packed. Packed variables
+            are unpacked in the output Dataset (without copy), but they are
+            not found when opening ``store`` directly with
+            :func:`xarray.open_zarr`. Default: False.
 
         Returns
         -------
@@ -787,12 +958,11 @@ class SimlabAccessor:
           For example, :class:`zarr.storage.MemoryStore` used by default is
           safe to write in multiple threads but not in multiple processes.
         - If chunks are specified in ``encoding`` with chunk size > 1
-          for ``batch_dim``, then one of the zarr synchronizers should be used
-          too, otherwise model output values will not be saved properly.
-          Pick :class:`zarr.sync.ThreadSynchronizer` or
-          :class:`zarr.sync.ProcessSynchronizer` depending on which dask scheduler
-          is used. Also, check that the (distributed) scheduler doesn't use
-          both multiple processes and multiple threads.
+          for ``batch_dim``, the simulations in the batch are grouped so that
+          each group covers whole chunks along ``batch_dim``. The simulations
+          of a group are run one after each other and their output values are
+          kept in memory until they are all written at once, so that no zarr
+          synchronizer is needed.
 
         """
         model = _maybe_get_model_from_context(model)
@@ -800,9 +970,12 @@ class SimlabAccessor:
         if safe_mode:
             model = model.clone()
 
-        driver = XarraySimulationDriver(
-            self._ds,
-            model,
+        if max_step_delta is not None:
+            if isinstance(max_step_delta, (str, tuple)):
+                max_step_delta = [max_step_delta]
+            max_step_delta = [as_variable_key(k) for k in max_step_delta]
+
+        driver_kwargs = dict(
             batch_dim=batch_dim,
             store=store,
             encoding=encoding,
@@ -811,11 +984,46 @@ class SimlabAccessor:
             hooks=hooks,
             parallel=parallel,
             scheduler=scheduler,
+            store_inputs=store_inputs,
+            batch_window=batch_window,
+            check_index_vars=check_index_vars,
+            chunk_policy=chunk_policy,
+            rechunk=rechunk,
+            max_step_vars=max_step_delta,
+            abort_if=abort_if,
+            fork_init=fork_init,
+            pack_scalars=pack_scalars,
         )
 
-        driver.run_model()
+        def run_driver(dataset, batch_subset=None):
+            driver = XarraySimulationDriver(
+                dataset, model, batch_subset=batch_subset, **driver_kwargs
+            )
+            driver.run_model()
+            return driver.get_results()
+
+        if cache is not None and (hooks or RuntimeHook.active):
+            # hooks may change the results (e.g., stop the simulation)
+            warnings.warn(
+                "The result cache is not used when runtime hooks are active",
+                UserWarning,
+            )
+            cache = None
+
+        if cache is None:
+            return run_driver(self._ds)
+
+        # run options that may affect the results (only)
+        options = dict(
+            check_dims=check_dims,
+            encoding=encoding,
+            max_step_delta=max_step_delta,
+            abort_if=abort_if,
+        )
 
-        return driver.get_results()
+        return run_cached(
+            self._ds, model, cache, run_driver, batch_dim=batch_dim, options=options
+        )
 
 
 def create_setup(
@@ -825,6 +1033,7 @@ def create_setup(
     input_vars=None,
     output_vars=None,
     fill_default=True,
+    process_clocks=None,
 ):
     """Create a specific setup for model runs.
 
@@ -881,6 +1090,11 @@ def create_setup(
     fill_default : bool, optional
         If True (default), automatically fill the dataset with all model
         inputs missing in ``input_vars`` and their default value (if any).
+    process_clocks : dict, optional
+        Dictionary with process names as keys and clock dimension names as
+        values, for processes that must be executed only at the time steps
+        given by the clock coordinate labels instead of at each step of the
+        master clock (see :meth:`xarray.Dataset.xsimlab.update_clocks`).
 
     Returns
     -------
@@ -906,7 +1120,12 @@ def create_setup(
 
     ds = (
         Dataset()
-        .xsimlab.update_clocks(model=model, clocks=clocks, master_clock=master_clock)
+        .xsimlab.update_clocks(
+            model=model,
+            clocks=clocks,
+            master_clock=master_clock,
+            process_clocks=process_clocks,
+        )
         .pipe(maybe_fill_default)
         .xsimlab.update_vars(
             model=model, input_vars=input_vars, output_vars=output_vars